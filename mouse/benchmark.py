@@ -0,0 +1,168 @@
+import os
+import os.path
+import io
+import sys
+import gzip
+import time
+import logging
+import platform
+import traceback
+import multiprocessing
+
+from mouse.gffEntry import GffEntry
+from mouse.gffFile import GffFile
+from mouse.timing import peakRssKb
+
+################################################################################
+#
+# Benchmarks for the load and export paths.
+#
+# Each benchmark runs in a fresh child process so its peak RSS is its own;
+# the annotation a benchmark needs is loaded in the child before the clock
+# starts (so the RSS includes it, the time does not).  Results are a list of
+# dicts suitable for json.dump: name, seconds, peakRssKb, and error if the
+# benchmarked call raised.
+
+class NullWriter(io.TextIOBase):
+  """ Text sink that only counts what is written to it. """
+
+  def __init__(self):
+    self.chars = 0
+
+  def write(self,s):
+    self.chars += len(s)
+    return len(s)
+
+def loadGff(fn):
+  gff = GffFile()
+  gff.load(fn,GffFile.open(fn))
+  return gff
+
+################################################################################
+#
+# the benchmarked operations; each takes (fn,tmpdir) and returns (seconds,
+# extra-info dict)
+
+def benchParse(fn,tmpdir):
+  lines = [l for l in open(fn) if l[0] != "#"]
+  start = time.perf_counter()
+  n = 0
+  for line in lines:
+    if GffEntry.parse(line) != None:
+      n += 1
+  return (time.perf_counter() - start,{"lines": len(lines),"entries": n})
+
+def benchLoad(fn,tmpdir):
+  start = time.perf_counter()
+  gff = loadGff(fn)
+  return (time.perf_counter() - start,{"entries": len(gff.entries)})
+
+def benchMakeAnno(category):
+  def run(fn,tmpdir):
+    gff = loadGff(fn)
+    out = NullWriter()
+    start = time.perf_counter()
+    gff.writeAnno(category,out)
+    return (time.perf_counter() - start,{"chars": out.chars})
+  return run
+
+def benchExport(method):
+  def run(fn,tmpdir):
+    gff = loadGff(fn)
+    start = time.perf_counter()
+    getattr(gff,method)(os.path.join(tmpdir,"bench"))
+    return (time.perf_counter() - start,{})
+  return run
+
+def benchReport(method):
+  def run(fn,tmpdir):
+    gff = loadGff(fn)
+    out = NullWriter()
+    start = time.perf_counter()
+    getattr(gff,method)(out)
+    return (time.perf_counter() - start,{"chars": out.chars})
+  return run
+
+################################################################################
+
+class Benchmark:
+
+  ANNO_CATEGORIES = ["gene","mRNA","snRNA","miRNA","transposable_element",
+                     "exon","CDS","five_prime_UTR","three_prime_UTR"]
+  REPORTS = ["stats","maxKids","hasName","hasFullName","topLevelTypes",
+             "parentTypes","checkConsistent","combinedReport"]
+
+  def __init__(self,workdir,synthetic,repeat=1):
+    self.workdir = workdir
+    self.synthetic = synthetic
+    self.repeat = repeat
+    self.plainFN = os.path.join(workdir,"synthetic.gff3")
+    self.gzipFN = self.plainFN + ".gz"
+
+  def prepare(self):
+    with open(self.plainFN,"w") as fd:
+      self.synthetic.write(fd)
+    with open(self.plainFN,"rb") as inFD, gzip.open(self.gzipFN,"wb") as outFD:
+      outFD.write(inFD.read())
+
+  def cases(self):
+    cases = [("parse",benchParse,self.plainFN),
+             ("load.plain",benchLoad,self.plainFN),
+             ("load.gzip",benchLoad,self.gzipFN)]
+    for c in Benchmark.ANNO_CATEGORIES:
+      cases.append(("makeAnno.%s" % (c,),benchMakeAnno(c),self.plainFN))
+    for m in ("makeTrackSet","makePipelineSet"):
+      cases.append((m,benchExport(m),self.plainFN))
+    for r in Benchmark.REPORTS:
+      cases.append(("report.%s" % (r,),benchReport(r),self.plainFN))
+    return cases
+
+  @staticmethod
+  def child(func,fn,tmpdir,conn):
+    logging.disable(logging.CRITICAL)
+    sys.stderr = open(os.devnull,"w")
+    try:
+      (seconds,extra) = func(fn,tmpdir)
+      conn.send({"seconds": seconds,"peakRssKb": peakRssKb(),"extra": extra})
+    except Exception as ex:
+      conn.send({"error": "%s: %s" % (type(ex).__name__,ex),
+                 "traceback": traceback.format_exc(limit=3)})
+    conn.close()
+
+  def runCase(self,name,func,fn):
+    ctx = multiprocessing.get_context("fork")
+    best = None
+    for i in range(self.repeat):
+      (recv,send) = ctx.Pipe(False)
+      proc = ctx.Process(target=Benchmark.child,args=(func,fn,self.workdir,send))
+      proc.start()
+      result = recv.recv()
+      proc.join()
+      if "error" in result:
+        best = result
+        break
+      if best == None or result["seconds"] < best["seconds"]:
+        best = result
+    best["name"] = name
+    return best
+
+  def run(self,only=None,log=None):
+    self.prepare()
+    results = []
+    for (name,func,fn) in self.cases():
+      if only != None and not any([name.startswith(o) for o in only]):
+        continue
+      result = self.runCase(name,func,fn)
+      if log != None:
+        if "error" in result:
+          log.write("%-30s ERROR %s\n" % (name,result["error"]))
+        else:
+          log.write("%-30s %9.3fs %9d KB\n" % (name,result["seconds"],result["peakRssKb"]))
+      results.append(result)
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": self.repeat,
+            "synthetic": vars(self.synthetic),
+            "fileBytes": os.path.getsize(self.plainFN),
+            "results": results}
@@ -0,0 +1,188 @@
+import struct
+import zlib
+
+################################################################################
+#
+# BGZF -- the blocked gzip format used by samtools/tabix.  Each block is a
+#         complete gzip member of at most 64KB, with the compressed block
+#         size recorded in a 'BC' extra field so blocks can be found without
+#         decompressing.
+
+BGZF_MAGIC = b"\x1f\x8b\x08\x04"
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+BLOCK_DATA = 0xff00   # uncompressed bytes per block, as written by htslib
+
+def isBgzf(fn):
+  with open(fn,"rb") as fd:
+    head = fd.read(18)
+  return len(head) == 18 and head[0:4] == BGZF_MAGIC and head[12:14] == b"BC"
+
+def blocks(fn):
+  """ List of (offset,uncompressed size) for each non-empty BGZF block. """
+  result = []
+  with open(fn,"rb") as fd:
+    offset = 0
+    while True:
+      head = fd.read(12)
+      if len(head) < 12:
+        break
+      if head[0:4] != BGZF_MAGIC:
+        raise ValueError("%s: not a BGZF block at offset %d" % (fn,offset))
+      xlen = struct.unpack("<H",head[10:12])[0]
+      extra = fd.read(xlen)
+      bsize = None
+      pos = 0
+      while pos < xlen:
+        (si1,si2,slen) = struct.unpack("<BBH",extra[pos:pos+4])
+        if si1 == 66 and si2 == 67:
+          bsize = struct.unpack("<H",extra[pos+4:pos+6])[0]
+        pos += 4 + slen
+      if bsize == None:
+        raise ValueError("%s: BGZF block without BC field at %d" % (fn,offset))
+      fd.seek(offset + bsize + 1 - 4)
+      isize = struct.unpack("<I",fd.read(4))[0]
+      if isize > 0:
+        result.append((offset,isize))
+      offset += bsize + 1
+  return result
+
+def compressBlock(data,level=6):
+  comp = zlib.compressobj(level,zlib.DEFLATED,-15)
+  cdata = comp.compress(data) + comp.flush()
+  head = struct.pack("<4sIBBHBBHH",BGZF_MAGIC,0,0,0xff,6,66,67,2,
+                     len(cdata) + 25)
+  tail = struct.pack("<II",zlib.crc32(data) & 0xffffffff,len(data))
+  return head + cdata + tail
+
+################################################################################
+#
+# class BgzfWriter -- binary file object writing BGZF.  tell() gives the
+#                     virtual offset (compressed block offset << 16 | offset
+#                     within the block) that tabix indexes refer to.
+
+class BgzfWriter:
+
+  def __init__(self,fn,level=6):
+    self.fd = open(fn,"wb")
+    self.level = level
+    self.buffer = bytearray()
+    self.blockOffset = 0
+
+  def write(self,data):
+    if isinstance(data,str):
+      data = data.encode()
+    self.buffer.extend(data)
+    while len(self.buffer) >= BLOCK_DATA:
+      self.flushBlock(bytes(self.buffer[0:BLOCK_DATA]))
+      del self.buffer[0:BLOCK_DATA]
+
+  def tell(self):
+    return (self.blockOffset << 16) | len(self.buffer)
+
+  def flushBlock(self,data):
+    block = compressBlock(data,self.level)
+    self.fd.write(block)
+    self.blockOffset += len(block)
+
+  def flush(self):
+    if len(self.buffer) > 0:
+      self.flushBlock(bytes(self.buffer))
+      self.buffer = bytearray()
+
+  def close(self):
+    self.flush()
+    self.fd.write(BGZF_EOF)
+    self.fd.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self,*exc):
+    self.close()
+
+################################################################################
+#
+# block-at-a-time reading, for decompressing blocks concurrently
+
+def readBlock(fd):
+  """ The next whole compressed block from 'fd', or None at end of file. """
+  head = fd.read(12)
+  if len(head) < 12:
+    return None
+  if head[0:4] != BGZF_MAGIC:
+    raise ValueError("not a BGZF block")
+  xlen = struct.unpack("<H",head[10:12])[0]
+  extra = fd.read(xlen)
+  bsize = None
+  pos = 0
+  while pos < xlen:
+    (si1,si2,slen) = struct.unpack("<BBH",extra[pos:pos+4])
+    if si1 == 66 and si2 == 67:
+      bsize = struct.unpack("<H",extra[pos+4:pos+6])[0]
+    pos += 4 + slen
+  if bsize == None:
+    raise ValueError("BGZF block without BC field")
+  return head + extra + fd.read(bsize + 1 - 12 - xlen)
+
+def inflateBlock(block):
+  xlen = struct.unpack("<H",block[10:12])[0]
+  data = zlib.decompress(block[12+xlen:-8],-15)
+  if len(data) != struct.unpack("<I",block[-4:])[0]:
+    raise ValueError("BGZF block size mismatch")
+  return data
+
+################################################################################
+#
+# class BgzfReader -- binary line reader over a BGZF file that can seek to a
+#                     virtual offset, for random access through an index.
+
+class BgzfReader:
+
+  def __init__(self,fn):
+    self.fd = open(fn,"rb")
+    self.blockOffset = 0
+    self.nextOffset = 0
+    self.data = b""
+    self.pos = 0
+    self.loadBlock(0)
+
+  def loadBlock(self,offset):
+    self.fd.seek(offset)
+    block = readBlock(self.fd)
+    self.blockOffset = offset
+    if block == None:
+      self.data = b""
+      self.nextOffset = offset
+    else:
+      self.data = inflateBlock(block)
+      self.nextOffset = offset + len(block)
+    self.pos = 0
+
+  def seek(self,voffset):
+    self.loadBlock(voffset >> 16)
+    self.pos = voffset & 0xffff
+
+  def tell(self):
+    return (self.blockOffset << 16) | self.pos
+
+  def readline(self):
+    """ The next line, newline included; b"" at end of file. """
+    parts = []
+    while True:
+      if self.pos >= len(self.data):
+        if self.nextOffset == self.blockOffset:
+          break
+        self.loadBlock(self.nextOffset)
+        continue
+      end = self.data.find(b"\n",self.pos)
+      if end < 0:
+        parts.append(self.data[self.pos:])
+        self.pos = len(self.data)
+        continue
+      parts.append(self.data[self.pos:end+1])
+      self.pos = end + 1
+      break
+    return b"".join(parts)
+
+  def close(self):
+    self.fd.close()
@@ -0,0 +1,154 @@
+import json
+import time
+import socket
+import http.client
+from urllib.parse import urlencode, urlsplit
+from collections import Counter
+
+################################################################################
+#
+# class AnnoClient -- a thin client of the mouseAnno query server
+#                     (mouse.server).
+#
+# 'address' is what the server reports: "http://127.0.0.1:<port>" or
+# "unix:<socket path>".  One client keeps one connection open (reconnecting
+# if the server dropped it) and is not for sharing between threads; give
+# each thread its own.  Failed requests raise ServerError.  The round-trip
+# time of each call is added up per operation in 'seconds' and 'calls'.
+
+class ServerError(Exception):
+
+  def __init__(self,status,message):
+    Exception.__init__(self,"%d: %s" % (status,message))
+    self.status = status
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+  def __init__(self,path,timeout=None):
+    http.client.HTTPConnection.__init__(self,"localhost",timeout=timeout)
+    self.path = path
+
+  def connect(self):
+    self.sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    if self.timeout != None:
+      self.sock.settimeout(self.timeout)
+    self.sock.connect(self.path)
+
+class AnnoClient:
+
+  def __init__(self,address,timeout=None):
+    self.address = address
+    self.timeout = timeout
+    self.conn = None
+    self.calls = Counter()
+    self.seconds = Counter()
+
+  def connect(self):
+    if self.address.startswith("unix:"):
+      return UnixHTTPConnection(self.address[5:],self.timeout)
+    url = urlsplit(self.address)
+    return http.client.HTTPConnection(url.hostname,url.port,timeout=self.timeout)
+
+  def close(self):
+    if self.conn != None:
+      self.conn.close()
+      self.conn = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self,*exc):
+    self.close()
+
+  def request(self,method,path,body=None):
+    """ The response to one request, retried once on a fresh connection if
+        the kept-alive one has gone. """
+    headers = {}
+    if body != None:
+      body = json.dumps(body).encode()
+      headers["Content-Type"] = "application/json"
+    for attempt in (0,1):
+      if self.conn == None:
+        self.conn = self.connect()
+      try:
+        self.conn.request(method,path,body,headers)
+        return self.conn.getresponse()
+      except (http.client.RemoteDisconnected,ConnectionResetError,BrokenPipeError):
+        self.close()
+        if attempt == 1:
+          raise
+
+  def call(self,op,params=None,body=None):
+    started = time.perf_counter()
+    path = "/" + op
+    if params:
+      path += "?" + urlencode(params,doseq=True)
+    resp = self.request("GET" if body == None else "POST",path,body)
+    result = json.loads(resp.read().decode())
+    self.calls[op] += 1
+    self.seconds[op] += time.perf_counter() - started
+    if resp.status != 200:
+      raise ServerError(resp.status,result.get("error",""))
+    return result
+
+  @staticmethod
+  def options(**kwargs):
+    return dict([(k,v) for (k,v) in kwargs.items() if v != None])
+
+  ##############################################################################
+  #
+  # operations
+
+  def entry(self,oid):
+    """ One entry as a dict, None if there is no such entry. """
+    return self.entries([oid])[0]
+
+  def entries(self,oids):
+    return self.call("entry",{"id": list(oids)})["entries"]
+
+  def offspring(self,oid,all=False):
+    return self.call("offspring",{"id": oid,"all": int(all)})["offspring"]
+
+  def lineage(self,oid):
+    return self.call("lineage",{"id": oid})
+
+  def overlap(self,chrom,start,end,category=None,strand=None):
+    """ IDs of the entries overlapping chrom:start-end (1-based, inclusive). """
+    return self.call("overlap",AnnoClient.options(chrom=chrom,start=start,end=end,
+                                                 category=category,strand=strand))["ids"]
+
+  def nearest(self,chrom,start,end=None,category=None):
+    """ (distance,IDs) of the closest entries. """
+    result = self.call("nearest",AnnoClient.options(chrom=chrom,start=start,end=end,
+                                                   category=category))
+    return (result["distance"],result["ids"])
+
+  def batch(self,requests):
+    """ Several operations in one round trip: 'requests' is a list of
+        {"op": ..., <params>}; each result, or {"error": ...}, in order. """
+    return self.call("batch",body={"requests": list(requests)})["results"]
+
+  def export(self,category,fmt="gtf"):
+    """ Yield the GTF or BED lines of a category as they arrive. """
+    started = time.perf_counter()
+    resp = self.request("GET","/export?" + urlencode({"category": category,"format": fmt}))
+    if resp.status != 200:
+      raise ServerError(resp.status,json.loads(resp.read().decode()).get("error",""))
+    done = False
+    try:
+      for line in resp:
+        yield line.decode()
+      done = True
+    finally:
+      resp.close()
+      if not done:
+        # the rest of the response is still on the connection
+        self.close()
+      self.calls["export"] += 1
+      self.seconds["export"] += time.perf_counter() - started
+
+  def metrics(self):
+    return self.call("metrics")
+
+  def health(self):
+    return self.call("health")
@@ -0,0 +1,196 @@
+import os
+import mmap
+import logging
+
+from mouse.gffEntry import GffEntry
+
+################################################################################
+#
+# Sequence access to an uncompressed FASTA file, or the ##FASTA section at
+# the end of a GFF3 file, through mmap.
+#
+# The index is samtools' .fai: per sequence its length, the offset of its
+# first base and the bases and bytes per line, so any range maps straight to
+# a byte range of the file and only the pages it covers are read.  A genome
+# is never loaded into memory.  The index is built by one streaming pass
+# when there is no up-to-date one beside the file, and saved if it can be.
+
+COMPLEMENT = bytes.maketrans(b"ACGTURYKMBVDHNacgturykmbvdhn",
+                             b"TGCAAYRMKVBHDNtgcaayrmkvbhdn")
+
+def reverseComplement(seq):
+  return seq.translate(COMPLEMENT)[::-1]
+
+################################################################################
+#
+# class FastaIndex -- the .fai entries of a file, in file order.
+
+class FastaIndex:
+
+  def __init__(self):
+    self.names = []
+    self.entries = {}    # name -> (length,offset,lineBases,lineBytes)
+
+  def __contains__(self,name):
+    return name in self.entries
+
+  def __getitem__(self,name):
+    return self.entries[name]
+
+  def add(self,name,length,offset,lineBases,lineBytes):
+    if name in self.entries:
+      raise ValueError("FASTA: duplicate sequence name '%s'" % (name,))
+    self.names.append(name)
+    self.entries[name] = (length,offset,lineBases,lineBytes)
+
+  @classmethod
+  def build(cls,fn,start=0):
+    """ Index the FASTA records of 'fn' from byte 'start' on. """
+    idx = cls()
+    record = None
+    pos = start
+    with open(fn,"rb") as fd:
+      fd.seek(start)
+      for line in fd:
+        if line[0:1] == b">":
+          if record != None:
+            idx.add(*record[0:5])
+          name = line[1:].split()[0].decode()
+          # name, length, offset, bases and bytes per line, short line seen,
+          # blank line seen
+          record = [name,0,pos + len(line),0,0,False,False]
+        elif record != None and len(line.strip()) == 0:
+          # fine at the end of a record, but no sequence may follow it
+          record[6] = True
+        elif record != None:
+          bases = len(line.rstrip(b"\r\n"))
+          if record[6]:
+            raise ValueError("%s: sequence '%s' has a blank line inside it" % (fn,record[0]))
+          if record[5]:
+            raise ValueError("%s: sequence '%s' has lines of different lengths" % (fn,record[0]))
+          if record[3] == 0:
+            (record[3],record[4]) = (bases,len(line))
+          elif bases != record[3] or len(line) != record[4]:
+            if bases > record[3]:
+              raise ValueError("%s: sequence '%s' has lines of different lengths" % (fn,record[0]))
+            record[5] = True
+          record[1] += bases
+        pos += len(line)
+    if record != None:
+      idx.add(*record[0:5])
+    return idx
+
+  def save(self,fn):
+    with open(fn,"w") as fd:
+      for name in self.names:
+        fd.write("%s\t%d\t%d\t%d\t%d\n" % ((name,) + self.entries[name]))
+
+  @classmethod
+  def load(cls,fn):
+    idx = cls()
+    with open(fn) as fd:
+      for line in fd:
+        flds = line.rstrip("\n").split("\t")
+        idx.add(flds[0],*[int(f) for f in flds[1:5]])
+    return idx
+
+################################################################################
+#
+# class FastaFile -- ranges of the sequences of an indexed file.
+
+class FastaFile:
+
+  def __init__(self,fn,start=0,indexFN=None):
+    if os.path.splitext(fn)[1] in (".gz",".bgz"):
+      raise ValueError("%s: compressed FASTA cannot be memory-mapped, decompress it first" % (fn,))
+    self.fn = fn
+    indexFN = indexFN or fn + ".fai"
+    if os.path.exists(indexFN) and os.path.getmtime(indexFN) >= os.path.getmtime(fn):
+      self.index = FastaIndex.load(indexFN)
+    else:
+      self.index = FastaIndex.build(fn,start)
+      try:
+        self.index.save(indexFN)
+      except OSError as ex:
+        logging.getLogger().warning("FASTA cannot write index '%s': %s" % (indexFN,ex))
+    self.fd = open(fn,"rb")
+    self.data = mmap.mmap(self.fd.fileno(),0,access=mmap.ACCESS_READ)
+    self.aliases = {}
+    self.missing = set()
+
+  @classmethod
+  def embedded(cls,fn):
+    """ The ##FASTA section of GFF3 file 'fn', or None if it has none. """
+    if os.path.splitext(fn)[1] in (".gz",".bgz"):
+      raise ValueError("%s: compressed GFF3 cannot be memory-mapped, decompress it first" % (fn,))
+    with open(fn,"rb") as fd:
+      if os.fstat(fd.fileno()).st_size == 0:
+        return None
+      with mmap.mmap(fd.fileno(),0,access=mmap.ACCESS_READ) as data:
+        if data[0:8] == b"##FASTA\n":
+          at = 0
+        else:
+          at = data.find(b"\n##FASTA\n")
+          if at < 0:
+            return None
+          at += 1
+    return cls(fn,start=at + len(b"##FASTA\n"))
+
+  def close(self):
+    self.data.close()
+    self.fd.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self,*exc):
+    self.close()
+
+  def resolve(self,chrom):
+    """ The sequence name for 'chrom', allowing for the renaming done at
+        load ("1" for "chr1" and the reverse, see SymbolTable); None if
+        there is none. """
+    if chrom in self.index:
+      return chrom
+    if chrom not in self.aliases:
+      alts = GffEntry.symbols.aliases(chrom)
+      alts.append(chrom[3:] if chrom.startswith("chr") else "chr" + chrom)
+      found = None
+      for alt in alts:
+        if alt in self.index:
+          found = alt
+          break
+      self.aliases[chrom] = found
+    return self.aliases[chrom]
+
+  def fetch(self,chrom,start,end):
+    """ Bases [start,end) (0-based) of 'chrom', as bytes; clipped to the
+        sequence, and None if there is no such sequence. """
+    name = self.resolve(chrom)
+    if name == None:
+      if chrom not in self.missing:
+        self.missing.add(chrom)
+        logging.getLogger().warning("FASTA no sequence for '%s'" % (chrom,))
+      return None
+    (length,offset,bases,width) = self.index[name]
+    (start,end) = (max(0,start),min(end,length))
+    if start >= end:
+      return b""
+    first = offset + (start // bases) * width + start % bases
+    last = offset + ((end - 1) // bases) * width + (end - 1) % bases + 1
+    seq = self.data[first:last]
+    if width > bases:
+      seq = seq.replace(b"\n",b"").replace(b"\r",b"")
+    return seq
+
+  def spliced(self,chrom,blocks,strand="+"):
+    """ The blocks [(start,end),...] joined in order, reverse-complemented
+        on the minus strand. """
+    parts = []
+    for (s,e) in blocks:
+      seq = self.fetch(chrom,s,e)
+      if seq == None:
+        return None
+      parts.append(seq)
+    seq = b"".join(parts)
+    return reverseComplement(seq) if strand == "-" else seq
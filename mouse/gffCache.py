@@ -0,0 +1,177 @@
+import os
+import os.path
+import logging
+import hashlib
+import pickle
+
+from mouse.gffEntry import GffEntry
+from mouse.gffFile import GffFile
+
+################################################################################
+#
+# class GffCache -- keeps the loaded state of a GffFile on disk, so repeated
+#                   runs over the same annotation skip the parse.
+#
+# Each cache file is a pickle of the entries/parents/offspring tables behind
+# a short header.  The key covers the input path, size and modification
+# time, a digest of the first and last MB of its contents, the
+# GffEntry.EXCLUDE/INCLUDE sets, the load options and the chromosome naming
+# (GffEntry.symbols), so editing the file or the type lists invalidates it.
+# The header also records the input's identity (size, mtime, digest), so
+# caches of an input that has since changed are removed on the next store,
+# while those of the same input loaded with other options are kept.  By
+# default caches live next to the input; when a size limit is given the
+# least recently used ones are removed.
+
+class GffCache:
+
+  VERSION = 3
+  MAGIC = b"mouseAnno-cache\n"
+  SUFFIX = ".gffcache"
+  SAMPLE = 1 << 20
+
+  def __init__(self,cacheDir=None,maxBytes=None):
+    self.cacheDir = cacheDir
+    self.maxBytes = maxBytes
+
+  @staticmethod
+  def contentDigest(fn):
+    h = hashlib.blake2b(digest_size=16)
+    size = os.path.getsize(fn)
+    with open(fn,"rb") as fd:
+      h.update(fd.read(GffCache.SAMPLE))
+      if size > 2 * GffCache.SAMPLE:
+        fd.seek(size - GffCache.SAMPLE)
+        h.update(fd.read(GffCache.SAMPLE))
+      elif size > GffCache.SAMPLE:
+        h.update(fd.read())
+    return h.hexdigest()
+
+  @staticmethod
+  def identity(fn):
+    """ Path, size, modification time and content digest of 'fn', as one
+        string. """
+    st = os.stat(fn)
+    return "%s\t%d\t%d\t%s" % (os.path.abspath(fn),st.st_size,st.st_mtime_ns,
+                               GffCache.contentDigest(fn))
+
+  def key(self,fn,ucsc=True,columnar=False,types=None,identity=None):
+    h = hashlib.blake2b(digest_size=16)
+    parts = [str(GffCache.VERSION),identity or GffCache.identity(fn),
+             ",".join(sorted(GffEntry.EXCLUDE)),
+             ",".join(sorted(GffEntry.INCLUDE)),str(ucsc),str(columnar),
+             "*" if types == None else ",".join(sorted(types)),
+             GffEntry.symbols.signature()]
+    h.update("\t".join(parts).encode())
+    return h.hexdigest()
+
+  def directory(self,fn):
+    if self.cacheDir != None:
+      return self.cacheDir
+    return os.path.dirname(os.path.abspath(fn))
+
+  def path(self,fn,key):
+    return os.path.join(self.directory(fn),
+                        "%s.%s%s" % (os.path.basename(fn),key,GffCache.SUFFIX))
+
+  @staticmethod
+  def header(fd):
+    """ (key,input identity) from the start of a cache file, None if it is
+        not one. """
+    if fd.readline() != GffCache.MAGIC:
+      return None
+    key = fd.readline().decode(errors="replace").strip()
+    identity = fd.readline().decode(errors="replace").rstrip("\n")
+    return (key,identity)
+
+  def fetch(self,fn,ucsc=True,columnar=False,types=None):
+    """ Return the cached GffFile for 'fn', or None. """
+    identity = GffCache.identity(fn)
+    key = self.key(fn,ucsc,columnar,types,identity)
+    cfn = self.path(fn,key)
+    if not os.path.exists(cfn):
+      return None
+    try:
+      with open(cfn,"rb") as fd:
+        if GffCache.header(fd) != (key,identity):
+          logging.getLogger().warning("CACHE ignoring bad cache file '%s'" % (cfn,))
+          return None
+        state = pickle.load(fd)
+    except (OSError,pickle.UnpicklingError,EOFError) as ex:
+      logging.getLogger().warning("CACHE unreadable '%s': %s" % (cfn,ex))
+      return None
+    os.utime(cfn)
+    gff = GffFile(columnar=columnar)
+    gff.types = types
+    gff.entries = state["entries"]
+    gff.parents = gff.entries.parentMap if columnar else state["parents"]
+    gff.offspring = state["offspring"]
+    gff.extents = state["extents"]
+    logging.getLogger().debug("CACHE hit '%s'" % (cfn,))
+    return gff
+
+  def store(self,gff,fn,ucsc=True):
+    identity = GffCache.identity(fn)
+    key = self.key(fn,ucsc,gff.columnar,gff.types,identity)
+    cfn = self.path(fn,key)
+    state = {"entries": gff.entries,
+             "parents": None if gff.columnar else gff.parents,
+             "offspring": gff.offspring,
+             "extents": gff.extents}
+    tmp = "%s.%d.tmp" % (cfn,os.getpid())
+    try:
+      os.makedirs(os.path.dirname(cfn),exist_ok=True)
+      with open(tmp,"wb") as fd:
+        fd.write(GffCache.MAGIC)
+        fd.write(("%s\n%s\n" % (key,identity)).encode())
+        pickle.dump(state,fd,protocol=pickle.HIGHEST_PROTOCOL)
+      os.replace(tmp,cfn)
+    except OSError as ex:
+      logging.getLogger().warning("CACHE cannot write '%s': %s" % (cfn,ex))
+      if os.path.exists(tmp):
+        os.remove(tmp)
+      return None
+    self.removeStale(fn,cfn,identity)
+    if self.maxBytes != None:
+      self.prune(self.directory(fn))
+    return cfn
+
+  def removeStale(self,fn,keep,identity):
+    """ Remove the caches of 'fn' built from an earlier version of it, or
+        in an earlier cache format; those for other load options stay. """
+    prefix = os.path.basename(fn) + "."
+    path = identity.split("\t")[0]
+    d = os.path.dirname(keep)
+    for name in os.listdir(d):
+      full = os.path.join(d,name)
+      if not name.startswith(prefix) or not name.endswith(GffCache.SUFFIX) or full == keep:
+        continue
+      key = name[len(prefix):-len(GffCache.SUFFIX)]
+      if len(key) != 32 or "." in key:
+        continue
+      try:
+        with open(full,"rb") as fd:
+          found = GffCache.header(fd)
+      except OSError:
+        continue
+      if found != None:
+        flds = found[1].split("\t")
+        # same-named inputs elsewhere can share a cache directory
+        if len(flds) == 4 and (flds[0] != path or found[1] == identity):
+          continue
+      os.remove(full)
+      logging.getLogger().debug("CACHE removed stale '%s'" % (name,))
+
+  def prune(self,d):
+    files = []
+    for name in os.listdir(d):
+      if name.endswith(GffCache.SUFFIX):
+        st = os.stat(os.path.join(d,name))
+        files.append((st.st_mtime,st.st_size,name))
+    files.sort()
+    total = sum([f[1] for f in files])
+    while total > self.maxBytes and len(files) > 0:
+      (mtime,size,name) = files.pop(0)
+      os.remove(os.path.join(d,name))
+      total -= size
+      logging.getLogger().debug("CACHE pruned '%s'" % (name,))
@@ -0,0 +1,308 @@
+import os
+import sqlite3
+from collections.abc import Mapping
+
+################################################################################
+#
+# class GffDb -- a GffFile written to SQLite, for lookups without parsing.
+#
+# Tables:
+#   entries(row, id, chrom, source, category, start, end, score, strand,
+#           frame, name)     -- one per entry, in load order
+#   parents(child, parent)   -- child row and parent ID, one per edge
+#   attributes(row, key, value, multi)
+#                            -- every other attribute; multi marks values
+#                               that were comma-separated lists
+#   extents(id, start, end)  -- the span of all the lines of an ID given on
+#                               several lines (CDS), see GffFile.extent
+#   chroms(chrom, maxlen)    -- the longest feature on each chromosome
+# with indexes on ID, Name, category, (chrom, start) and both ends of the
+# parent edges.  A region query bounds start on both sides (no feature
+# starts more than maxlen before the region), so it reads a stretch of the
+# location index rather than the rest of the chromosome.  As in GffStore,
+# an entry is keyed by its ID, or by its row number if it has none.  The
+# entries, parents, offspring and extents mappings give a GffFile backed by
+# the database (GffFile.openDb); each lookup is a query.
+
+SCHEMA = """
+CREATE TABLE meta(key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE entries(row INTEGER PRIMARY KEY, id TEXT, chrom TEXT,
+  source TEXT, category TEXT, start INTEGER, end INTEGER, score TEXT,
+  strand TEXT, frame TEXT, name TEXT);
+CREATE TABLE parents(child INTEGER, parent TEXT);
+CREATE TABLE attributes(row INTEGER, key TEXT, value TEXT, multi INTEGER);
+CREATE TABLE extents(id TEXT PRIMARY KEY, start INTEGER, end INTEGER);
+CREATE TABLE chroms(chrom TEXT PRIMARY KEY, maxlen INTEGER);
+"""
+
+INDEXES = """
+CREATE UNIQUE INDEX entries_id ON entries(id);
+CREATE INDEX entries_name ON entries(name);
+CREATE INDEX entries_category ON entries(category);
+CREATE INDEX entries_location ON entries(chrom,start);
+CREATE INDEX parents_parent ON parents(parent);
+CREATE INDEX parents_child ON parents(child);
+CREATE INDEX attributes_row ON attributes(row);
+"""
+
+# entry columns plus the comma-joined parent IDs
+SELECT = """SELECT e.row,e.id,e.chrom,e.source,e.category,e.start,e.end,
+  e.score,e.strand,e.frame,e.name,
+  (SELECT GROUP_CONCAT(p.parent,',') FROM parents p WHERE p.child = e.row)
+  FROM entries e"""
+
+class GffDb:
+
+  VERSION = "2"
+
+  def __init__(self,fn):
+    if not os.path.exists(fn):
+      raise IOError("%s: no such database" % (fn,))
+    self.fn = fn
+    self.conn = sqlite3.connect(fn)
+    version = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if version == None or version[0] != GffDb.VERSION:
+      raise ValueError("%s: database version %s, expected %s" % (fn,version,GffDb.VERSION))
+    self.entries = DbEntries(self)
+    self.parents = DbParents(self)
+    self.offspring = DbOffspring(self)
+    self.extents = DbExtents(self)
+    self.maxLengths = dict(self.conn.execute("SELECT chrom,maxlen FROM chroms"))
+
+  @staticmethod
+  def build(gff,fn,source=None):
+    """ Write the entries of 'gff' to a new database 'fn'. """
+    tmp = "%s.%d.tmp" % (fn,os.getpid())
+    if os.path.exists(tmp):
+      os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+    (rows,edges,attrs) = ([],[],[])
+    maxLengths = {}
+    for (row,(key,e)) in enumerate(gff.entries.items()):
+      oid = key if isinstance(key,str) else None
+      rows.append((row,oid,e.chrom,e.source,e.category,e.left,e.right,
+                   e.score,e.strand,e.frame,e.name()))
+      if e.right - e.left > maxLengths.get(e.chrom,-1):
+        maxLengths[e.chrom] = e.right - e.left
+      if e.parent != None:
+        for par in sorted(e.parent):
+          edges.append((row,par))
+      for (k,v) in e.attrs.items():
+        if k in ("ID","Parent","Name"):
+          continue
+        if isinstance(v,(set,frozenset,list)):
+          attrs.append((row,k,",".join(sorted(v)),1))
+        else:
+          attrs.append((row,k,v,0))
+    conn.executemany("INSERT INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)",rows)
+    conn.executemany("INSERT INTO parents VALUES (?,?)",edges)
+    conn.executemany("INSERT INTO attributes VALUES (?,?,?,?)",attrs)
+    conn.executemany("INSERT INTO extents VALUES (?,?,?)",
+                     [(oid,left,right) for (oid,(left,right)) in gff.extents.items()])
+    conn.executemany("INSERT INTO chroms VALUES (?,?)",maxLengths.items())
+    conn.executescript(INDEXES)
+    conn.executemany("INSERT INTO meta VALUES (?,?)",
+                     [("version",GffDb.VERSION),("source",source or "")])
+    conn.commit()
+    conn.close()
+    os.replace(tmp,fn)
+    return len(rows)
+
+  def close(self):
+    self.conn.close()
+
+  ##############################################################################
+  #
+  # queries
+
+  @staticmethod
+  def keyOf(row,oid):
+    return row if oid == None else oid
+
+  def rowOf(self,key):
+    """ Row number of 'key', or None. """
+    if isinstance(key,int):
+      found = self.conn.execute("SELECT row FROM entries WHERE row = ? AND id IS NULL",(key,)).fetchone()
+    else:
+      found = self.conn.execute("SELECT row FROM entries WHERE id = ?",(key,)).fetchone()
+    return None if found == None else found[0]
+
+  def select(self,where="",params=()):
+    """ (key,DbRow) for the entries matching 'where', in load order. """
+    for r in self.conn.execute("%s %s ORDER BY e.row" % (SELECT,where),params):
+      yield (GffDb.keyOf(r[0],r[1]),DbRow(self,r))
+
+  def category(self,category):
+    return self.select("WHERE e.category = ?",(category,))
+
+  def named(self,name):
+    return self.select("WHERE e.name = ?",(name,))
+
+  def region(self,chrom,start,end):
+    """ Entries overlapping chrom:start-end (1-based, inclusive). """
+    if chrom not in self.maxLengths:
+      return iter(())
+    return self.select("WHERE e.chrom = ? AND e.start BETWEEN ? AND ? AND e.end >= ?",
+                       (chrom,start - self.maxLengths[chrom],end,start))
+
+  def children(self,key):
+    """ (key,DbRow) of the direct children of 'key'. """
+    return self.select("WHERE e.row IN (SELECT child FROM parents WHERE parent = ?)",(key,))
+
+  def gene(self,key):
+    """ (key,DbRow) of the top of the first-parent chain above 'key'. """
+    seen = set()
+    row = self.entries.get(key)
+    while row != None and row.parent != None and key not in seen:
+      seen.add(key)
+      key = sorted(row.parent)[0]
+      row = self.entries.get(key)
+    return (key,row)
+
+  def describe(self,key,row):
+    """ Tab-separated key, location, name, parents and gene of an entry. """
+    (geneKey,gene) = self.gene(key)
+    parents = "." if row.parent == None else ",".join(sorted(row.parent))
+    geneName = "." if gene == None or gene.name() == None else gene.name()
+    return "%s\t%s\t%s\t%d\t%d\t%s\t%s\t%s\t%s\t%s" % (key,row.chrom,row.category,row.left,row.right,row.strand,row.name() or ".",parents,geneKey,geneName)
+
+################################################################################
+#
+# class DbRow -- one entry, with the GffEntry/GffRow accessors; attributes
+#                other than ID, Parent and Name are read on first use.
+
+class DbRow:
+
+  def __init__(self,db,r):
+    self.db = db
+    self.row = r[0]
+    self.oid = GffDb.keyOf(r[0],r[1])
+    (self.chrom,self.source,self.category,self.left,self.right,self.score,
+     self.strand,self.frame,self.nameValue) = r[2:11]
+    self.parent = None if r[11] == None else set(r[11].split(","))
+    self.attrMap = None
+
+  @property
+  def attrs(self):
+    if self.attrMap == None:
+      attrMap = {}
+      if isinstance(self.oid,str):
+        attrMap["ID"] = self.oid
+      if self.parent != None:
+        attrMap["Parent"] = set(self.parent)
+      if self.nameValue != None:
+        attrMap["Name"] = self.nameValue
+      for (k,v,multi) in self.db.conn.execute("SELECT key,value,multi FROM attributes WHERE row = ?",(self.row,)):
+        attrMap[k] = set(v.split(",")) if multi else v
+      self.attrMap = attrMap
+    return self.attrMap
+
+  def name(self):
+    return self.nameValue
+
+  def fullname(self):
+    return self.attrs.get("fullname",None)
+
+  def attribute(self,attr):
+    return self.attrs.get(attr,"None")
+
+  def attrNames(self):
+    return self.attrs.keys()
+
+################################################################################
+#
+# Mappings onto the database with the shape of the GffFile tables.
+
+class DbEntries(Mapping):
+
+  def __init__(self,db):
+    self.db = db
+
+  def __getitem__(self,key):
+    if isinstance(key,int):
+      found = list(self.db.select("WHERE e.row = ? AND e.id IS NULL",(key,)))
+    else:
+      found = list(self.db.select("WHERE e.id = ?",(key,)))
+    if len(found) == 0:
+      raise KeyError(key)
+    return found[0][1]
+
+  def __contains__(self,key):
+    return self.db.rowOf(key) != None
+
+  def __iter__(self):
+    for (row,oid) in self.db.conn.execute("SELECT row,id FROM entries ORDER BY row"):
+      yield GffDb.keyOf(row,oid)
+
+  def __len__(self):
+    return self.db.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+  def items(self):
+    # one query rather than one per key
+    return list(self.db.select())
+
+  def values(self):
+    return [row for (key,row) in self.db.select()]
+
+class DbParents(Mapping):
+
+  def __init__(self,db):
+    self.db = db
+
+  def __getitem__(self,key):
+    return self.db.entries[key].parent
+
+  def __iter__(self):
+    return iter(self.db.entries)
+
+  def __len__(self):
+    return len(self.db.entries)
+
+class DbExtents(Mapping):
+  """ ID to the (start,end) of all its lines, for IDs on several lines. """
+
+  def __init__(self,db):
+    self.db = db
+
+  def __getitem__(self,key):
+    found = self.db.conn.execute("SELECT start,end FROM extents WHERE id = ?",(key,)).fetchone()
+    if found == None:
+      raise KeyError(key)
+    return found
+
+  def __contains__(self,key):
+    return isinstance(key,str) and self.db.conn.execute("SELECT 1 FROM extents WHERE id = ?",(key,)).fetchone() != None
+
+  def __iter__(self):
+    for (oid,) in self.db.conn.execute("SELECT id FROM extents"):
+      yield oid
+
+  def __len__(self):
+    return self.db.conn.execute("SELECT COUNT(*) FROM extents").fetchone()[0]
+
+class DbOffspring(Mapping):
+  """ Parent ID to the list of its children's keys; only IDs with
+      children are present. """
+
+  def __init__(self,db):
+    self.db = db
+
+  def __getitem__(self,key):
+    kids = [GffDb.keyOf(row,oid) for (row,oid) in self.db.conn.execute(
+      "SELECT e.row,e.id FROM parents p JOIN entries e ON e.row = p.child WHERE p.parent = ? ORDER BY e.row",(key,))]
+    if len(kids) == 0:
+      raise KeyError(key)
+    return kids
+
+  def __contains__(self,key):
+    return self.db.conn.execute("SELECT 1 FROM parents WHERE parent = ? LIMIT 1",(key,)).fetchone() != None
+
+  def __iter__(self):
+    for (parent,) in self.db.conn.execute("SELECT DISTINCT parent FROM parents"):
+      yield parent
+
+  def __len__(self):
+    return self.db.conn.execute("SELECT COUNT(DISTINCT parent) FROM parents").fetchone()[0]
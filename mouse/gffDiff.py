@@ -0,0 +1,190 @@
+import os
+import os.path
+import glob
+import gzip
+import hashlib
+import logging
+import tempfile
+from collections import Counter
+
+################################################################################
+#
+# class GffDiff -- genes and transcripts added, removed or changed between
+#                  two releases of an annotation.
+#
+# A gene is identified by its ID and compared by a digest of every row in
+# its subtree (the gene, its transcripts and their parts, following
+# offspring); transcripts likewise.  Rows are digested field by field with
+# attributes sorted, so the order of rows and attributes in the file does
+# not matter.  Parentless rows without an ID are identified by their digest,
+# so they can only be added or removed.
+#
+# patch() brings a set of outputs made from the old release up to date:
+# the rows the old release produced for removed and changed genes are
+# taken out of each file, and rows for changed and added genes, generated
+# from the new release, are appended.  Only those genes are regenerated;
+# the patched files hold the same rows as a full rebuild, though not in the
+# same order.
+
+class GffDiff:
+
+  # output kinds patch() knows: file extension of the <base>_<tag> files
+  KINDS = {"track": ".bed","pipeline": ".bed","anno": ".gtf"}
+
+  def __init__(self,old,new):
+    self.old = old
+    self.new = new
+    (oldGenes,oldTranscripts) = GffDiff.digests(old)
+    (newGenes,newTranscripts) = GffDiff.digests(new)
+    (self.addedGenes,self.removedGenes,self.changedGenes) = GffDiff.compare(oldGenes,newGenes)
+    (self.addedTranscripts,self.removedTranscripts,self.changedTranscripts) = GffDiff.compare(oldTranscripts,newTranscripts)
+    self.unchangedGenes = len(oldGenes) - len(self.removedGenes) - len(self.changedGenes)
+    self.oldKeys = dict([(k,v[1]) for (k,v) in oldGenes.items()])
+    self.newKeys = dict([(k,v[1]) for (k,v) in newGenes.items()])
+
+  @staticmethod
+  def rowText(key,e):
+    attrs = []
+    for (k,v) in sorted(e.attrs.items()):
+      if isinstance(v,(set,frozenset,list)):
+        v = ",".join(sorted(v))
+      attrs.append("%s=%s" % (k,v))
+    return "\t".join([key if isinstance(key,str) else "",e.chrom,e.source,
+                      e.category,str(e.left),str(e.right),e.score,e.strand,
+                      e.frame,";".join(attrs)])
+
+  @staticmethod
+  def digest(texts):
+    h = hashlib.blake2b(digest_size=16)
+    for t in sorted(texts):
+      h.update(t.encode())
+      h.update(b"\n")
+    return h.hexdigest()
+
+  @staticmethod
+  def digests(gff):
+    """ Maps of gene and of transcript identity to (digest,key). """
+    lin = gff.lineage()
+    texts = {}
+    genes = {}
+    transcripts = {}
+    for (key,e) in gff.entries.items():
+      if lin.isGene(key) or lin.isTranscript(key):
+        sub = []
+        for k in gff.subtree(key):
+          if k not in texts:
+            texts[k] = GffDiff.rowText(k,gff.entries[k])
+          sub.append(texts[k])
+        d = GffDiff.digest(sub)
+        ident = key if isinstance(key,str) else "~" + d
+        if lin.isGene(key):
+          genes[ident] = (d,key)
+        else:
+          transcripts[ident] = (d,key)
+    return (genes,transcripts)
+
+  @staticmethod
+  def compare(old,new):
+    added = sorted([k for k in new if k not in old])
+    removed = sorted([k for k in old if k not in new])
+    changed = sorted([k for k in new if k in old and old[k][0] != new[k][0]])
+    return (added,removed,changed)
+
+  def summary(self):
+    return {"genesAdded": len(self.addedGenes),
+            "genesRemoved": len(self.removedGenes),
+            "genesChanged": len(self.changedGenes),
+            "genesUnchanged": self.unchangedGenes,
+            "transcriptsAdded": len(self.addedTranscripts),
+            "transcriptsRemoved": len(self.removedTranscripts),
+            "transcriptsChanged": len(self.changedTranscripts)}
+
+  def write(self,fd):
+    s = self.summary()
+    fd.write("# genes: %d added, %d removed, %d changed, %d unchanged\n" % (s["genesAdded"],s["genesRemoved"],s["genesChanged"],s["genesUnchanged"]))
+    fd.write("# transcripts: %d added, %d removed, %d changed\n" % (s["transcriptsAdded"],s["transcriptsRemoved"],s["transcriptsChanged"]))
+    for (what,level,ids,gff) in (("added","gene",self.addedGenes,self.new),
+                                 ("removed","gene",self.removedGenes,self.old),
+                                 ("changed","gene",self.changedGenes,self.new),
+                                 ("added","transcript",self.addedTranscripts,self.new),
+                                 ("removed","transcript",self.removedTranscripts,self.old),
+                                 ("changed","transcript",self.changedTranscripts,self.new)):
+      for ident in ids:
+        name = gff.entries[ident].name() if ident in gff.entries else None
+        fd.write("%s\t%s\t%s\t%s\n" % (what,level,ident,name))
+
+  ##############################################################################
+  #
+  # incremental update of outputs
+
+  @staticmethod
+  def render(gff,kind,base,categories=None,ucsc=False):
+    if kind == "track":
+      gff.makeTrackSet(base,ucsc=ucsc)
+    elif kind == "pipeline":
+      gff.makePipelineSet(base,ucsc=ucsc)
+    elif kind == "anno":
+      gff.makeAnno(categories or "all",ucsc,None,base=base)
+    else:
+      raise ValueError("unknown output kind '%s'" % (kind,))
+
+  @staticmethod
+  def tagsOf(base,ext):
+    """ Map of tag to path for the <base>_<tag><ext>[.gz] files. """
+    tags = {}
+    for pattern in ("_*" + ext,"_*" + ext + ".gz"):
+      for fn in glob.glob(glob.escape(base) + pattern):
+        stem = fn[:-3] if fn.endswith(".gz") else fn
+        tags[stem[len(base)+1:len(stem)-len(ext)]] = fn
+    return tags
+
+  @staticmethod
+  def readLines(fn):
+    if fn == None or not os.path.exists(fn):
+      return []
+    opener = gzip.open if fn.endswith(".gz") else open
+    with opener(fn,"rt") as fd:
+      return fd.read().splitlines(True)
+
+  def patch(self,kind,fromBase,toBase,categories=None,ucsc=False):
+    """ Write <toBase>_<tag> outputs of 'kind' made by patching the
+        <fromBase>_<tag> outputs of the old release.  Returns counts of
+        files written and rows removed, added and expected but missing. """
+    ext = GffDiff.KINDS[kind]
+    gone = [self.oldKeys[k] for k in self.removedGenes + self.changedGenes]
+    fresh = [self.newKeys[k] for k in self.addedGenes + self.changedGenes]
+    counts = Counter()
+    with tempfile.TemporaryDirectory() as tmp:
+      (oldBase,newBase) = (os.path.join(tmp,"old"),os.path.join(tmp,"new"))
+      GffDiff.render(self.old.subset(gone),kind,oldBase,categories,ucsc)
+      GffDiff.render(self.new.subset(fresh),kind,newBase,categories,ucsc)
+      (oldTags,newTags) = (GffDiff.tagsOf(oldBase,ext),GffDiff.tagsOf(newBase,ext))
+      existing = GffDiff.tagsOf(fromBase,ext)
+      for tag in sorted(set(existing) | set(newTags)):
+        drop = Counter(GffDiff.readLines(oldTags.get(tag)))
+        add = GffDiff.readLines(newTags.get(tag))
+        if fromBase == toBase and sum(drop.values()) == 0 and len(add) == 0:
+          continue
+        if tag in existing:
+          fn = toBase + existing[tag][len(fromBase):]
+        else:
+          fn = "%s_%s%s" % (toBase,tag,ext)
+        lines = []
+        for line in GffDiff.readLines(existing.get(tag)):
+          if drop[line] > 0:
+            drop[line] -= 1
+            counts["removed"] += 1
+          else:
+            lines.append(line)
+        counts["missing"] += sum(drop.values())
+        counts["added"] += len(add)
+        counts["files"] += 1
+        tmpFN = "%s.%d.tmp" % (fn,os.getpid())
+        opener = gzip.open if fn.endswith(".gz") else open
+        with opener(tmpFN,"wt") as fd:
+          fd.writelines(lines)
+          fd.writelines(add)
+        os.replace(tmpFN,fn)
+    if counts["missing"] > 0:
+      logging.getLogger().warning("DIFF %d rows of the old release were not in the %s outputs at '%s'; they may not have been made from it" % (counts["missing"],kind,fromBase))
+    return dict(counts)
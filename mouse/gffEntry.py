@@ -1,13 +1,17 @@
-import sys
 import os.path
 import argparse
 import logging
 import re
 
+from mouse.symbols import SymbolTable
+
 ################################################################################
 
 class GffEntry:
 
+  __slots__ = ("chrom","source","category","left","right","score","strand",
+               "frame","attrMap","raw","oid","parent")
+
   EXCLUDE = set(["BAC_cloned_genomic_insert","DNA_motif","RNAi_reagent",
                  "TF_binding_site","breakpoint","chromosome","chromosome_band",
                  "complex_substitution","deletion","enhancer","exon_junction",
@@ -66,6 +70,10 @@ class GffEntry:
                 "MT": "chrM",
                 "mitochondrion_genome": "chrM"}
 
+  # shared strings and chromosome naming for every parse (see SymbolTable);
+  # forked workers inherit it
+  symbols = SymbolTable(CHROM2UCSC)
+
 ################################################################################
 
   @staticmethod
@@ -79,6 +87,14 @@ class GffEntry:
         v = set([v])
       attrMap[k] = v
     return attrMap
+
+  @staticmethod
+  def parseRNAcentralFast(attrs):
+    # same result as parseRNAcentral for well-formed 'key "value"' lists
+    attrMap = dict([attr.split(" ") for attr in attrs.replace("\"","").split(";")])
+    if "Parent" in attrMap:
+      attrMap["Parent"] = set([attrMap["Parent"]])
+    return attrMap
     
   @staticmethod
   def parseAttributes(attrs):
@@ -95,7 +111,49 @@ class GffEntry:
     return attrMap
 
   @staticmethod
-  def parse(line,ucsc=True):
+  def canScan(attrs):
+    """ True if attributes can be read from the raw column 9 with
+        scanAttribute, i.e. no whitespace that parseAttributes would strip. """
+    return ("; " not in attrs and " ;" not in attrs and
+            attrs[0:1] != " " and attrs[-1:] != " ")
+
+  @staticmethod
+  def scanAttribute(attrs,key):
+    """ Value of one attribute of a raw GFF3 column 9, converted as
+        parseAttributes would; None if absent.  The last occurrence wins. """
+    tag = key + "="
+    i = attrs.rfind(";" + tag)
+    if i >= 0:
+      i += len(tag) + 1
+    elif attrs.startswith(tag):
+      i = len(tag)
+    else:
+      return None
+    j = attrs.find(";",i)
+    val = attrs[i:] if j < 0 else attrs[i:j]
+    if key == "Parent" or "," in val:
+      return set(val.split(","))
+    return val
+
+  @staticmethod
+  def skipLine(line,types=None):
+    """ True if the line can be dropped on its type column alone: the type
+        is excluded, or is known but not in 'types'.  Unknown types are kept
+        so parse() can report them; RNAcentral rows take their type from
+        the attributes, so only parse() can filter those.  Loaders call
+        it only when filtering on 'types': without that, parse() drops
+        the excluded rows itself and the extra scan is pure cost. """
+    a = line.find("\t")
+    b = line.find("\t",a+1)
+    entryType = line[b+1:line.find("\t",b+1)]
+    if entryType in GffEntry.EXCLUDE:
+      return True
+    if types == None or entryType in types or entryType not in GffEntry.INCLUDE:
+      return False
+    return line[a+1:b] != "RNAcentral"
+
+  @staticmethod
+  def parse(line,ucsc=True,lazy=False):
     flds = line.strip().split("\t")
     entryType = flds[2]
     if entryType in GffEntry.EXCLUDE:
@@ -103,27 +161,36 @@ class GffEntry:
     elif entryType not in GffEntry.INCLUDE:
       logging.getLogger().warning("UNKNOWN entryType '%s'" % (entryType,))
       return None
+    raw = None
     if flds[1] == "RNAcentral":
-      attrMap = GffEntry.parseRNAcentral(flds[8])
+      if lazy:
+        attrMap = GffEntry.parseRNAcentralFast(flds[8])
+      else:
+        attrMap = GffEntry.parseRNAcentral(flds[8])
+    elif lazy and GffEntry.canScan(flds[8]):
+      attrMap = None
+      raw = flds[8]
     else:
       attrMap = GffEntry.parseAttributes(flds[8])
 
-    if flds[2] == 'mRNA' and attrMap['Parent'] == None:
-      sys.stderr.write("Line '%s': parent missing from mRNA\n" % (line.strip(),))
-    if flds[2] == 'mRNA' and (attrMap['Parent'] != None and len(attrMap['Parent']) == 0):
-      sys.stderr.write("Line '%s': parent set empty\n" % (line.strip(),))
-    chrom = flds[0]
-    if ucsc:
-      chrom = GffEntry.CHROM2UCSC[chrom] if chrom in GffEntry.CHROM2UCSC else chrom
+    if flds[2] == 'mRNA':
+      parent = attrMap.get('Parent') if raw == None else GffEntry.scanAttribute(raw,'Parent')
+      if parent == None:
+        logging.getLogger().warning("mRNA missing parents: line '%s'" % (line.strip(),))
+      elif len(parent) == 0:
+        logging.getLogger().warning("mRNA missing parents (empty set): line '%s'" % (line.strip(),))
+    sym = GffEntry.symbols
+    intern = sym.intern
+    chrom = sym.chrom(flds[0]) if ucsc else intern(flds[0])
     if flds[1] == "RNAcentral":
-      entry = GffEntry(chrom,flds[1],attrMap['type'],flds[3],flds[4],flds[5],flds[6],flds[7],attrMap)
+      entry = GffEntry(chrom,intern(flds[1]),intern(attrMap['type']),flds[3],flds[4],intern(flds[5]),flds[6],flds[7],attrMap)
     else:
-      entry = GffEntry(chrom,flds[1],flds[2],flds[3],flds[4],flds[5],flds[6],flds[7],attrMap)
+      entry = GffEntry(chrom,intern(flds[1]),intern(flds[2]),flds[3],flds[4],intern(flds[5]),flds[6],flds[7],attrMap,raw)
     return entry
 
 ################################################################################
 
-  def __init__(self,chrom,source,fType,left,right,score,strand,frame,attrDict):
+  def __init__(self,chrom,source,fType,left,right,score,strand,frame,attrDict,raw=None):
     self.chrom = chrom
     self.source = source
     self.category = fType
@@ -132,17 +199,36 @@ class GffEntry:
     self.score = score
     self.strand = strand
     self.frame = frame
-    self.attrs = attrDict
-    self.oid = self.attrs["ID"] if "ID" in self.attrs else id(self)
+    # with 'raw' (lazy mode) only ID and Parent are read now; the full
+    # attribute map is decoded from the raw column 9 on first use
+    self.attrMap = attrDict
+    self.raw = raw
+    if raw == None:
+      oid = self.attrMap["ID"] if "ID" in self.attrMap else None
+      self.parent = self.attrMap["Parent"] if "Parent" in self.attrMap else None
+    else:
+      oid = GffEntry.scanAttribute(raw,"ID")
+      self.parent = GffEntry.scanAttribute(raw,"Parent")
+    self.oid = oid if oid != None else id(self)
     if self.oid == id(self) and fType not in ("exon","CDS","three_prime_UTR","five_prime_UTR","intron"):
       logging.getLogger().warning("ENTRY missing ID: %s:%d-%d %s %s" % (self.chrom,self.left,self.right,self.source,self.category))
-    self.parent = self.attrs["Parent"] if "Parent" in self.attrs else None
+
+  @property
+  def attrs(self):
+    if self.attrMap == None:
+      self.attrMap = GffEntry.parseAttributes(self.raw)
+      self.raw = None
+    return self.attrMap
 
   def name(self):
-    return self.attrs.get("Name",None)
+    if self.raw != None:
+      return GffEntry.scanAttribute(self.raw,"Name")
+    return self.attrMap.get("Name",None)
 
   def fullname(self):
-    return self.attrs.get("fullname",None)
+    if self.raw != None:
+      return GffEntry.scanAttribute(self.raw,"fullname")
+    return self.attrMap.get("fullname",None)
 
   def attribute(self,attr):
     return self.attrs.get(attr,"None")
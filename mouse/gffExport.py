@@ -0,0 +1,160 @@
+import os
+import shutil
+import logging
+import subprocess
+import multiprocessing
+
+from mouse.tabix import TabixWriter
+
+################################################################################
+#
+# Per-chromosome export.
+#
+# The entries of a GffFile are partitioned by the chromosome of their gene
+# (so a gene's transcripts and parts always land together), each partition
+# is rendered by the ordinary GffFile exporters in a worker process, and the
+# rendered rows are sorted by start and end.  Partitions are written in
+# chromosome name order (the byte order of LC_ALL=C sort), so the output is
+# what 'sort -k1,1 -k2,2n' gives and can go straight to bedToBigBed or
+# tabix.  The workers are forked and read the GffFile they inherit; only the
+# list of keys of a partition and its rendered text cross the process
+# boundary.
+
+class Collector:
+  """ Stand-in for a LineWriter that keeps the lines written to it. """
+
+  def __init__(self,lines):
+    self.lines = lines
+
+  def write(self,line):
+    self.lines.append(line)
+
+################################################################################
+
+class GffExporter:
+
+  # the GffFile being exported, for the forked workers
+  source = None
+
+  def __init__(self,gff,workers=1):
+    self.gff = gff
+    self.workers = workers
+
+  def partitions(self):
+    """ Map of chromosome to the keys of the entries placed on it, in load
+        order; entries go with their gene, orphans with their own row. """
+    lin = self.gff.lineage()
+    entries = self.gff.entries
+    parts = {}
+    for (key,e) in entries.items():
+      row = lin.get(key)
+      chrom = e.chrom if row == None or row[0] not in entries else entries[row[0]].chrom
+      if chrom not in parts:
+        parts[chrom] = []
+      parts[chrom].append(key)
+    return parts
+
+  @staticmethod
+  def sortKey(line,col):
+    flds = line.split("\t",col + 2)
+    return (int(flds[col]),int(flds[col+1]),line)
+
+  @staticmethod
+  def renderPartition(unit):
+    """ Render one partition; returns a map of output tag to its sorted text. """
+    (keys,kind,categories,shared) = unit
+    gff = GffExporter.source
+    sub = gff.__class__()
+    for key in keys:
+      sub.addEntry(gff.entries[key])
+    tagged = {}
+    if kind == "anno":
+      col = 3
+      writers = {}
+      for c in categories:
+        tag = "" if shared else c
+        if tag not in tagged:
+          tagged[tag] = []
+        writers[c] = Collector(tagged[tag])
+      sub.writeAnno(categories,writers)
+    else:
+      col = 1
+      lines = sub.trackLines() if kind == "track" else sub.pipelineLines()
+      for (tag,line) in lines:
+        if tag not in tagged:
+          tagged[tag] = []
+        tagged[tag].append(line + "\n")
+    result = {}
+    for (tag,lines) in tagged.items():
+      lines.sort(key=lambda l: GffExporter.sortKey(l,col))
+      result[tag] = "".join(lines)
+    return result
+
+  def render(self,kind,categories=None,shared=False):
+    """ Yield the rendered partitions in chromosome order. """
+    parts = self.partitions()
+    units = [(parts[c],kind,categories,shared) for c in sorted(parts)]
+    GffExporter.source = self.gff
+    try:
+      if self.workers > 1 and len(units) > 1:
+        with multiprocessing.get_context("fork").Pool(self.workers) as pool:
+          for result in pool.imap(GffExporter.renderPartition,units):
+            yield result
+      else:
+        for unit in units:
+          yield GffExporter.renderPartition(unit)
+    finally:
+      GffExporter.source = None
+
+  def trackOutput(self,fds,base,tag,fmt):
+    if tag not in fds:
+      if fmt == "tabix":
+        fds[tag] = TabixWriter("%s_%s.bed.gz" % (base,tag),"bed")
+      else:
+        fds[tag] = open("%s_%s.bed" % (base,tag),"w")
+    return fds[tag]
+
+  def writeTracks(self,kind,base,fmt="bed",chromSizes=None):
+    """ Write <base>_<tag> BED files: plain ("bed"), BGZF with a tabix
+        index ("tabix"), or converted to bigBed ("bigbed"). """
+    fds = {}
+    for result in self.render(kind):
+      for (tag,text) in result.items():
+        self.trackOutput(fds,base,tag,fmt).write(text)
+    for fd in fds.values():
+      fd.close()
+    if fmt == "bigbed":
+      for tag in fds:
+        GffExporter.bigBed("%s_%s.bed" % (base,tag),"%s_%s.bb" % (base,tag),chromSizes)
+
+  @staticmethod
+  def bigBed(bedFN,bbFN,chromSizes):
+    """ Convert sorted 'bedFN' with UCSC bedToBigBed; the BED file is
+        removed on success and kept if the conversion cannot be done. """
+    tool = shutil.which("bedToBigBed")
+    if tool == None or chromSizes == None:
+      logging.getLogger().error("BIGBED needs bedToBigBed on the PATH and a chrom sizes file; leaving '%s'" % (bedFN,))
+      return False
+    with open(bedFN) as fd:
+      first = fd.readline()
+    fields = len(first.rstrip("\n").split("\t")) if len(first) > 0 else 6
+    status = subprocess.call([tool,"-type=bed%d" % (fields,),bedFN,chromSizes,bbFN])
+    if status != 0:
+      logging.getLogger().error("BIGBED bedToBigBed failed (%d) on '%s'" % (status,bedFN))
+      return False
+    os.remove(bedFN)
+    return True
+
+  def makeTrackSet(self,base,fmt="bed",chromSizes=None):
+    self.writeTracks("track",base,fmt,chromSizes)
+
+  def makePipelineSet(self,base,fmt="bed",chromSizes=None):
+    self.writeTracks("pipeline",base,fmt,chromSizes)
+
+  def writeAnno(self,categories,writers):
+    """ As GffFile.writeAnno, into a map of category to LineWriter. """
+    shared = len(set(writers.values())) == 1 and len(categories) > 1
+    for result in self.render("anno",categories,shared):
+      for (tag,text) in result.items():
+        if len(text) > 0:
+          writers[categories[0] if tag == "" else tag].write(text)
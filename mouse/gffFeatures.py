@@ -0,0 +1,246 @@
+from array import array
+from operator import sub
+from itertools import accumulate, compress, repeat
+
+from mouse.gffStore import Codes
+
+################################################################################
+#
+# class TranscriptArrays -- the exons of every transcript as flat arrays.
+#
+# Transcripts (in load order) are numbered 0..n-1 and their exons, sorted by
+# start, are stored end to end in exonStarts/exonEnds; the exons of
+# transcript i are rows offsets[i]:offsets[i+1] (compressed sparse rows).
+# Coordinates are 0-based, half-open, as in BED.  A transcript without exon
+# children is its own single exon, as in the BED12 tracks.  cdsStarts/
+# cdsEnds are the bounds of the transcript's CDS (all its lines, see
+# GffFile.extent), -1 if it has none.
+#
+# The derivations (introns, TSS/TES, spliced, CDS and UTR lengths) work on
+# whole columns at once with map, accumulate and compress, rather than
+# looping over transcripts and their offspring.  sequences() cuts the same
+# blocks out of a memory-mapped FastaFile, one record at a time.
+
+NONE = -1
+
+class TranscriptArrays:
+
+  def __init__(self):
+    self.ids = []
+    self.chroms = Codes()
+    self.chromCol = array('H')
+    self.strands = array('b')        # +1, or -1 for the minus strand
+    self.txStarts = array('q')
+    self.txEnds = array('q')
+    self.cdsStarts = array('q')
+    self.cdsEnds = array('q')
+    self.offsets = array('q',[0])
+    self.exonStarts = array('q')
+    self.exonEnds = array('q')
+
+  @classmethod
+  def build(cls,gff):
+    ta = cls()
+    lin = gff.lineage()
+    entries = gff.entries
+    for (key,e) in entries.items():
+      if not lin.isTranscript(key):
+        continue
+      (exons,cds) = ([],[])
+      for kid in gff.offspring.get(key,[]):
+        x = entries[kid]
+        if x.category == "exon":
+          exons.append((x.left-1,x.right))
+        elif x.category == "CDS":
+          (left,right) = gff.extent(kid)
+          cds.append((left-1,right))
+      if len(exons) == 0:
+        exons.append((e.left-1,e.right))
+      exons.sort()
+      ta.ids.append(key)
+      ta.chromCol.append(ta.chroms.code(e.chrom))
+      ta.strands.append(-1 if e.strand == "-" else 1)
+      ta.txStarts.append(min(e.left-1,exons[0][0]))
+      ta.txEnds.append(max(e.right,max([x[1] for x in exons])))
+      if len(cds) > 0:
+        ta.cdsStarts.append(min([c[0] for c in cds]))
+        ta.cdsEnds.append(max([c[1] for c in cds]))
+      else:
+        ta.cdsStarts.append(NONE)
+        ta.cdsEnds.append(NONE)
+      ta.exonStarts.extend([x[0] for x in exons])
+      ta.exonEnds.extend([x[1] for x in exons])
+      ta.offsets.append(len(ta.exonStarts))
+    return ta
+
+  def __len__(self):
+    return len(self.ids)
+
+  def chrom(self,i):
+    return self.chroms.name(self.chromCol[i])
+
+  def strand(self,i):
+    return "-" if self.strands[i] < 0 else "+"
+
+  def exons(self,i):
+    """ [(start,end),...] of transcript i. """
+    (lo,hi) = (self.offsets[i],self.offsets[i+1])
+    return list(zip(self.exonStarts[lo:hi],self.exonEnds[lo:hi]))
+
+  ##############################################################################
+  #
+  # column helpers
+
+  def exonCounts(self):
+    return array('q',map(sub,self.offsets[1:],self.offsets[:-1]))
+
+  def owners(self):
+    """ Transcript number of each exon row. """
+    result = array('q')
+    for (i,n) in enumerate(self.exonCounts()):
+      result.extend(repeat(i,n))
+    return result
+
+  def segmentSums(self,values):
+    """ Per-transcript sums of a per-exon column. """
+    cum = array('q',accumulate(values,initial=0))
+    at = array('q',map(cum.__getitem__,self.offsets))
+    return array('q',map(sub,at[1:],at[:-1]))
+
+  ##############################################################################
+  #
+  # derivations
+
+  def tss(self):
+    """ 0-based position of each transcript's first base. """
+    return array('q',[s if d > 0 else e - 1 for (s,e,d) in zip(self.txStarts,self.txEnds,self.strands)])
+
+  def tes(self):
+    """ 0-based position of each transcript's last base. """
+    return array('q',[e - 1 if d > 0 else s for (s,e,d) in zip(self.txStarts,self.txEnds,self.strands)])
+
+  def splicedLengths(self):
+    return self.segmentSums(map(sub,self.exonEnds,self.exonStarts))
+
+  def introns(self):
+    """ (owners,starts,ends,numbers): one row per gap between consecutive
+        exons of a transcript, numbered in the direction of transcription. """
+    owners = self.owners()
+    first = self.offsets
+    # an intron follows exon j unless exon j+1 starts the next transcript
+    keep = [owners[j] == owners[j+1] and self.exonEnds[j] < self.exonStarts[j+1]
+            for j in range(len(owners) - 1)]
+    rows = list(compress(range(len(keep)),keep))
+    counts = self.exonCounts()
+    iOwners = array('q',[owners[j] for j in rows])
+    starts = array('q',[self.exonEnds[j] for j in rows])
+    ends = array('q',[self.exonStarts[j+1] for j in rows])
+    numbers = array('q',[j - first[t] + 1 if self.strands[t] > 0 else counts[t] - (j - first[t]) - 1
+                         for (j,t) in zip(rows,iOwners)])
+    return (iOwners,starts,ends,numbers)
+
+  def codingLengths(self):
+    """ (cds,utr5,utr3): exonic bases inside the CDS bounds and before and
+        after them in the direction of transcription; 0 for non-coding
+        transcripts. """
+    owners = self.owners()
+    (cs,ce) = (self.cdsStarts,self.cdsEnds)
+    inside = []
+    left = []
+    right = []
+    for (s,e,t) in zip(self.exonStarts,self.exonEnds,owners):
+      if cs[t] == NONE:
+        inside.append(0)
+        left.append(0)
+        right.append(0)
+        continue
+      inside.append(max(0,min(e,ce[t]) - max(s,cs[t])))
+      left.append(max(0,min(e,cs[t]) - s))
+      right.append(max(0,e - max(s,ce[t])))
+    cds = self.segmentSums(inside)
+    (left,right) = (self.segmentSums(left),self.segmentSums(right))
+    utr5 = array('q',[l if d > 0 else r for (l,r,d) in zip(left,right,self.strands)])
+    utr3 = array('q',[r if d > 0 else l for (l,r,d) in zip(left,right,self.strands)])
+    return (cds,utr5,utr3)
+
+  ##############################################################################
+  #
+  # exports
+
+  def writeIntrons(self,fd):
+    """ BED6, named <transcript>_intron<n>. """
+    (owners,starts,ends,numbers) = self.introns()
+    for (t,s,e,n) in zip(owners,starts,ends,numbers):
+      fd.write("%s\t%d\t%d\t%s_intron%d\t0\t%s\n" % (self.chrom(t),s,e,self.ids[t],n,self.strand(t)))
+
+  def writeEnds(self,fd,which="tss",window=0):
+    """ BED6 of each transcript's TSS or TES, widened by 'window' bases on
+        each side. """
+    points = self.tss() if which == "tss" else self.tes()
+    for (i,p) in enumerate(points):
+      fd.write("%s\t%d\t%d\t%s\t0\t%s\n" % (self.chrom(i),max(0,p - window),p + window + 1,self.ids[i],self.strand(i)))
+
+  LENGTH_HEADER = "transcript_id\tgene_id\tgene_name\tchrom\tstart\tend\tstrand\texons\tlength\tcds\tutr5\tutr3\n"
+
+  def writeLengths(self,fd,lin=None):
+    """ TSV of exon count and spliced, CDS and UTR lengths per transcript. """
+    fd.write(TranscriptArrays.LENGTH_HEADER)
+    (cds,utr5,utr3) = self.codingLengths()
+    rows = zip(self.ids,self.txStarts,self.txEnds,self.exonCounts(),
+               self.splicedLengths(),cds,utr5,utr3)
+    for (i,(key,s,e,n,length,c,u5,u3)) in enumerate(rows):
+      row = None if lin == None else lin.get(key)
+      (gene,name) = (".",".") if row == None else (row[0],row[2] or ".")
+      fd.write("%s\t%s\t%s\t%s\t%d\t%d\t%s\t%d\t%d\t%d\t%d\t%d\n" % (key,gene,name,self.chrom(i),s,e,self.strand(i),n,length,c,u5,u3))
+
+  ##############################################################################
+  #
+  # sequences
+
+  SEQUENCE_KINDS = ("transcript","cds","exon")
+
+  def blocks(self,i,kind):
+    """ The exon blocks of transcript i, clipped to the CDS for "cds" (empty
+        if it has none). """
+    exons = self.exons(i)
+    if kind != "cds":
+      return exons
+    (cs,ce) = (self.cdsStarts[i],self.cdsEnds[i])
+    if cs == NONE:
+      return []
+    return [(max(s,cs),min(e,ce)) for (s,e) in exons if s < ce and e > cs]
+
+  def sequences(self,fasta,kind="transcript"):
+    """ Yield (name,location,sequence) for every transcript, CDS or exon,
+        spliced and reverse-complemented on the minus strand, reading
+        'fasta' (a FastaFile) as it goes. """
+    for i in range(len(self)):
+      (chrom,strand) = (self.chrom(i),self.strand(i))
+      blocks = self.blocks(i,kind)
+      if len(blocks) == 0:
+        continue
+      if kind == "exon":
+        numbered = list(enumerate(blocks,1))
+        if strand == "-":
+          numbered = [(len(blocks) - n + 1,b) for (n,b) in numbered]
+        for (n,(s,e)) in numbered:
+          seq = fasta.spliced(chrom,[(s,e)],strand)
+          if seq != None:
+            yield ("%s_exon%d" % (self.ids[i],n),"%s:%d-%d(%s)" % (chrom,s+1,e,strand),seq)
+        continue
+      seq = fasta.spliced(chrom,blocks,strand)
+      if seq != None:
+        yield (self.ids[i],"%s:%d-%d(%s)" % (chrom,blocks[0][0]+1,blocks[-1][1],strand),seq)
+
+  def writeSequences(self,fd,fasta,kind="transcript",width=60):
+    """ FASTA of sequences(), 'width' bases per line; returns the number of
+        records written. """
+    n = 0
+    for (name,location,seq) in self.sequences(fasta,kind):
+      fd.write(">%s %s\n" % (name,location))
+      seq = seq.decode("ascii")
+      for pos in range(0,len(seq),width):
+        fd.write(seq[pos:pos+width])
+        fd.write("\n")
+      n += 1
+    return n
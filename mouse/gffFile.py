@@ -1,9 +1,21 @@
 import sys
 import os.path
+import time
 import logging
-import gzip
 
 from mouse.gffEntry import GffEntry
+from mouse.gffStore import GffStore
+from mouse.gffReader import GffReader
+from mouse.gffParallel import ParallelLoader
+from mouse.gffMerge import GffMerger
+from mouse.gffExport import GffExporter
+from mouse.gffIndex import IntervalIndex
+from mouse.lineWriter import LineWriter, openOutput
+from mouse.tabix import TabixWriter
+from mouse.gffLineage import Lineage
+from mouse.gffDb import GffDb
+from mouse.gffReport import GffReport
+from mouse.gffFeatures import TranscriptArrays
 
 ################################################################################
 #
@@ -26,45 +38,225 @@ class GffFile:
   TOP_LEVEL = set(["gene","transposable_element","miRNA","miRNA_5p",
                    "miRNA_3p","miRNA_precursor"])
 
-  def __init__(self):
-    self.entries = {}
-    self.parents = {}
+  def __init__(self,columnar=False,lazy=False):
+    self.columnar = columnar
+    self.lazy = lazy
+    if columnar:
+      self.entries = GffStore()
+      self.parents = self.entries.parentMap
+    else:
+      self.entries = {}
+      self.parents = {}
     self.offspring = {}
+    self.extents = {}
+    self.inputs = []
+    self.origins = {}
+    self.lineageTable = None
+    self.reportColumns = None
+    self.transcriptColumns = None
+    self.types = None
+    self.loadStats = None
 
   @classmethod
-  def open(self,fn):
-    split = os.path.splitext(fn)
-    if split[1] == ".gz":
-      fd = gzip.open(fn,"rt")
-    else:
-      fd = open(fn)
-    return fd
+  def open(self,fn,threads=1):
+    return GffReader(fn,threads=threads)
+
+  @classmethod
+  def openDb(cls,fn):
+    """ A GffFile whose tables are read from a GffDb as they are used. """
+    db = GffDb(fn)
+    gff = cls()
+    gff.db = db
+    gff.entries = db.entries
+    gff.parents = db.parents
+    gff.offspring = db.offspring
+    gff.extents = db.extents
+    return gff
 
-  def load(self,fn,fd):
+  def load(self,fn,fd,workers=1,types=None,timed=False):
+    """ Load entries from the lines of 'fd'.  With 'types', rows of other
+        types are dropped before parsing; counts and an estimate of the
+        time that saved are left in loadStats, along with a breakdown of
+        the load time if 'timed'. """
+    self.types = types
+    if workers > 1:
+      if ParallelLoader.canSplit(fn):
+        fd.close()
+        ParallelLoader(workers,lazy=self.lazy,types=types).load(self,fn)
+        return
+      logging.getLogger().info("'%s' is not splittable, loading serially" % (fn,))
+    clock = time.perf_counter
+    started = clock()
+    (lines,skipped,filtered,parsed,sampled) = (0,0,0,0,0)
+    (parseSeconds,addSeconds,sampleSeconds) = (0.0,0.0,0.0)
     for line in fd:
       if line == "##FASTA\n":
         break
       elif line[0] == "#":
         continue
+      lines += 1
+      if timed:
+        t0 = clock()
+      if types != None and GffEntry.skipLine(line,types):
+        skipped += 1
+        continue
+      entry = GffEntry.parse(line,lazy=self.lazy)
+      if entry == None:
+        continue
+      if types != None and entry.category not in types:
+        filtered += 1
+        continue
+      if timed:
+        # attribute decoding is estimated from a sample of lines, parsed
+        # again on their own
+        t1 = clock()
+        parseSeconds += t1 - t0
+        parsed += 1
+        if parsed % GffFile.ATTRIBUTE_SAMPLE == 0 and entry.source != "RNAcentral":
+          attrs = line.rstrip("\n").split("\t",8)[8]
+          GffEntry.parseAttributes(attrs)
+          t2 = clock()
+          sampleSeconds += t2 - t1
+          sampled += 1
+          t1 = t2
+        self.addEntry(entry)
+        addSeconds += clock() - t1
       else:
-        entry = GffEntry.parse(line)
-        if entry == None:
-          continue
-        if entry.oid in self.entries and entry.category != "transposable_element":
-          logging.getLogger().warning("SKIPPING duplicate id: %s" % (entry.oid,))
-        else:
-          self.entries[entry.oid] = entry
-          self.parents[entry.oid] = entry.parent
-          if entry.parent != None and len(entry.parent) > 0:
-            for par in entry.parent:
-              if par not in self.offspring:
-                self.offspring[par] = set()
-              self.offspring[par].add(entry.oid)
-          elif entry.category == 'mRNA' and entry.oid not in self.parents:
-            sys.stderr.write("mRNA missing parents: %s" % (entry.oid))
-          elif entry.category == 'mRNA' and len(self.parents[oid]) == 0:
-            sys.stderr.write("mRNA zero parents: %s" % (entry.oid))
+        self.addEntry(entry)
     fd.close()
+    self.setLoadStats(lines,skipped,clock() - started,filtered)
+    if timed:
+      self.loadStats["parseSeconds"] = parseSeconds
+      self.loadStats["attributeSeconds"] = sampleSeconds * parsed / sampled if sampled > 0 and not self.lazy else 0.0
+      self.loadStats["offspringSeconds"] = addSeconds
+      if isinstance(fd,GffReader):
+        self.loadStats["read"] = fd.stats()
+
+  # with 'timed', one line in ATTRIBUTE_SAMPLE has its attributes parsed
+  # again on its own
+  ATTRIBUTE_SAMPLE = 64
+
+  def loadFiles(self,fns,workers=1,types=None,precedence=None,collisions="keep",labels=None):
+    """ Load and merge several files, up to 'workers' at a time; see
+        GffMerger for the precedence and collision rules. """
+    GffMerger(fns,labels,precedence,collisions).load(self,workers,types)
+
+  def origin(self,key):
+    """ The input file entry 'key' was merged from, or None. """
+    i = self.origins.get(key)
+    return None if i == None else self.inputs[i]
+
+  def setLoadStats(self,lines,skipped,seconds,filtered=0):
+    # 'skipped' rows were dropped before parsing, 'filtered' ones (RNAcentral
+    # rows, typed in their attributes) only after; the time saved is
+    # estimated from the mean cost of all the rows we parsed
+    parsed = lines - skipped
+    saved = skipped * seconds / parsed if parsed > 0 else 0.0
+    self.loadStats = {"lines": lines,"skipped": skipped,"filtered": filtered,
+                      "seconds": seconds,"savedSeconds": saved}
+    if self.types != None:
+      logging.getLogger().info("FILTER skipped %d of %d rows before parsing, about %.2fs saved; %d more dropped after parsing" % (skipped,lines,saved,filtered))
+
+  @staticmethod
+  def typesFor(categories):
+    """ Entry types makeAnno needs for 'categories': top-level categories
+        need only themselves, transcripts their genes and exons, and parts
+        their transcripts and genes. """
+    categories = GffFile.annoCategories(categories)
+    parts = GffFile.TRANSCRIPT_PARTS | set(["noncoding_exon"])
+    types = set()
+    for c in categories:
+      if c in GffFile.TOP_LEVEL:
+        types.add(c)
+      elif c in GffFile.TRANSCRIPTS:
+        types |= GffEntry.INCLUDE - parts
+        types.add("exon")
+      else:
+        types |= GffEntry.INCLUDE - parts
+        types.add(c)
+    return types
+
+  def addEntry(self,entry,origin=None):
+    self.lineageTable = None
+    self.reportColumns = None
+    self.transcriptColumns = None
+    if entry.oid in self.entries and entry.category != "transposable_element":
+      if entry.category in GffFile.MULTI_LINE:
+        self.widen(entry)
+      logging.getLogger().warning("SKIPPING duplicate id: %s" % (entry.oid,))
+      return False
+    if self.columnar:
+      oid = self.entries.add(entry)
+    else:
+      oid = entry.oid
+      self.entries[oid] = entry
+      self.parents[oid] = entry.parent
+    if origin != None:
+      self.origins[oid] = origin
+    if entry.parent != None and len(entry.parent) > 0:
+      for par in entry.parent:
+        if par not in self.offspring:
+          self.offspring[par] = [] if self.columnar else set()
+        kids = self.offspring[par]
+        if self.columnar:
+          kids.append(oid)
+        else:
+          kids.add(oid)
+    elif entry.category == 'mRNA' and oid not in self.parents:
+      sys.stderr.write("mRNA missing parents: %s" % (oid))
+    elif entry.category == 'mRNA' and len(self.parents[oid]) == 0:
+      sys.stderr.write("mRNA zero parents: %s" % (oid))
+    return True
+
+  # categories whose features may span several lines sharing one ID (a CDS
+  # in Ensembl); only the first line is kept, but 'extents' records the
+  # (left,right) the lines cover together
+  MULTI_LINE = set(["CDS"])
+
+  def widen(self,entry):
+    first = self.entries[entry.oid]
+    (left,right) = self.extents.get(entry.oid,(first.left,first.right))
+    self.extents[entry.oid] = (min(left,entry.left),max(right,entry.right))
+
+  def extent(self,oid):
+    """ (left,right) of all the lines of entry 'oid'. """
+    if oid in self.extents:
+      return self.extents[oid]
+    e = self.entries[oid]
+    return (e.left,e.right)
+
+  def lineage(self):
+    """ The Lineage of every entry, built on first use after a load. """
+    if self.lineageTable == None:
+      self.lineageTable = Lineage.build(self)
+    return self.lineageTable
+
+  def intervalIndex(self,categories=None):
+    return IntervalIndex.build(self,categories)
+
+  def subtree(self,oid):
+    """ Keys of 'oid' and everything below it in offspring. """
+    keys = [oid]
+    seen = set(keys)
+    pos = 0
+    while pos < len(keys):
+      for kid in self.offspring.get(keys[pos],[]):
+        if kid not in seen:
+          seen.add(kid)
+          keys.append(kid)
+      pos += 1
+    return keys
+
+  def subset(self,oids):
+    """ A new GffFile holding the subtrees of 'oids', in load order. """
+    keep = set()
+    for oid in oids:
+      keep.update(self.subtree(oid))
+    sub = GffFile()
+    for (key,e) in self.entries.items():
+      if key in keep:
+        sub.addEntry(e)
+    return sub
 
 #  def parse(self,line):
 #    flds = line.strip().split('\t')
@@ -98,180 +290,243 @@ class GffFile:
       name = name[5:]
     return name
 
-  def makeTrackSet(self,base,ucsc=False):
-    fds = {}
-    for tag in trackSet:
+  # categories written as-is by the track exporters, besides transcripts
+  TRACK_SINGLES = ("miRNA","transposable_element")
+
+  @staticmethod
+  def bed6(e,name):
+    return "%s\t%d\t%d\t%s\t0\t%s" % (e.chrom,e.left-1,e.right,name,e.strand)
+
+  @staticmethod
+  def bed12(e,name,exons):
+    """ BED12 for transcript 'e' with the given exon entries as blocks. """
+    if len(exons) == 0:
+      exons = [e]
+    blocks = sorted([(x.left-1,x.right) for x in exons])
+    start = min(e.left-1,blocks[0][0])
+    end = max(e.right,blocks[-1][1])
+    sizes = ",".join([str(b[1]-b[0]) for b in blocks])
+    starts = ",".join([str(b[0]-start) for b in blocks])
+    return "%s\t%d\t%d\t%s\t0\t%s\t%d\t%d\t0\t%d\t%s,\t%s," % (e.chrom,start,end,name,e.strand,start,end,len(blocks),sizes,starts)
+
+  def exonsOf(self,oid):
+    return [self.entries[k] for k in self.offspring.get(oid,[])
+            if self.entries[k].category == "exon"]
+
+  def labelOf(self,oid,e):
+    name = e.name()
+    return str(oid) if name == None else self.fixName(name)
+
+  def trackFile(self,fds,base,tag):
+    if tag not in fds:
       fds[tag] = open("%s_%s.bed" % (base,tag),'w')
-    for entry in self.entries.values():
-      if entry.type in ("miRNA","transposable_element"):
-        print(entry.bedWithName(self.fixName(entry.name())),file=fds[entry.type])
-      elif entry.type == "gene":
-        kids = self.offspring[entry.fid()]
-        for k in kids:
-          thing = BedStruct(k,self.fixName(k.name()),self.offspring.get(k.fid(),[]))
-          print(thing.bed(),file=fds[k.type])
+    return fds[tag]
+
+  def trackLines(self):
+    """ (file tag,BED line) for each makeTrackSet row. """
+    lin = self.lineage()
+    for (oid,entry) in self.entries.items():
+      if entry.category in GffFile.TRACK_SINGLES and lin.isGene(oid):
+        yield (entry.category,GffFile.bed6(entry,self.labelOf(oid,entry)))
+      elif lin.isTranscript(oid):
+        yield (entry.category,GffFile.bed12(entry,self.labelOf(oid,entry),self.exonsOf(oid)))
+
+  def pipelineLines(self):
+    """ (file tag,BED line) for each makePipelineSet row. """
+    lin = self.lineage()
+    geneTypes = {}
+    for (oid,entry) in self.entries.items():
+      if lin.isTranscript(oid):
+        gene_id = lin.geneId(oid)
+        if gene_id not in geneTypes:
+          geneTypes[gene_id] = entry.category
+    for (oid,entry) in self.entries.items():
+      if not lin.isGene(oid):
+        continue
+      if entry.category in GffFile.TRACK_SINGLES:
+        yield (entry.category,GffFile.bed6(entry,oid))
+      elif oid in geneTypes:
+        yield (geneTypes[oid],GffFile.bed6(entry,oid))
+
+  def makeTrackSet(self,base,ucsc=False,workers=1,sort=False,fmt="bed",chromSizes=None):
+    if workers > 1 or sort or fmt != "bed":
+      GffExporter(self,workers).makeTrackSet(base,fmt,chromSizes)
+      return
+    fds = {}
+    for (tag,line) in self.trackLines():
+      print(line,file=self.trackFile(fds,base,tag))
     for fd in fds.values():
       fd.close()
 
-  def makePipelineSet(self,base,ucsc=False):
+  def makePipelineSet(self,base,ucsc=False,workers=1,sort=False,fmt="bed",chromSizes=None):
+    if workers > 1 or sort or fmt != "bed":
+      GffExporter(self,workers).makePipelineSet(base,fmt,chromSizes)
+      return
     fds = {}
-    for tag in trackSet:
-      fds[tag] = open("%s_%s.bed" % (base,tag),'w')
-    for entry in self.entries.values():
-      if entry.type in ("miRNA","transposable_element"):
-        print(entry.bed(ucsc=ucsc),file=fds[entry.type])
-      elif entry.type == "gene":
-        if entry.fid() not in self.offspring:
-          continue
-        kids = self.offspring[entry.fid()]
-        gtype = kids[0].type
-        print(entry.bed(ucsc=ucsc),file=fds[gtype])
+    for (tag,line) in self.pipelineLines():
+      print(line,file=self.trackFile(fds,base,tag))
     for fd in fds.values():
       fd.close()
 
+  def report(self):
+    """ The columnar GffReport of the entries, built on first use. """
+    if self.reportColumns == None:
+      self.reportColumns = GffReport(self)
+    return self.reportColumns
+
+  def transcriptArrays(self):
+    """ The TranscriptArrays (exons as flat arrays) of the transcripts,
+        built on first use. """
+    if self.transcriptColumns == None:
+      self.transcriptColumns = TranscriptArrays.build(self)
+    return self.transcriptColumns
+
+  def writeIntrons(self,fd):
+    self.transcriptArrays().writeIntrons(fd)
+
+  def writeTss(self,fd,window=0):
+    self.transcriptArrays().writeEnds(fd,"tss",window)
+
+  def writeTes(self,fd,window=0):
+    self.transcriptArrays().writeEnds(fd,"tes",window)
+
+  def writeLengths(self,fd):
+    self.transcriptArrays().writeLengths(fd,self.lineage())
+
+  def writeSequences(self,fd,fasta,kind="transcript",width=60):
+    return self.transcriptArrays().writeSequences(fd,fasta,kind,width)
+
+  def combinedReport(self,fd):
+    self.report().write(fd)
+
   def topLevelTypes(self,fd):
-    noParent = set()
-    for e in self.entries.values():
-      if e.parent == None or len(e.parent) == 0:
-        noParent.add(e.category)
-    for fid in noParent:
-      print(fid,file=fd)
+    self.report().writeTopLevelTypes(fd)
 
   def parentTypes(self,fd):
-    pt = {}
-    for e in self.entries.values():
-      if e.parent != None and len(e.parent) > 0:
-        etype = e.category
-        for p in e.parent:
-          if etype not in pt:
-            pt[etype] = set()
-          if p not in self.entries:
-            pt[etype].add("orphan")
-            sys.stderr.write("Orphan: %s %s %s\n" % (e.category,e.oid,p))
-          else:
-            pt[etype].add(self.entries[p].category)
-    for e,p in iter(pt.items()):
-      fd.write("%s : %s\n" % (e,",".join(p)))
+    self.report().writeParentTypes(fd)
 
   def hasName(self,fd):
-    cats = set()
-    for e in self.entries.values():
-      if e.name() != None:
-        cats.add(e.type)
-    catsL = list(cats)
-    catsL.sort()
-    for c in catsL:
-      print(c,file=fd)
+    self.report().writeHasName(fd)
 
   def hasFullName(self,fd):
-    cats = set()
-    for e in self.entries.values():
-      if e.fullname() != None:
-        cats.add(e.type)
-    catsL = list(cats)
-    catsL.sort()
-    for c in catsL:
-      print(c,file=fd)
+    self.report().writeHasFullName(fd)
 
   def stats(self,fd):
-    tset = {}
-    for e in self.entries.values():
-      t = e.type
-      if t not in tset:
-        tset[t] = 0
-      tset[t] += 1
-    for t,v in iter(tset.items()):
-      fd.write("%09d\t%s\n" % (v,t))
+    self.report().writeStats(fd)
 
   def checkConsistent(self,fd):
+    lin = self.lineage()
     # first check whether each gene has all kids the same type
-    for parent,kids in iter(self.offspring.items()):
-      p_entry = self.entries[parent]
-      if p_entry.type == "gene":
-        ktypes = set()
-        for k in kids:
-          ktypes.add(k.type)
-        if len(ktypes) > 1:
-          fd.write("%s: kid types: %s\n",parent,",".join(ktypes))
-        elif len(ktypes) == 0:
-          fd.write("%s: gene with no offspring\n",parent)
+    ktypes = {}
+    for (oid,e) in self.entries.items():
+      if lin.isTranscript(oid):
+        ktypes.setdefault(lin.geneId(oid),set()).add(e.category)
+    for (oid,e) in self.entries.items():
+      if e.category == "gene" and lin.isGene(oid):
+        kinds = ktypes.get(oid,set())
+        if len(kinds) > 1:
+          fd.write("%s: kid types: %s\n" % (oid,",".join(sorted(kinds))))
+        elif len(kinds) == 0:
+          fd.write("%s: gene with no offspring\n" % (oid,))
+    for (oid,genes) in lin.ambiguous.items():
+      fd.write("%s: multiple genes: %s\n" % (oid,",".join(genes)))
+    for (oid,missing) in lin.orphans.items():
+      fd.write("%s: missing parent %s\n" % (oid,missing))
 
   def maxKids(self,fd):
-    # report the maximum number of children of each type a parent type has
-    types = {}
-    for parent,kids in iter(self.offspring.items()):
-      p_entry = self.entries[parent]
-      kmap = {}
-      for k in kids:
-        kmap[k.type] = kmap.get(k.type,0) + 1
-      if p_entry.type not in types:
-        types[p_entry.type] = {}
-      gset = types[p_entry.type]
-      for k,v in iter(kmap.items()):
-        cmax = gset.get(k,0) 
-        if v > cmax:
-          gset[k] = v
-        if v == 82:
-          print(p_entry.bed())
-    for t,tmap in iter(types.items()):
-      print(t,file=fd)
-      for k,v in tmap.items():
-        print("    %s : %d" % (k,v),file=fd)
-
-  def makeAnno(self,category,ucsc,outFD):
-    sys.stderr.write("cat=%s ucsc=%s\n" % (category,ucsc))
-    if category in GffFile.TOP_LEVEL:
-      for (key,e) in self.entries.items():
-        if e.category == category:
-          attr = "gene_id \"%s\"; transcript_id \"\"; gene_name \"%s\";" % (key,e.name())
-          outFD.write("%s\t%s\t%s\t%d\t%d\t%s\t%s\t%s\t%s\n" % (e.chrom,e.source,e.category,e.left,e.right,e.score,e.strand,e.frame,attr))
-    elif category in GffFile.TRANSCRIPTS:
-      written = set() # for exons we've already written
-      for (key,e) in self.entries.items():
-        if e.category == category:
-          if e.source == "RNAcentral" and e.parent == None:
-            continue
-          if len(e.parent) > 1:
-            sys.stderr.write("PARENT: transcript %s has parents '%s'\n" % (key,",".join(e.parent)))
-          gene_id = next(iter(e.parent)) # should only be one...
-          gene_name = self.entries[gene_id].name()
-          transcript_id = e.name()
-          if key in self.offspring:
-            for exonId in self.offspring[key]:
-              if exonId not in written:
-                exon = self.entries[exonId]
-                if exon.category == "exon":
-                  attr = "gene_id \"%s\"; transcript_id \"%s\"; gene_name \"%s\";" % (gene_id,transcript_id,gene_name)
-                  outFD.write("%s\t%s\t%s\t%d\t%d\t%s\t%s\t%s\t%s\n" % (exon.chrom,exon.source,exon.category,exon.left,exon.right,exon.score,exon.strand,exon.frame,attr))
-                  written.add(exonId)
-          else:
-            attr = "gene_id \"%s\"; transcript_id \"%s\"; gene_name \"%s\";" % (gene_id,transcript_id,gene_name)
-            outFD.write("%s\t%s\t%s\t%d\t%d\t%s\t%s\t%s\t%s\n" % (e.chrom,e.source,e.category,e.left,e.right,e.score,e.strand,e.frame,attr))
-    elif category in GffFile.TRANSCRIPT_PARTS:
-      for (key,e) in self.entries.items():
-        if e.category == category:
-          grandparents = set()
-          for par in e.parent:
-            obj = self.entries[par]
-            if obj.parent != self.parents[par]:
-              sys.stderr.write("Parental mismatch: %s: obj.parent %s != parents[] %s" % (par,obj.parent,self.parents[par]))
-            if obj.parent != None and len(obj.parent) > 0:
-              grandparent = next(iter(self.entries[par].parent)) # we know there's only one parent per transcript
-              grandparents.add(grandparent)
-            elif obj.parent == None:
-              sys.stderr.write("Missing grandparent: %s %s %s parents='%s'\n" % (obj.category,par,obj.name(),",".join(obj.parent)))
-            elif len(obj.parent) == 0:
-              sys.stderr.write("Zero grandparent: %s %s %s parents='%s'\n" % (obj.category,par,obj.name(),",".join(obj.parent)))
-#              grandparents.add(par)
-          if len(grandparents) > 1:
-            sys.stderr.write("GRANDPARENTS: %s %s has multiple grandparents '%s', choosing one arbitrarily\n" % (category,key,",".join(grandparents)))
-            for par in e.parent:
-              parobj = self.entries[par]
-              sys.stderr.write("    Parent: %s %s %s\n" % (parobj.category,par,parobj.name()))
-          if len(grandparents) > 0:
-            gene_id = next(iter(grandparents))
-            grandparent = self.entries[gene_id]
-            transcript_id = next(iter(e.parent))
-            parent = self.entries[transcript_id]
-            attr = "gene_id \"%s\"; transcript_id \"%s\"; gene_name \"%s\";" % (gene_id,transcript_id,grandparent.name())
-            outFD.write("%s\t%s\t%s\t%d\t%d\t%s\t%s\t%s\t%s\n" % (e.chrom,e.source,e.category,e.left,e.right,e.score,e.strand,e.frame,attr))
+    # the most children of each type a parent of each type has
+    self.report().writeMaxKids(fd)
+
+  # one GTF row; the attributes are gene_id, transcript_id and gene_name
+  GTF_LINE = "%s\t%s\t%s\t%d\t%d\t%s\t%s\t%s\tgene_id \"%s\"; transcript_id \"%s\"; gene_name \"%s\";\n"
+
+  @staticmethod
+  def annoCategories(categories):
+    """ Normalise a category, list of categories or "all". """
+    if isinstance(categories,str):
+      categories = categories.split(",")
+    if "all" in categories:
+      return sorted(GffFile.TOP_LEVEL | GffFile.TRANSCRIPTS | GffFile.TRANSCRIPT_PARTS)
+    return list(categories)
+
+  @staticmethod
+  def annoWriters(categories,outFD=None,base=None,compress=False,tabix=False):
+    """ LineWriters for each category: all sharing 'outFD', or one file per
+        category named <base>_<category>.gtf[.gz], BGZF with a tabix index
+        if asked. """
+    if base == None:
+      shared = LineWriter(outFD)
+      return dict([(c,shared) for c in categories])
+    if tabix:
+      return dict([(c,LineWriter(TabixWriter("%s_%s.gtf.gz" % (base,c),"gff")))
+                   for c in categories])
+    suffix = ".gtf.gz" if compress else ".gtf"
+    return dict([(c,LineWriter(openOutput("%s_%s%s" % (base,c,suffix))))
+                 for c in categories])
+
+  def makeAnno(self,categories,ucsc,outFD,base=None,compress=False,workers=1,sort=False,tabix=False):
+    """ GTF rows for 'categories', to 'outFD' or to one file per category.
+        With 'tabix', split files are BGZF with an index (a shared 'outFD'
+        should then be a TabixWriter) and rows are sorted. """
+    categories = GffFile.annoCategories(categories)
+    sys.stderr.write("cat=%s ucsc=%s\n" % (",".join(categories),ucsc))
+    writers = GffFile.annoWriters(categories,outFD,base,compress,tabix)
+    if workers > 1 or sort or tabix:
+      GffExporter(self,workers).writeAnno(categories,writers)
+    else:
+      self.writeAnno(categories,writers)
+    for w in set(writers.values()):
+      if base == None:
+        w.flush()
+      else:
+        w.close()
+
+  def writeAnno(self,categories,out):
+    """ Write GTF rows for every requested category in one pass over the
+        entries; 'out' is a file or a map of category to LineWriter. """
+    if isinstance(categories,str):
+      categories = [categories]
+    writers = out
+    if not isinstance(out,dict):
+      shared = LineWriter(out)
+      writers = dict([(c,shared) for c in categories])
+    lin = self.lineage()
+    written = dict([(c,set()) for c in categories]) # exons we've already written
+    for (key,e) in self.entries.items():
+      category = e.category
+      if category not in writers:
+        continue
+      if category in GffFile.TOP_LEVEL:
+        self.annoTopLevel(key,e,writers[category])
+      elif category in GffFile.TRANSCRIPTS:
+        self.annoTranscript(key,e,writers[category],written[category],lin)
+      elif category in GffFile.TRANSCRIPT_PARTS:
+        self.annoPart(key,e,writers[category],lin)
+    if not isinstance(out,dict):
+      shared.flush()
+
+  def annoTopLevel(self,key,e,out):
+    out.write(GffFile.GTF_LINE % (e.chrom,e.source,e.category,e.left,e.right,e.score,e.strand,e.frame,key,"",e.name()))
+
+  def annoTranscript(self,key,e,out,written,lin):
+    if e.source == "RNAcentral" and e.parent == None:
+      return
+    if key not in lin:
+      return
+    (gene_id,_,gene_name,_) = lin[key]
+    transcript_id = e.name()
+    if key in self.offspring:
+      for exonId in self.offspring[key]:
+        if exonId not in written:
+          exon = self.entries[exonId]
+          if exon.category == "exon":
+            out.write(GffFile.GTF_LINE % (exon.chrom,exon.source,exon.category,exon.left,exon.right,exon.score,exon.strand,exon.frame,gene_id,transcript_id,gene_name))
+            written.add(exonId)
+    else:
+      out.write(GffFile.GTF_LINE % (e.chrom,e.source,e.category,e.left,e.right,e.score,e.strand,e.frame,gene_id,transcript_id,gene_name))
+
+  def annoPart(self,key,e,out,lin):
+    if lin.levels.get(key) != Lineage.PART:
+      return
+    (gene_id,transcript_id,gene_name,_) = lin[key]
+    out.write(GffFile.GTF_LINE % (e.chrom,e.source,e.category,e.left,e.right,e.score,e.strand,e.frame,gene_id,transcript_id,gene_name))
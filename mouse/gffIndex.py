@@ -0,0 +1,208 @@
+import bisect
+import pickle
+from array import array
+
+################################################################################
+#
+# class ChromIndex -- the features of one chromosome, sorted by left end.
+#
+# Alongside the sorted coordinates we keep the running maximum of the right
+# ends (so a backwards scan can stop as soon as nothing further left can
+# reach the query) and the maximum right end of each block of BLOCK
+# features (so blocks that cannot reach the query are skipped whole).
+# Coordinates are GFF ones: 1-based, both ends included.
+
+class ChromIndex:
+
+  BLOCK = 64
+
+  def __init__(self,features):
+    features.sort(key=lambda f: (f[0],f[1]))
+    self.lefts = array('l',[f[0] for f in features])
+    self.rights = array('l',[f[1] for f in features])
+    self.strands = [f[2] for f in features]
+    self.ids = [f[3] for f in features]
+    self.runMax = array('l')
+    self.blockMax = array('l')
+    m = -1
+    for i,r in enumerate(self.rights):
+      if r > m:
+        m = r
+      self.runMax.append(m)
+      if i % ChromIndex.BLOCK == 0:
+        self.blockMax.append(r)
+      elif r > self.blockMax[-1]:
+        self.blockMax[-1] = r
+
+  def __len__(self):
+    return len(self.ids)
+
+  def overlapRows(self,start,end):
+    rows = []
+    i = bisect.bisect_right(self.lefts,end) - 1
+    B = ChromIndex.BLOCK
+    while i >= 0 and self.runMax[i] >= start:
+      b = i // B
+      if self.blockMax[b] < start:
+        i = b * B - 1
+        continue
+      if self.rights[i] >= start:
+        rows.append(i)
+      i -= 1
+    rows.reverse()
+    return rows
+
+  def nearestRows(self,start,end):
+    """ Rows at the smallest distance from [start,end]: the overlapping
+        rows if any, else the closest on either side (both on a tie). """
+    rows = self.overlapRows(start,end)
+    if len(rows) > 0:
+      return (0,rows)
+    hi = bisect.bisect_right(self.lefts,end)
+    best = None
+    rows = []
+    if hi > 0:
+      reach = self.runMax[hi-1]
+      i = hi - 1
+      while self.rights[i] != reach:
+        i -= 1
+      best = start - reach
+      rows = [i]
+    if hi < len(self.lefts):
+      dist = self.lefts[hi] - end
+      if best == None or dist < best:
+        best = dist
+        rows = [hi]
+      elif dist == best:
+        rows.append(hi)
+    return (best,rows)
+
+################################################################################
+#
+# class IntervalIndex -- per-chromosome interval index over the entries of a
+#                        GffFile, answering overlap, containment and
+#                        nearest-feature queries.  Queries restricted to a
+#                        category use a sub-index built on first use.
+#
+# Features are identified by their ID, or, for those without one (exons,
+# UTRs), by parent:category:left-right, which unlike the number they are
+# stored under in a GffFile means the same in every run; keyMap() maps
+# these back to the entries.  A saved index records where it came from, so
+# a stale one is not reused.
+
+class IntervalIndex:
+
+  VERSION = 1
+
+  def __init__(self,features):
+    # features: list of (chrom,left,right,strand,category,key)
+    self.features = features
+    self.byCategory = {}
+
+  @staticmethod
+  def featureKey(oid,e):
+    if isinstance(oid,str):
+      return oid
+    parent = ",".join(sorted(e.parent)) if e.parent else e.chrom
+    return "%s:%s:%d-%d" % (parent,e.category,e.left,e.right)
+
+  @staticmethod
+  def keyMap(gff):
+    """ Index key -> entries key, for the entries without an ID. """
+    return dict([(IntervalIndex.featureKey(oid,e),oid) for (oid,e) in gff.entries.items()
+                 if not isinstance(oid,str)])
+
+  @classmethod
+  def build(cls,gff,categories=None):
+    features = []
+    for oid,e in gff.entries.items():
+      if categories == None or e.category in categories:
+        features.append((e.chrom,e.left,e.right,e.strand,e.category,IntervalIndex.featureKey(oid,e)))
+    return cls(features)
+
+  def chroms(self,category=None):
+    if category not in self.byCategory:
+      perChrom = {}
+      for (chrom,left,right,strand,cat,oid) in self.features:
+        if category == None or cat == category:
+          perChrom.setdefault(chrom,[]).append((left,right,strand,oid))
+      self.byCategory[category] = dict([(c,ChromIndex(f)) for c,f in perChrom.items()])
+    return self.byCategory[category]
+
+  def overlaps(self,chrom,start,end,category=None,strand=None):
+    """ IDs of features overlapping [start,end] (1-based, inclusive). """
+    ci = self.chroms(category).get(chrom)
+    if ci == None:
+      return []
+    return [ci.ids[i] for i in ci.overlapRows(start,end)
+            if strand == None or ci.strands[i] == strand]
+
+  def overlapsBatch(self,queries,category=None):
+    """ overlaps() for each (chrom,start,end) in 'queries', in order. """
+    chroms = self.chroms(category)
+    result = []
+    for (chrom,start,end) in queries:
+      ci = chroms.get(chrom)
+      result.append([] if ci == None else [ci.ids[i] for i in ci.overlapRows(start,end)])
+    return result
+
+  def containing(self,chrom,start,end,category=None,strand=None):
+    """ IDs of features that contain the whole of [start,end]. """
+    ci = self.chroms(category).get(chrom)
+    if ci == None:
+      return []
+    return [ci.ids[i] for i in ci.overlapRows(start,end)
+            if ci.lefts[i] <= start and ci.rights[i] >= end
+            and (strand == None or ci.strands[i] == strand)]
+
+  def nearest(self,chrom,start,end=None,category=None):
+    """ (distance,IDs) of the features closest to [start,end]; distance is
+        0 for overlapping features, (None,[]) for an unknown chromosome. """
+    end = start if end == None else end
+    ci = self.chroms(category).get(chrom)
+    if ci == None or len(ci) == 0:
+      return (None,[])
+    (dist,rows) = ci.nearestRows(start,end)
+    return (dist,[ci.ids[i] for i in rows])
+
+  def save(self,fn,source=None):
+    """ Write the index; 'source' describes the input it was built from. """
+    state = {"version": IntervalIndex.VERSION,"source": source,"features": self.features}
+    with open(fn,"wb") as fd:
+      pickle.dump(state,fd,protocol=pickle.HIGHEST_PROTOCOL)
+
+  @classmethod
+  def load(cls,fn,source=None):
+    """ The saved index, or None if it was built from another 'source' or
+        by an older version. """
+    with open(fn,"rb") as fd:
+      state = pickle.load(fd)
+    if (not isinstance(state,dict) or state.get("version") != IntervalIndex.VERSION
+        or state["source"] != source):
+      return None
+    return cls(state["features"])
+
+  def annotateBed(self,inFD,outFD,names=None,category=None,nearest=False):
+    """ Append the overlapping feature IDs (or names, from the 'names' map)
+        to each BED line; with 'nearest', the closest feature and its
+        distance are appended when nothing overlaps. """
+    label = (lambda oid: str(oid)) if names == None else (lambda oid: str(names.get(oid,oid)))
+    for line in inFD:
+      if line.startswith("#") or line.startswith("track") or line.startswith("browser"):
+        outFD.write(line)
+        continue
+      flds = line.rstrip("\n").split("\t")
+      if len(flds) < 3:
+        continue
+      chrom = flds[0]
+      start = int(flds[1]) + 1
+      end = int(flds[2])
+      hits = self.overlaps(chrom,start,end,category=category)
+      dist = 0 if len(hits) > 0 else "."
+      if len(hits) == 0 and nearest:
+        (dist,hits) = self.nearest(chrom,start,end,category=category)
+        dist = "." if dist == None else dist
+      flds.append(",".join(map(label,hits)) if len(hits) > 0 else ".")
+      if nearest:
+        flds.append(str(dist))
+      outFD.write("\t".join(flds) + "\n")
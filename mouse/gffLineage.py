@@ -0,0 +1,111 @@
+import sys
+
+################################################################################
+#
+# class Lineage -- gene/transcript ancestry of every entry of a GffFile,
+#                  resolved once.
+#
+# Each entry maps to (gene_id, transcript_id, gene_name, biotype):
+#   - an entry without a parent is a gene: gene_id is its own ID and
+#     transcript_id is "";
+#   - an entry whose parent has no parent is a transcript: transcript_id is
+#     its own ID and gene_id its parent;
+#   - anything deeper is a transcript part: transcript_id is its parent and
+#     gene_id its grandparent.
+# biotype is the transcript's 'biotype' attribute, or the gene's when there
+# is no transcript.  Parts whose parents lead to more than one gene are
+# recorded in 'ambiguous' (one gene is chosen); entries whose parent or
+# grandparent is missing are recorded in 'orphans' and left out of 'table'.
+# Both are reported once, when the lineage is built.
+
+class Lineage:
+
+  GENE = 0
+  TRANSCRIPT = 1
+  PART = 2
+
+  def __init__(self):
+    self.table = {}
+    self.levels = {}
+    self.ambiguous = {}
+    self.orphans = {}
+
+  @staticmethod
+  def biotypeOf(e):
+    biotype = e.attribute("biotype")
+    return None if biotype == "None" else biotype
+
+  @classmethod
+  def build(cls,gff,log=sys.stderr):
+    lin = cls()
+    entries = gff.entries
+    for (key,e) in entries.items():
+      parent = e.parent
+      if parent == None or len(parent) == 0:
+        lin.table[key] = (key,"",e.name(),Lineage.biotypeOf(e))
+        lin.levels[key] = Lineage.GENE
+        continue
+      parents = sorted(parent)
+      missing = [p for p in parents if p not in entries]
+      if len(missing) > 0:
+        lin.orphans[key] = missing[0]
+        continue
+      first = entries[parents[0]]
+      if first.parent == None or len(first.parent) == 0:
+        if len(parents) > 1:
+          log.write("PARENT: transcript %s has parents '%s'\n" % (key,",".join(parents)))
+        lin.table[key] = (parents[0],key,first.name(),Lineage.biotypeOf(e))
+        lin.levels[key] = Lineage.TRANSCRIPT
+        continue
+      grandparents = set()
+      for par in parents:
+        obj = entries[par]
+        if obj.parent != None and len(obj.parent) > 0:
+          grandparents.update(obj.parent)
+        else:
+          log.write("Missing grandparent: %s %s %s\n" % (obj.category,par,obj.name()))
+      gene_id = sorted(first.parent)[0]
+      if len(grandparents) > 1:
+        lin.ambiguous[key] = tuple(sorted(grandparents))
+        log.write("GRANDPARENTS: %s %s has multiple grandparents '%s', choosing %s\n" % (e.category,key,",".join(sorted(grandparents)),gene_id))
+      if gene_id not in entries:
+        lin.orphans[key] = gene_id
+        continue
+      lin.table[key] = (gene_id,parents[0],entries[gene_id].name(),Lineage.biotypeOf(first))
+      lin.levels[key] = Lineage.PART
+    return lin
+
+  def __getitem__(self,oid):
+    return self.table[oid]
+
+  def __contains__(self,oid):
+    return oid in self.table
+
+  def get(self,oid,default=None):
+    return self.table.get(oid,default)
+
+  def geneId(self,oid):
+    return self.table[oid][0]
+
+  def transcriptId(self,oid):
+    return self.table[oid][1]
+
+  def geneName(self,oid):
+    return self.table[oid][2]
+
+  def biotype(self,oid):
+    return self.table[oid][3]
+
+  def isGene(self,oid):
+    return self.levels.get(oid) == Lineage.GENE
+
+  def isTranscript(self,oid):
+    return self.levels.get(oid) == Lineage.TRANSCRIPT
+
+  def transcriptsByGene(self):
+    """ Map of gene ID to the list of its transcript IDs. """
+    genes = {}
+    for oid,level in self.levels.items():
+      if level == Lineage.TRANSCRIPT:
+        genes.setdefault(self.table[oid][0],[]).append(oid)
+    return genes
@@ -0,0 +1,171 @@
+import os.path
+import time
+import logging
+import multiprocessing
+
+from mouse.gffEntry import GffEntry
+from mouse.gffParallel import CaptureHandler
+
+################################################################################
+#
+# Loading several annotation files into one GffFile.
+#
+# Each file is loaded on its own, in a worker process when there are
+# several workers, and the entries are merged into the target one file at a
+# time, in order of precedence (highest first).  An ID already taken by a
+# file of higher precedence is a collision, settled by the 'collisions'
+# rule:
+#   keep       -- the entry of the lower-precedence file is dropped, with
+#                 its parts that have no ID of their own (exons, UTRs);
+#                 children with new IDs hang off the entry that was kept;
+#   namespace  -- the lower-precedence entry, and the Parent references to
+#                 it within its own file, are renamed <label>:<ID>.
+# Otherwise entries without an ID never collide.  The target records, for
+# each entry, which input it came from (GffFile.origin).  As in
+# ParallelLoader, log records from the workers are handed back and replayed
+# in order.
+
+COLLISIONS = ("keep","namespace")
+
+class GffMerger:
+
+  # the class of the GffFile being loaded, for the forked workers
+  fileClass = None
+
+  def __init__(self,fns,labels=None,precedence=None,collisions="keep"):
+    if collisions not in COLLISIONS:
+      raise ValueError("unknown collision rule '%s', expected one of %s" % (collisions,",".join(COLLISIONS)))
+    self.fns = list(fns)
+    self.labels = labels or GffMerger.labelsFor(self.fns)
+    self.order = self.precedence(precedence)
+    self.collisions = collisions
+
+  @staticmethod
+  def labelsFor(fns):
+    """ Short names of the files (base names without .gz/.gff3/.gff),
+        made unique with a number where needed. """
+    labels = []
+    for fn in fns:
+      label = os.path.basename(fn)
+      for ext in (".gz",".bgz",".gff3",".gff"):
+        if label.endswith(ext):
+          label = label[:-len(ext)]
+      if label in labels:
+        label = "%s%d" % (label,len(labels) + 1)
+      labels.append(label)
+    return labels
+
+  def precedence(self,precedence):
+    """ Input numbers, highest precedence first: those named (by label or
+        file name) in 'precedence', then the rest in the order given. """
+    if isinstance(precedence,str):
+      precedence = precedence.split(",")
+    order = []
+    for name in precedence or []:
+      if name in self.labels:
+        i = self.labels.index(name)
+      elif name in self.fns:
+        i = self.fns.index(name)
+      else:
+        raise ValueError("precedence: no input called '%s'" % (name,))
+      if i not in order:
+        order.append(i)
+    return order + [i for i in range(len(self.fns)) if i not in order]
+
+  ##############################################################################
+  #
+  # loading
+
+  @staticmethod
+  def loadOne(unit):
+    """ Load one file; returns (entries,extents,loadStats,log records). """
+    (fn,threads,lazy,types) = unit
+    records = []
+    handler = CaptureHandler(records)
+    rootlog = logging.getLogger()
+    (saved,savedLevel) = (rootlog.handlers[:],rootlog.level)
+    rootlog.handlers = [handler]
+    rootlog.setLevel(logging.DEBUG)
+    try:
+      gff = GffMerger.fileClass(lazy=lazy)
+      gff.load(fn,GffMerger.fileClass.open(fn,threads=threads),types=types)
+    finally:
+      rootlog.handlers = saved
+      rootlog.setLevel(savedLevel)
+    return (list(gff.entries.values()),gff.extents,gff.loadStats,records)
+
+  def loaded(self,gff,workers,types):
+    """ Yield (input number,loadOne result) in order of precedence. """
+    units = [(self.fns[i],1,gff.lazy,types) for i in self.order]
+    GffMerger.fileClass = gff.__class__
+    try:
+      if workers > 1 and len(units) > 1:
+        with multiprocessing.get_context("fork").Pool(min(workers,len(units))) as pool:
+          for (i,result) in zip(self.order,pool.imap(GffMerger.loadOne,units)):
+            yield (i,result)
+      else:
+        for (i,unit) in zip(self.order,units):
+          yield (i,GffMerger.loadOne(unit))
+    finally:
+      GffMerger.fileClass = None
+
+  def load(self,gff,workers=1,types=None):
+    """ Load and merge every input into 'gff'. """
+    started = time.perf_counter()
+    rootlog = logging.getLogger()
+    gff.types = types
+    gff.inputs = list(self.fns)
+    taken = set()
+    files = []
+    for (i,(entries,extents,stats,records)) in self.loaded(gff,workers,types):
+      for (level,msg) in records:
+        rootlog.log(level,msg)
+      ids = set([e.oid for e in entries if isinstance(e.oid,str)])
+      clashes = ids & taken
+      renamed = {}
+      if self.collisions == "namespace":
+        renamed = dict([(oid,"%s:%s" % (self.labels[i],oid)) for oid in clashes])
+      (added,dropped) = (0,0)
+      for e in entries:
+        if not isinstance(e.oid,str):
+          if self.collisions == "keep" and e.parent != None and len(e.parent) > 0 and set(e.parent) <= clashes:
+            dropped += 1
+            continue
+          e.oid = id(e)
+        elif e.oid in clashes and self.collisions == "keep":
+          rootlog.warning("MERGE %s: keeping %s from a file of higher precedence" % (self.labels[i],e.oid))
+          dropped += 1
+          continue
+        if len(renamed) > 0:
+          GffMerger.rename(e,renamed)
+        if gff.addEntry(GffEntry.symbols.internEntry(e),origin=i):
+          added += 1
+      for (oid,extent) in extents.items():
+        if oid in clashes and self.collisions == "keep":
+          continue
+        gff.extents[renamed.get(oid,oid)] = extent
+      taken |= ids
+      files.append({"file": self.fns[i],"label": self.labels[i],"entries": added,
+                    "collisions": len(clashes),"dropped": dropped,"renamed": len(renamed),
+                    "lines": stats["lines"],"skipped": stats["skipped"],
+                    "filtered": stats["filtered"]})
+      rootlog.info("MERGE %s: %d entries, %d ID collisions" % (self.labels[i],added,len(clashes)))
+    gff.setLoadStats(sum([f["lines"] for f in files]),sum([f["skipped"] for f in files]),
+                     time.perf_counter() - started,sum([f["filtered"] for f in files]))
+    gff.loadStats["files"] = files
+    return gff
+
+  @staticmethod
+  def rename(e,renamed):
+    """ Give 'e' its namespaced ID and Parent references, if it has any. """
+    parent = e.parent
+    hit = e.oid in renamed or (parent != None and len(renamed.keys() & parent) > 0)
+    if not hit:
+      return
+    attrs = e.attrs
+    if e.oid in renamed:
+      e.oid = renamed[e.oid]
+      attrs["ID"] = e.oid
+    if parent != None:
+      e.parent = set([renamed.get(p,p) for p in parent])
+      attrs["Parent"] = e.parent
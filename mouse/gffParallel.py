@@ -0,0 +1,166 @@
+import os.path
+import time
+import logging
+import gzip
+import multiprocessing
+
+from mouse.gffEntry import GffEntry
+from mouse import bgzf
+
+################################################################################
+#
+# Parallel parsing of a GFF file.
+#
+# The file is cut into chunks on line boundaries -- byte ranges of a plain
+# file, or runs of blocks of a BGZF file -- and each chunk is parsed by
+# GffEntry.parse in a worker process.  A line belongs to the chunk in which
+# its first byte lies.  The workers hand back their entries, together with
+# any log records parsing produced, in line order; merging them through
+# GffFile.addEntry one chunk at a time gives exactly the serial result,
+# duplicate-ID warnings included.  Ordinary (non-BGZF) gzip files cannot be
+# split and are loaded serially.
+
+class CaptureHandler(logging.Handler):
+  """ Collects log records into a list, in order. """
+
+  def __init__(self,items):
+    logging.Handler.__init__(self,logging.DEBUG)
+    self.items = items
+
+  def emit(self,record):
+    self.items.append((record.levelno,record.getMessage()))
+
+################################################################################
+
+class ParallelLoader:
+
+  def __init__(self,workers,chunksPerWorker=4,ucsc=True,lazy=False,types=None):
+    self.workers = workers
+    self.chunksPerWorker = chunksPerWorker
+    self.ucsc = ucsc
+    self.lazy = lazy
+    self.types = types
+
+  @staticmethod
+  def canSplit(fn):
+    if os.path.splitext(fn)[1] in (".gz",".bgz"):
+      return bgzf.isBgzf(fn)
+    return True
+
+  def chunks(self,fn):
+    """ Work units for the pool: (fn,kind,start,ownLen,prev,opts), where
+        prev is the offset of the preceding block (BGZF) or byte (plain),
+        or None for the first chunk, and opts holds the parse options. """
+    opts = {"ucsc": self.ucsc,"lazy": self.lazy,"types": self.types}
+    nChunks = max(1,self.workers * self.chunksPerWorker)
+    units = []
+    if bgzf.isBgzf(fn):
+      blocks = bgzf.blocks(fn)
+      total = sum([b[1] for b in blocks])
+      target = max(1,total // nChunks)
+      first = 0
+      own = 0
+      for i,(offset,isize) in enumerate(blocks):
+        own += isize
+        if own >= target or i == len(blocks) - 1:
+          prev = blocks[first-1][0] if first > 0 else None
+          units.append((fn,"bgzf",blocks[first][0],own,prev,opts))
+          first = i + 1
+          own = 0
+    else:
+      size = os.path.getsize(fn)
+      step = max(1,size // nChunks)
+      start = 0
+      while start < size:
+        end = min(size,start + step)
+        prev = start - 1 if start > 0 else None
+        units.append((fn,"plain",start,end - start,prev,opts))
+        start = end
+    return units
+
+  @staticmethod
+  def parseChunk(unit):
+    """ Parse one chunk; returns (items,sawFasta,lines,skipped,filtered)
+        where items holds entries and (level,message) log records in line
+        order. """
+    (fn,kind,start,ownLen,prev,opts) = unit
+    types = opts["types"]
+    raw = open(fn,"rb")
+    skipFirst = False
+    if prev != None:
+      # the first line is ours only if the data before the chunk ends a line
+      raw.seek(prev)
+      tail = raw.read(start - prev)
+      if kind == "bgzf":
+        tail = gzip.decompress(tail)
+      skipFirst = tail[-1:] != b"\n"
+    raw.seek(start)
+    if kind == "bgzf":
+      stream = gzip.GzipFile(fileobj=raw)
+    else:
+      stream = raw
+    items = []
+    handler = CaptureHandler(items)
+    rootlog = logging.getLogger()
+    saved = rootlog.handlers[:]
+    savedLevel = rootlog.level
+    rootlog.handlers = [handler]
+    rootlog.setLevel(logging.DEBUG)
+    sawFasta = False
+    lines = 0
+    skipped = 0
+    filtered = 0
+    try:
+      pos = 0
+      if skipFirst:
+        pos += len(stream.readline())
+      while pos < ownLen:
+        line = stream.readline()
+        if len(line) == 0:
+          break
+        pos += len(line)
+        line = line.decode()
+        if line == "##FASTA\n":
+          sawFasta = True
+          break
+        elif line[0] == "#":
+          continue
+        lines += 1
+        if types != None and GffEntry.skipLine(line,types):
+          skipped += 1
+          continue
+        entry = GffEntry.parse(line,ucsc=opts["ucsc"],lazy=opts["lazy"])
+        if entry == None:
+          continue
+        if types != None and entry.category not in types:
+          filtered += 1
+          continue
+        items.append(entry)
+    finally:
+      rootlog.handlers = saved
+      rootlog.setLevel(savedLevel)
+      stream.close()
+      raw.close()
+    return (items,sawFasta,lines,skipped,filtered)
+
+  def load(self,gff,fn):
+    units = self.chunks(fn)
+    rootlog = logging.getLogger()
+    started = time.perf_counter()
+    (lines,skipped,filtered) = (0,0,0)
+    with multiprocessing.get_context("fork").Pool(self.workers) as pool:
+      for (items,sawFasta,n,s,f) in pool.imap(ParallelLoader.parseChunk,units):
+        lines += n
+        skipped += s
+        filtered += f
+        for item in items:
+          if isinstance(item,tuple):
+            rootlog.log(item[0],item[1])
+            continue
+          if isinstance(item.oid,int):
+            item.oid = id(item)
+          gff.addEntry(GffEntry.symbols.internEntry(item))
+        if sawFasta:
+          pool.terminate()
+          break
+    gff.setLoadStats(lines,skipped,time.perf_counter() - started,filtered)
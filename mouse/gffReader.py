@@ -0,0 +1,207 @@
+import os.path
+import time
+import itertools
+import gzip
+import bz2
+import shutil
+import logging
+import subprocess
+import concurrent.futures
+
+from mouse import bgzf
+
+################################################################################
+#
+# class GffReader -- line source for GffFile.load.
+#
+# Plain files are read with the built-in text iterator, which is the fastest
+# way to get lines from them.  Compressed input is read in large binary
+# blocks, cut into lines as bytes and decoded a block at a time, by the
+# fastest route available:
+#   .gz/.bgz  BGZF blocks decompressed concurrently by a thread pool (zlib
+#             releases the GIL) when threads > 1; otherwise pigz, or gzip
+#   .bz2      lbzip2/pbzip2 if installed, or the bz2 module
+#   .zst      the zstd command, or the zstandard module if installed
+# Throughput (bytes and lines per second), and the time spent reading and
+# decompressing and in cutting lines, is available from stats() and is
+# logged when the reader is closed.  For plain files only the bytes are:
+# counting or timing their lines costs as much again as reading them.
+
+class GffReader:
+
+  BLOCK = 1 << 17
+  BGZF_BATCH = 64
+
+  def __init__(self,fn,threads=1,external=True,encoding="utf-8"):
+    self.fn = fn
+    self.threads = threads
+    self.external = external
+    self.encoding = encoding
+    self.proc = None
+    self.raw = None
+    self.pool = None
+    self.method = None
+    self.bytesRead = 0
+    self.lines = 0
+    self.exhausted = False
+    self.readSeconds = 0.0
+    self.splitSeconds = 0.0
+    self.started = time.perf_counter()
+    self.source = self.openChunks()
+    self.chunks = self.timedChunks(self.source)
+
+  def tool(self,*names):
+    if not self.external:
+      return None
+    for name in names:
+      path = shutil.which(name)
+      if path != None:
+        return path
+    return None
+
+  def pipe(self,cmd):
+    self.method = os.path.basename(cmd[0])
+    self.proc = subprocess.Popen(cmd,stdout=subprocess.PIPE)
+    self.raw = self.proc.stdout
+    return self.fileChunks()
+
+  def openChunks(self):
+    ext = os.path.splitext(self.fn)[1]
+    if ext in (".gz",".bgz"):
+      if self.threads > 1 and bgzf.isBgzf(self.fn):
+        self.method = "bgzf-threads"
+        return self.bgzfChunks()
+      pigz = self.tool("pigz")
+      if pigz != None:
+        return self.pipe([pigz,"-dc","-p",str(max(1,self.threads)),self.fn])
+      self.method = "gzip"
+      self.raw = gzip.open(self.fn,"rb")
+    elif ext == ".bz2":
+      prog = self.tool("lbzip2","pbzip2")
+      if prog != None:
+        return self.pipe([prog,"-dc",self.fn])
+      self.method = "bz2"
+      self.raw = bz2.open(self.fn,"rb")
+    elif ext == ".zst":
+      zstd = self.tool("zstd")
+      if zstd != None:
+        return self.pipe([zstd,"-dcq","-T%d" % (max(1,self.threads),),self.fn])
+      try:
+        import zstandard
+      except ImportError:
+        raise ValueError("%s: reading .zst needs the zstd command or the zstandard module" % (self.fn,))
+      self.method = "zstandard"
+      self.raw = zstandard.ZstdDecompressor().stream_reader(open(self.fn,"rb"))
+    else:
+      self.method = "plain"
+      self.raw = open(self.fn,encoding=self.encoding)
+      # __iter__ reads lines straight from the file; there are no blocks
+      return (data for data in ())
+    return self.fileChunks()
+
+  def timedChunks(self,chunks):
+    # time spent waiting for data: reading plus decompression
+    while True:
+      t = time.perf_counter()
+      data = next(chunks,None)
+      self.readSeconds += time.perf_counter() - t
+      if data == None:
+        break
+      yield data
+
+  def fileChunks(self):
+    while True:
+      data = self.raw.read(GffReader.BLOCK)
+      if len(data) == 0:
+        break
+      yield data
+
+  def bgzfChunks(self):
+    self.raw = open(self.fn,"rb")
+    self.pool = concurrent.futures.ThreadPoolExecutor(self.threads)
+    pending = None
+    while True:
+      batch = []
+      while len(batch) < GffReader.BGZF_BATCH * self.threads:
+        block = bgzf.readBlock(self.raw)
+        if block == None:
+          break
+        batch.append(block)
+      # decompress this batch while the previous one is consumed
+      current = self.pool.map(bgzf.inflateBlock,batch) if len(batch) > 0 else None
+      if pending != None:
+        yield b"".join(pending)
+      if current == None:
+        break
+      pending = current
+
+  def splitChunk(self,data):
+    # complete lines of 'data'; the partial last line is kept for the next
+    data = self.rest + data
+    self.bytesRead += len(data) - len(self.rest)
+    cut = data.rfind(b"\n") + 1
+    self.rest = data[cut:]
+    return data[0:cut]
+
+  def tail(self):
+    # called once the chunks are used up: the unterminated last line, if any
+    self.exhausted = True
+    if len(self.rest) > 0:
+      yield self.rest
+
+  def textChunkLines(self,data):
+    t = time.perf_counter()
+    text = self.splitChunk(data)
+    if b"\r" in text:
+      text = text.replace(b"\r\n",b"\n")
+    # GFF text holds none of the other separators splitlines() knows
+    lines = text.decode(self.encoding).splitlines(True)
+    self.lines += len(lines)
+    self.splitSeconds += time.perf_counter() - t
+    return lines
+
+  def __iter__(self):
+    if self.method == "plain":
+      return iter(self.raw)
+    self.rest = b""
+    return itertools.chain(itertools.chain.from_iterable(map(self.textChunkLines,self.chunks)),
+                           self.countTail(map(lambda b: b.decode(self.encoding),self.tail())))
+
+  def countTail(self,lines):
+    for line in lines:
+      self.lines += 1
+      yield line
+
+  def stats(self):
+    elapsed = max(time.perf_counter() - self.started,1e-9)
+    if self.method == "plain":
+      if not self.raw.closed:
+        self.bytesRead = self.raw.buffer.tell()
+      return {"file": self.fn,"method": self.method,"bytes": self.bytesRead,
+              "lines": None,"seconds": elapsed,"readSeconds": None,
+              "splitSeconds": None,"bytesPerSec": self.bytesRead / elapsed,
+              "linesPerSec": None}
+    return {"file": self.fn,"method": self.method,"bytes": self.bytesRead,
+            "lines": self.lines,"seconds": elapsed,
+            "readSeconds": self.readSeconds,"splitSeconds": self.splitSeconds,
+            "bytesPerSec": self.bytesRead / elapsed,
+            "linesPerSec": self.lines / elapsed}
+
+  def close(self):
+    if self.method == "plain" and not self.raw.closed:
+      self.bytesRead = self.raw.buffer.tell()
+    self.chunks.close()
+    self.source.close()
+    if self.raw != None:
+      self.raw.close()
+    if self.pool != None:
+      self.pool.shutdown(wait=True)
+    if self.proc != None:
+      code = self.proc.wait()
+      if code != 0 and self.exhausted:
+        raise IOError("%s: %s exited with status %d" % (self.fn,self.method,code))
+    st = self.stats()
+    lines = "" if st["lines"] == None else ", %d lines (%.0f/s)" % (st["lines"],st["linesPerSec"])
+    logging.getLogger().debug("READ %s via %s: %d bytes in %.2fs (%.1f MB/s)%s" %
+                              (self.fn,st["method"],st["bytes"],st["seconds"],
+                               st["bytesPerSec"] / 1e6,lines))
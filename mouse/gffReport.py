@@ -0,0 +1,158 @@
+import sys
+from array import array
+from itertools import compress
+from collections import Counter
+
+from mouse.gffStore import Codes, GffStore
+
+################################################################################
+#
+# class GffReport -- the summary reports (stats, topLevel, idParents,
+#                    hasName, hasFullName, maxKids), computed from columns.
+#
+# One pass over the entries reduces them to columns: a category code, a
+# parent count and has-Name/has-fullname flags per entry, and a (child
+# category, parent) row per Parent edge.  Each report is then a group-by
+# over those columns with Counter and itertools.compress, so all of them
+# together cost little more than one.  A column store (GffStore) already
+# holds category codes and they are used as they are.
+
+class GffReport:
+
+  ORPHAN = -1
+
+  def __init__(self,gff):
+    self.categories = Codes()
+    self.codes = array('H')
+    self.parentCounts = array('H')
+    self.named = array('B')
+    self.fullNamed = array('B')
+    self.edgeKids = array('H')   # category of the child of each edge
+    self.edgeParents = []        # parent ID of each edge
+    self.orphans = []            # (category,key,parent) for missing parents
+    self.build(gff)
+
+  def build(self,gff):
+    entries = gff.entries
+    if isinstance(entries,GffStore) and len(entries.index) == len(entries.ids):
+      self.categories = entries.categories
+      self.codes = array('H',entries.categoryCol)
+      code = None
+    else:
+      code = self.categories.code
+    for (key,e) in entries.items():
+      if code != None:
+        self.codes.append(code(e.category))
+      self.named.append(e.name() != None)
+      self.fullNamed.append(e.fullname() != None)
+      parent = e.parent
+      if parent == None or len(parent) == 0:
+        self.parentCounts.append(0)
+        continue
+      self.parentCounts.append(len(parent))
+      kid = self.categories.code(e.category)
+      for p in parent:
+        self.edgeKids.append(kid)
+        self.edgeParents.append(p)
+        if p not in entries:
+          self.orphans.append((e.category,key,p))
+    # category of each edge's parent, through a map of ID to category code
+    keyCodes = dict([(k,c) for (k,c) in zip(entries.keys(),self.codes) if isinstance(k,str)])
+    self.edgeParentCodes = array('h',[keyCodes.get(p,GffReport.ORPHAN) for p in self.edgeParents])
+
+  def name(self,code):
+    return "orphan" if code == GffReport.ORPHAN else self.categories.name(code)
+
+  ##############################################################################
+  #
+  # the reports, as data
+
+  def stats(self):
+    """ Number of entries of each category, in first-seen order. """
+    counts = Counter(self.codes)
+    return [(self.name(c),counts[c]) for c in sorted(counts)]
+
+  def topLevelTypes(self):
+    """ Categories with at least one entry without a parent. """
+    return [self.name(c) for c in sorted(set(compress(self.codes,[n == 0 for n in self.parentCounts])))]
+
+  def hasName(self):
+    return sorted([self.name(c) for c in set(compress(self.codes,self.named))])
+
+  def hasFullName(self):
+    return sorted([self.name(c) for c in set(compress(self.codes,self.fullNamed))])
+
+  def parentTypes(self):
+    """ Map of child category to the categories of its parents. """
+    result = {}
+    for (kid,parent) in sorted(set(zip(self.edgeKids,self.edgeParentCodes))):
+      result.setdefault(self.name(kid),[]).append(self.name(parent))
+    return result
+
+  def maxKids(self):
+    """ Map of parent category to the most children of each category any
+        one parent of that category has. """
+    perParent = Counter(zip(self.edgeParents,self.edgeParentCodes,self.edgeKids))
+    result = {}
+    for ((parent,pcode,kid),n) in perParent.items():
+      if pcode == GffReport.ORPHAN:
+        continue
+      kids = result.setdefault(self.name(pcode),{})
+      if n > kids.get(self.name(kid),0):
+        kids[self.name(kid)] = n
+    return result
+
+  def combined(self):
+    """ Every report, for one document (e.g. json.dump). """
+    return {"entries": len(self.codes),
+            "stats": dict(self.stats()),
+            "topLevelTypes": self.topLevelTypes(),
+            "parentTypes": self.parentTypes(),
+            "hasName": self.hasName(),
+            "hasFullName": self.hasFullName(),
+            "maxKids": self.maxKids(),
+            "orphans": len(self.orphans)}
+
+  ##############################################################################
+  #
+  # the reports, as the text the mouseAnno commands write
+
+  def writeStats(self,fd):
+    for (t,v) in self.stats():
+      fd.write("%09d\t%s\n" % (v,t))
+
+  def writeTopLevelTypes(self,fd):
+    for t in self.topLevelTypes():
+      print(t,file=fd)
+
+  def writeParentTypes(self,fd,log=sys.stderr):
+    for (category,key,p) in self.orphans:
+      log.write("Orphan: %s %s %s\n" % (category,key,p))
+    for (e,p) in self.parentTypes().items():
+      fd.write("%s : %s\n" % (e,",".join(p)))
+
+  def writeHasName(self,fd):
+    for c in self.hasName():
+      print(c,file=fd)
+
+  def writeHasFullName(self,fd):
+    for c in self.hasFullName():
+      print(c,file=fd)
+
+  def writeMaxKids(self,fd):
+    for (t,tmap) in sorted(self.maxKids().items()):
+      print(t,file=fd)
+      for (k,v) in sorted(tmap.items()):
+        print("    %s : %d" % (k,v),file=fd)
+
+  def write(self,fd):
+    """ All the reports, one section each. """
+    fd.write("## entries\t%d\n" % (len(self.codes),))
+    for (title,method) in (("stats",self.writeStats),
+                           ("topLevel",self.writeTopLevelTypes),
+                           ("idParents",self.writeParentTypes),
+                           ("hasName",self.writeHasName),
+                           ("hasFullName",self.writeHasFullName),
+                           ("maxKids",self.writeMaxKids)):
+      fd.write("## %s\n" % (title,))
+      method(fd)
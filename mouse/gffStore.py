@@ -0,0 +1,211 @@
+import sys
+from array import array
+from collections.abc import Mapping
+
+################################################################################
+#
+# class Codes -- interns a low-cardinality column (chromosome, source,
+#                category, ...) as small integer codes.
+
+class Codes:
+
+  def __init__(self):
+    self.names = []
+    self.codes = {}
+
+  def code(self,name):
+    c = self.codes.get(name)
+    if c == None:
+      c = len(self.names)
+      name = sys.intern(name)
+      self.names.append(name)
+      self.codes[name] = c
+    return c
+
+  def name(self,code):
+    return self.names[code]
+
+  def __len__(self):
+    return len(self.names)
+
+################################################################################
+#
+# class GffRow -- a read-only view of one row of a GffStore, with the same
+#                access API as GffEntry.
+
+class GffRow:
+
+  __slots__ = ("store","row")
+
+  def __init__(self,store,row):
+    self.store = store
+    self.row = row
+
+  @property
+  def oid(self):
+    return self.store.ids[self.row]
+
+  @property
+  def chrom(self):
+    return self.store.chroms.names[self.store.chromCol[self.row]]
+
+  @property
+  def source(self):
+    return self.store.sources.names[self.store.sourceCol[self.row]]
+
+  @property
+  def category(self):
+    return self.store.categories.names[self.store.categoryCol[self.row]]
+
+  @property
+  def left(self):
+    return self.store.leftCol[self.row]
+
+  @property
+  def right(self):
+    return self.store.rightCol[self.row]
+
+  @property
+  def score(self):
+    return self.store.scores.names[self.store.scoreCol[self.row]]
+
+  @property
+  def strand(self):
+    return self.store.strands.names[self.store.strandCol[self.row]]
+
+  @property
+  def frame(self):
+    return self.store.frames.names[self.store.frameCol[self.row]]
+
+  @property
+  def parent(self):
+    return self.store.parentOf(self.row)
+
+  @property
+  def attrs(self):
+    attrMap = {}
+    if not isinstance(self.oid,int):
+      attrMap["ID"] = self.oid
+    parent = self.store.parentCol[self.row]
+    if parent != None:
+      attrMap["Parent"] = set(self.parent)
+    flat = self.store.attrCol[self.row]
+    for i in range(0,len(flat),2):
+      attrMap[flat[i]] = flat[i+1]
+    return attrMap
+
+  def name(self):
+    return self.store.attrValue(self.row,"Name",None)
+
+  def fullname(self):
+    return self.store.attrValue(self.row,"fullname",None)
+
+  def attribute(self,attr):
+    return self.store.attrValue(self.row,attr,"None")
+
+  def attrNames(self):
+    return self.attrs.keys()
+
+################################################################################
+#
+# class GffStore -- columnar replacement for the GffFile.entries dict.  Maps
+#                   ID to GffRow; coordinates live in arrays, the
+#                   low-cardinality columns are interned as integer codes, a
+#                   single Parent is held as a plain string and the remaining
+#                   attributes as a flat (key,value,...) tuple.  Entries
+#                   without an ID are keyed by their row number.
+
+class GffStore(Mapping):
+
+  def __init__(self):
+    self.index = {}
+    self.ids = []
+    self.chroms = Codes()
+    self.sources = Codes()
+    self.categories = Codes()
+    self.scores = Codes()
+    self.strands = Codes()
+    self.frames = Codes()
+    self.chromCol = array('H')
+    self.sourceCol = array('H')
+    self.categoryCol = array('H')
+    self.leftCol = array('l')
+    self.rightCol = array('l')
+    self.scoreCol = array('L')
+    self.strandCol = array('B')
+    self.frameCol = array('B')
+    self.parentCol = []
+    self.attrCol = []
+    self.parentMap = ParentMap(self)
+
+  def add(self,entry):
+    row = len(self.ids)
+    attrs = entry.attrs
+    oid = attrs["ID"] if "ID" in attrs else row
+    self.ids.append(oid)
+    self.chromCol.append(self.chroms.code(entry.chrom))
+    self.sourceCol.append(self.sources.code(entry.source))
+    self.categoryCol.append(self.categories.code(entry.category))
+    self.leftCol.append(entry.left)
+    self.rightCol.append(entry.right)
+    self.scoreCol.append(self.scores.code(entry.score))
+    self.strandCol.append(self.strands.code(entry.strand))
+    self.frameCol.append(self.frames.code(entry.frame))
+    parent = entry.parent
+    if parent != None:
+      parent = next(iter(parent)) if len(parent) == 1 else tuple(parent)
+    self.parentCol.append(parent)
+    flat = []
+    for k,v in attrs.items():
+      if k != "ID" and k != "Parent":
+        flat.append(sys.intern(k))
+        flat.append(v)
+    self.attrCol.append(tuple(flat))
+    self.index[oid] = row
+    return oid
+
+  def parentOf(self,row):
+    parent = self.parentCol[row]
+    if parent == None or isinstance(parent,tuple):
+      return parent
+    return (parent,)
+
+  def attrValue(self,row,attr,default):
+    flat = self.attrCol[row]
+    for i in range(0,len(flat),2):
+      if flat[i] == attr:
+        return flat[i+1]
+    return default
+
+  def __getitem__(self,oid):
+    return GffRow(self,self.index[oid])
+
+  def __contains__(self,oid):
+    return oid in self.index
+
+  def __iter__(self):
+    return iter(self.index)
+
+  def __len__(self):
+    return len(self.index)
+
+################################################################################
+#
+# class ParentMap -- GffFile.parents as a view onto the store's Parent column.
+
+class ParentMap(Mapping):
+
+  def __init__(self,store):
+    self.store = store
+
+  def __getitem__(self,oid):
+    return self.store.parentOf(self.store.index[oid])
+
+  def __contains__(self,oid):
+    return oid in self.store.index
+
+  def __iter__(self):
+    return iter(self.store.index)
+
+  def __len__(self):
+    return len(self.store.index)
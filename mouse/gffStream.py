@@ -0,0 +1,94 @@
+import logging
+
+from mouse.gffEntry import GffEntry
+from mouse.gffFile import GffFile
+
+################################################################################
+#
+# class GffStream -- walks a GFF file one block at a time, so that only the
+#                    current gene (and its transcripts and parts) is held in
+#                    memory.
+#
+# Ensembl GFF3 files separate genes with '###' lines.  Entries are collected
+# into a window until a '###' line is reached at which every Parent seen in
+# the window has also been seen in the window; the window is then handed on
+# as a small GffFile and a new one is started.  If references are still open
+# at the '###' the next block is pulled into the same window (lookahead), so
+# a file without block separators (or with a gene split across blocks)
+# degrades into the ordinary in-memory load.  A Parent that was in a window
+# already handed on cannot be joined up again: the child is split off into
+# the current window, with a warning.
+
+class GffStream:
+
+  def __init__(self,maxWindow=200000,ucsc=True,lazy=False,types=None):
+    self.maxWindow = maxWindow
+    self.ucsc = ucsc
+    self.lazy = lazy
+    self.types = types
+    self.windowCount = 0
+    self.largestWindow = 0
+
+  def windows(self,fd):
+    window = GffFile()
+    pending = set()
+    closed = set()          # IDs of the windows already handed on
+    warned = False
+    crossed = 0
+    for line in fd:
+      if line == "##FASTA\n":
+        break
+      elif line.startswith("###"):
+        if len(pending) == 0 and len(window.entries) > 0:
+          closed.update([k for k in window.entries if isinstance(k,str)])
+          yield self.closeWindow(window)
+          window = GffFile()
+        continue
+      elif line[0] == "#":
+        continue
+      if self.types != None and GffEntry.skipLine(line,self.types):
+        continue
+      entry = GffEntry.parse(line,ucsc=self.ucsc,lazy=self.lazy)
+      if entry == None:
+        continue
+      if self.types != None and entry.category not in self.types:
+        continue
+      if not window.addEntry(entry):
+        continue
+      pending.discard(entry.oid)
+      if entry.parent != None:
+        for par in entry.parent:
+          if par in closed:
+            if crossed == 0:
+              logging.getLogger().warning("STREAM %s refers to %s in an earlier block, split off from it" % (entry.oid,par))
+            crossed += 1
+          elif par not in window.entries:
+            pending.add(par)
+      if not warned and len(window.entries) > self.maxWindow:
+        logging.getLogger().warning("STREAM window exceeds %d entries, input may not be '###'-delimited; continuing in memory" % (self.maxWindow,))
+        warned = True
+    fd.close()
+    if crossed > 1:
+      logging.getLogger().warning("STREAM %d references to earlier blocks split off" % (crossed,))
+    if len(pending) > 0:
+      logging.getLogger().warning("STREAM %d parents never seen, e.g. %s" % (len(pending),next(iter(pending))))
+    if len(window.entries) > 0:
+      yield self.closeWindow(window)
+
+  def closeWindow(self,window):
+    self.windowCount += 1
+    if len(window.entries) > self.largestWindow:
+      self.largestWindow = len(window.entries)
+    return window
+
+  def makeAnno(self,fd,categories,ucsc,outFD,base=None,compress=False):
+    categories = GffFile.annoCategories(categories)
+    writers = GffFile.annoWriters(categories,outFD,base,compress)
+    for window in self.windows(fd):
+      window.writeAnno(categories,writers)
+    for w in set(writers.values()):
+      if base == None:
+        w.flush()
+      else:
+        w.close()
+    logging.getLogger().debug("STREAM %d windows, largest %d entries" % (self.windowCount,self.largestWindow))
@@ -0,0 +1,42 @@
+import sys
+import gzip
+
+################################################################################
+#
+# class LineWriter -- collects output lines and hands them to the underlying
+#                     file in batches, rather than one write() per line.
+
+class LineWriter:
+
+  def __init__(self,fd,batch=8192):
+    self.fd = fd
+    self.batch = batch
+    self.lines = []
+    self.count = 0
+
+  def write(self,line):
+    self.lines.append(line)
+    if len(self.lines) >= self.batch:
+      self.flush()
+
+  def flush(self):
+    if len(self.lines) > 0:
+      self.fd.write("".join(self.lines))
+      self.count += len(self.lines)
+      self.lines = []
+
+  def close(self):
+    self.flush()
+    if self.fd not in (sys.stdout,sys.stderr):
+      self.fd.close()
+
+def openOutput(fn,compress=False):
+  """ Open a text output file, gzip-compressed if asked or if the name ends
+      in '.gz'; '-' is standard output. """
+  if fn == "-":
+    if compress:
+      return gzip.open(sys.stdout.buffer,"wt")
+    return sys.stdout
+  if compress or fn.endswith(".gz"):
+    return gzip.open(fn,"wt")
+  return open(fn,"w")
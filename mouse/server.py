@@ -0,0 +1,345 @@
+import os
+import json
+import time
+import logging
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from mouse.gffLineage import Lineage
+from mouse.gffIndex import IntervalIndex
+from mouse.lineWriter import LineWriter
+from mouse.timing import LatencyMetrics
+
+################################################################################
+#
+# A query server over one loaded GffFile.
+#
+# The annotation is loaded once, and its lineage and interval index built
+# up front, so requests only read shared tables; each connection gets its
+# own thread.  The protocol is HTTP/1.1 with JSON bodies, on a localhost
+# TCP port or a Unix socket, so curl works as a client as well as
+# mouse.client.  Operations (GET /<op>?<params>, or several at once as
+# POST /batch {"requests": [{"op": ..., <params>}, ...]}):
+#   entry      id (repeatable)            -- the entries, null if unknown
+#   offspring  id, all=1 for the subtree  -- keys of the children
+#   lineage    id                         -- gene, transcript, name, biotype
+#   overlap    chrom, start, end (1-based, inclusive), category, strand
+#   nearest    chrom, start, end, category
+#   export     category, format=gtf|bed   -- text, streamed (not in batch)
+#   metrics, health
+# Entries without an ID go by their IntervalIndex key, parent:category:
+# left-right.
+
+class RequestError(Exception):
+
+  def __init__(self,status,message):
+    Exception.__init__(self,message)
+    self.status = status
+
+class StreamError(Exception):
+  """ A streamed response failed after its headers went out. """
+
+################################################################################
+#
+# class AnnoService -- the operations, as dicts for json.dump.
+
+class AnnoService:
+
+  BATCH_OPS = ("entry","offspring","lineage","overlap","nearest")
+  LEVELS = {Lineage.GENE: "gene",Lineage.TRANSCRIPT: "transcript",Lineage.PART: "part"}
+
+  def __init__(self,gff,name=None):
+    self.gff = gff
+    self.name = name
+    self.metrics = LatencyMetrics()
+    started = time.perf_counter()
+    if gff.lazy:
+      # decoding on first use writes to the entry; do it now, while there
+      # is one thread
+      for e in gff.entries.values():
+        e.attrs
+    self.lin = gff.lineage()
+    self.index = gff.intervalIndex()
+    self.index.chroms()
+    self.anonymous = IntervalIndex.keyMap(gff)
+    logging.getLogger().info("SERVE indexed %d entries in %.2fs" % (len(gff.entries),time.perf_counter() - started))
+
+  @staticmethod
+  def param(params,key,default=None,kind=str):
+    """ One parameter: a list (from a query string) gives its last value. """
+    value = params.get(key,default)
+    if isinstance(value,list):
+      value = value[-1] if len(value) > 0 else default
+    if value == None:
+      if default == None:
+        raise RequestError(400,"missing parameter '%s'" % (key,))
+      return default
+    try:
+      return kind(value)
+    except ValueError:
+      raise RequestError(400,"bad value for '%s': %s" % (key,value))
+
+  @staticmethod
+  def option(params,key):
+    return AnnoService.param(params,key) if key in params else None
+
+  def key(self,oid):
+    """ The entries key for an ID, or an index key of an entry without one. """
+    if isinstance(oid,str) and oid in self.gff.entries:
+      return oid
+    return self.anonymous.get(oid)
+
+  def label(self,key):
+    """ What a client calls entry 'key'. """
+    return IntervalIndex.featureKey(key,self.gff.entries[key])
+
+  def describe(self,key):
+    e = self.gff.entries[key]
+    attrs = {}
+    for (k,v) in e.attrs.items():
+      attrs[k] = sorted(v) if isinstance(v,(set,frozenset,tuple)) else v
+    return {"id": self.label(key),"chrom": e.chrom,"source": e.source,"category": e.category,
+            "start": e.left,"end": e.right,"score": e.score,"strand": e.strand,
+            "frame": e.frame,"attributes": attrs}
+
+  ##############################################################################
+  #
+  # operations
+
+  def entry(self,params):
+    ids = params.get("id",[])
+    if isinstance(ids,str):
+      ids = [ids]
+    if len(ids) == 0:
+      raise RequestError(400,"missing parameter 'id'")
+    keys = [self.key(oid) for oid in ids]
+    return {"entries": [None if k == None else self.describe(k) for k in keys]}
+
+  def known(self,params):
+    oid = AnnoService.param(params,"id")
+    key = self.key(oid)
+    if key == None:
+      raise RequestError(404,"no entry '%s'" % (oid,))
+    return key
+
+  def offspring(self,params):
+    key = self.known(params)
+    if AnnoService.param(params,"all","0") not in ("0","false",False,0):
+      kids = [self.label(k) for k in self.gff.subtree(key)[1:]]
+    else:
+      kids = sorted([self.label(k) for k in self.gff.offspring.get(key,[])])
+    return {"id": self.label(key),"offspring": kids}
+
+  def lineage(self,params):
+    key = self.known(params)
+    row = self.lin.get(key)
+    if row == None:
+      raise RequestError(404,"no lineage for '%s' (missing parent)" % (key,))
+    (gene,transcript,name,biotype) = row
+    return {"id": self.label(key),"level": AnnoService.LEVELS[self.lin.levels[key]],
+            "gene_id": gene,"transcript_id": transcript,"gene_name": name,
+            "biotype": biotype}
+
+  def region(self,params):
+    chrom = AnnoService.param(params,"chrom")
+    start = AnnoService.param(params,"start",kind=int)
+    end = AnnoService.param(params,"end",start,kind=int)
+    return (chrom,start,end,AnnoService.option(params,"category"))
+
+  def overlap(self,params):
+    (chrom,start,end,category) = self.region(params)
+    strand = AnnoService.option(params,"strand")
+    return {"ids": self.index.overlaps(chrom,start,end,category,strand)}
+
+  def nearest(self,params):
+    (chrom,start,end,category) = self.region(params)
+    (dist,ids) = self.index.nearest(chrom,start,end,category)
+    return {"distance": dist,"ids": ids}
+
+  def batch(self,body):
+    """ Answers to each request of a batch, in order; a failed request
+        gives {"error": ..., "status": ...} in its place. """
+    requests = body.get("requests") if isinstance(body,dict) else None
+    if not isinstance(requests,list):
+      raise RequestError(400,"batch needs {\"requests\": [...]}")
+    results = []
+    for req in requests:
+      started = time.perf_counter()
+      op = req.get("op") if isinstance(req,dict) else None
+      try:
+        if op not in AnnoService.BATCH_OPS:
+          raise RequestError(400,"unknown batch operation '%s'" % (op,))
+        results.append(getattr(self,op)(req))
+        self.metrics.record("batch." + op,time.perf_counter() - started)
+      except RequestError as ex:
+        results.append({"error": str(ex),"status": ex.status})
+        self.metrics.record("batch." + str(op),time.perf_counter() - started,ok=False)
+    return {"results": results}
+
+  def health(self,params):
+    return {"entries": len(self.gff.entries),"file": self.name,
+            "uptime": time.perf_counter() - self.metrics.started}
+
+  EXPORT_FORMATS = ("gtf","bed")
+
+  @staticmethod
+  def exportParams(params):
+    category = AnnoService.param(params,"category")
+    fmt = AnnoService.param(params,"format","gtf")
+    if fmt not in AnnoService.EXPORT_FORMATS:
+      raise RequestError(400,"unknown export format '%s'" % (fmt,))
+    return (category,fmt)
+
+  def export(self,params,out):
+    """ GTF (writeAnno) or BED (the makeTrackSet rows) of one category. """
+    (category,fmt) = AnnoService.exportParams(params)
+    writer = LineWriter(out)
+    if fmt == "gtf":
+      self.gff.writeAnno([category],{category: writer})
+    else:
+      for (tag,line) in self.gff.trackLines():
+        if tag == category:
+          writer.write(line + "\n")
+    writer.flush()
+    return writer.count
+
+################################################################################
+#
+# class RequestHandler -- HTTP/1.1 front end of an AnnoService.
+
+class ChunkedWriter:
+  """ Text file object sending what is written as HTTP chunks. """
+
+  def __init__(self,wfile):
+    self.wfile = wfile
+
+  def write(self,text):
+    data = text.encode()
+    if len(data) > 0:
+      self.wfile.write(b"%x\r\n%s\r\n" % (len(data),data))
+
+  def close(self):
+    self.wfile.write(b"0\r\n\r\n")
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+  protocol_version = "HTTP/1.1"
+  timeout = 300                  # idle keep-alive connections give up their thread
+  # buffer responses: they go out when the request is done (and its metrics
+  # recorded), or a buffer at a time while an export streams
+  wbufsize = 1 << 16
+  GET_OPS = ("entry","offspring","lineage","overlap","nearest","health")
+
+  def address_string(self):
+    # Unix socket clients have no address
+    return self.client_address[0] if isinstance(self.client_address,tuple) else "unix"
+
+  def log_message(self,format,*args):
+    logging.getLogger().debug("SERVE %s %s" % (self.address_string(),format % args))
+
+  def sendJson(self,status,result):
+    data = json.dumps(result).encode()
+    self.send_response(status)
+    self.send_header("Content-Type","application/json")
+    self.send_header("Content-Length",str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def run(self,op,action):
+    service = self.server.service
+    started = time.perf_counter()
+    ok = True
+    try:
+      action(service)
+    except RequestError as ex:
+      ok = False
+      self.sendJson(ex.status,{"error": str(ex)})
+    except StreamError:
+      ok = False
+    except Exception as ex:
+      ok = False
+      logging.getLogger().exception("SERVE %s failed" % (op,))
+      self.sendJson(500,{"error": "%s: %s" % (ex.__class__.__name__,ex)})
+    service.metrics.record(op,time.perf_counter() - started,ok)
+
+  def do_GET(self):
+    url = urlsplit(self.path)
+    op = url.path.strip("/")
+    params = parse_qs(url.query)
+    if op in RequestHandler.GET_OPS:
+      self.run(op,lambda service: self.sendJson(200,getattr(service,op)(params)))
+    elif op == "metrics":
+      self.sendJson(200,self.server.service.metrics.report())
+    elif op == "export":
+      self.run(op,lambda service: self.sendExport(service,params))
+    else:
+      self.sendJson(404,{"error": "unknown operation '%s'" % (op,)})
+
+  def sendExport(self,service,params):
+    AnnoService.exportParams(params)
+    self.send_response(200)
+    self.send_header("Content-Type","text/plain")
+    self.send_header("Transfer-Encoding","chunked")
+    self.end_headers()
+    out = ChunkedWriter(self.wfile)
+    try:
+      service.export(params,out)
+    except Exception:
+      # no final chunk: the client sees a truncated response
+      logging.getLogger().exception("SERVE export failed")
+      self.close_connection = True
+      raise StreamError()
+    out.close()
+
+  def do_POST(self):
+    op = urlsplit(self.path).path.strip("/")
+    if op != "batch":
+      self.sendJson(404,{"error": "unknown operation '%s'" % (op,)})
+      return
+    length = int(self.headers.get("Content-Length","0"))
+    try:
+      body = json.loads(self.rfile.read(length).decode() or "null")
+    except ValueError as ex:
+      self.sendJson(400,{"error": "bad JSON: %s" % (ex,)})
+      return
+    self.run(op,lambda service: self.sendJson(200,service.batch(body)))
+
+################################################################################
+#
+# The servers: threaded HTTP on a localhost port, or on a Unix socket.
+
+class TcpServer(ThreadingHTTPServer):
+  daemon_threads = True
+
+class UnixServer(socketserver.ThreadingMixIn,socketserver.UnixStreamServer):
+  daemon_threads = True
+
+  def server_close(self):
+    socketserver.UnixStreamServer.server_close(self)
+    if os.path.exists(self.server_address):
+      os.remove(self.server_address)
+
+class AnnoServer:
+
+  def __init__(self,gff,port=0,socketPath=None,name=None):
+    self.service = AnnoService(gff,name)
+    if socketPath != None:
+      if os.path.exists(socketPath):
+        os.remove(socketPath)
+      self.server = UnixServer(socketPath,RequestHandler)
+      self.address = "unix:" + socketPath
+    else:
+      self.server = TcpServer(("127.0.0.1",port),RequestHandler)
+      self.address = "http://127.0.0.1:%d" % (self.server.server_address[1],)
+    self.server.service = self.service
+
+  def serve(self):
+    logging.getLogger().info("SERVE listening on %s" % (self.address,))
+    try:
+      self.server.serve_forever()
+    finally:
+      self.server.server_close()
+
+  def shutdown(self):
+    self.server.shutdown()
@@ -0,0 +1,118 @@
+import hashlib
+
+################################################################################
+#
+# class SymbolTable -- one shared string for each distinct chromosome,
+#                      source, category and score, and the chromosome names
+#                      of the other naming scheme.
+#
+# GffEntry.parse sends the low-cardinality columns through the table, so
+# every entry on chr1 holds the same 'chr1' object rather than a fresh copy
+# per row.  (Strand and frame are single characters, which CPython already
+# shares.)  Chromosome names are mapped once per distinct contig and the
+# result kept: 'style' is "ucsc" (Ensembl names to UCSC, the default),
+# "ensembl" (the reverse) or "asis".  Besides the built-in pairs, mapping
+# files for other assemblies and for alt/patch contigs can be added: tab-
+# separated lines of <Ensembl/GenBank name> <UCSC name> (further columns
+# and '#' lines are ignored; a missing UCSC name leaves the contig as it
+# is), as in UCSC chromAlias or Ensembl-to-UCSC tables.
+
+STYLES = ("ucsc","ensembl","asis")
+
+class SymbolTable:
+
+  def __init__(self,pairs=None,style="ucsc"):
+    if style not in STYLES:
+      raise ValueError("unknown chromosome naming '%s', expected one of %s" % (style,",".join(STYLES)))
+    self.style = style
+    self.strings = {}
+    self.chroms = {}       # contig as read -> name in 'style'
+    self.toUcsc = {}
+    self.toEnsembl = {}
+    self.added = []        # mapping pairs added beyond the built-in ones
+    for (other,ucsc) in (pairs or {}).items():
+      self.pair(other,ucsc)
+
+  def intern(self,s):
+    return self.strings.setdefault(s,s)
+
+  def pair(self,other,ucsc):
+    self.toUcsc[other] = ucsc
+    # the first name given for a UCSC contig is the one mapped back to
+    if ucsc not in self.toEnsembl:
+      self.toEnsembl[ucsc] = other
+    self.chroms = {}
+
+  def addMapping(self,other,ucsc):
+    self.pair(other,ucsc)
+    self.added.append((other,ucsc))
+
+  def loadMapping(self,fn):
+    """ Add the pairs of a mapping file; returns how many there were. """
+    n = 0
+    with open(fn) as fd:
+      for line in fd:
+        if line.startswith("#") or len(line.strip()) == 0:
+          continue
+        flds = line.rstrip("\r\n").split("\t")
+        if len(flds) < 2 or len(flds[1]) == 0 or flds[0] == flds[1]:
+          continue
+        self.addMapping(flds[0],flds[1])
+        n += 1
+    return n
+
+  def setStyle(self,style):
+    if style not in STYLES:
+      raise ValueError("unknown chromosome naming '%s', expected one of %s" % (style,",".join(STYLES)))
+    self.style = style
+    self.chroms = {}
+
+  def signature(self):
+    """ Names the naming in force, for cache keys: "" for the default. """
+    if self.style == "ucsc" and len(self.added) == 0:
+      return ""
+    h = hashlib.blake2b(digest_size=8)
+    h.update("\n".join(["%s\t%s" % p for p in self.added]).encode())
+    return "%s:%s" % (self.style,h.hexdigest())
+
+  ##############################################################################
+  #
+  # lookups
+
+  def ucscName(self,name):
+    return self.toUcsc.get(name,name)
+
+  def ensemblName(self,name):
+    return self.toEnsembl.get(name,name)
+
+  def chrom(self,name):
+    """ 'name' in the table's style, interned; computed once per contig. """
+    c = self.chroms.get(name)
+    if c == None:
+      if self.style == "ucsc":
+        c = self.ucscName(name)
+      elif self.style == "ensembl":
+        c = self.ensemblName(name)
+      else:
+        c = name
+      c = self.intern(c)
+      self.chroms[name] = c
+    return c
+
+  def aliases(self,name):
+    """ Every name 'name' goes by: itself, its UCSC and its other names. """
+    names = [name,self.ucscName(name),self.ensemblName(name)]
+    names.extend([o for (o,u) in self.toUcsc.items() if u == name])
+    result = []
+    for n in names:
+      if n not in result:
+        result.append(n)
+    return result
+
+  def internEntry(self,e):
+    """ Share the strings of an entry built elsewhere (e.g. unpickled). """
+    e.chrom = self.intern(e.chrom)
+    e.source = self.intern(e.source)
+    e.category = self.intern(e.category)
+    e.score = self.intern(e.score)
+    return e
@@ -0,0 +1,121 @@
+import random
+
+################################################################################
+#
+# class SyntheticGff -- writes a made-up mouse annotation in Ensembl GFF3
+#                       layout, for benchmarks and tests that need volume.
+#
+# Genes are laid out along the chromosomes in '###'-separated blocks; each
+# gene has a number of transcripts, each transcript a number of exons, and
+# coding transcripts get CDS and UTR rows.  Excluded rows
+# (biological_region), top-level transposable elements and RNAcentral
+# GTF-style rows are mixed in.  Output depends only on the parameters and
+# the seed.
+
+class SyntheticGff:
+
+  CHROMS = [str(c) for c in range(1,20)] + ["X","Y","MT"]
+
+  # (gene type, transcript type, biotype)
+  KINDS = [("gene","mRNA","protein_coding")] * 6 + \
+          [("ncRNA_gene","lnc_RNA","lncRNA")] * 2 + \
+          [("ncRNA_gene","snRNA","snRNA"),("ncRNA_gene","miRNA","miRNA"),
+           ("pseudogene","pseudogenic_transcript","processed_pseudogene")]
+
+  RNACENTRAL_TYPES = ["miRNA","snRNA","snoRNA","tRNA","rRNA"]
+
+  def __init__(self,genes=1000,transcripts=3,exons=6,rnacentral=0,
+               transposons=0,regions=0,seed=1):
+    self.genes = genes
+    self.transcripts = transcripts
+    self.exons = exons
+    self.rnacentral = rnacentral
+    self.transposons = transposons
+    self.regions = regions
+    self.seed = seed
+
+  def write(self,fd):
+    rnd = random.Random(self.seed)
+    fd.write("##gff-version 3\n")
+    perChrom = max(1,self.genes // len(SyntheticGff.CHROMS))
+    extra = [("te",i) for i in range(self.transposons)] + \
+            [("region",i) for i in range(self.regions)] + \
+            [("rnacentral",i) for i in range(self.rnacentral)]
+    rnd.shuffle(extra)
+    g = 0
+    for ci,chrom in enumerate(SyntheticGff.CHROMS):
+      fd.write("##sequence-region   %s 1 %d\n" % (chrom,200000000))
+      pos = 3000000
+      count = perChrom if ci < len(SyntheticGff.CHROMS) - 1 else self.genes - g
+      for n in range(count):
+        pos += rnd.randint(2000,40000)
+        pos = self.writeGene(fd,rnd,chrom,pos,g)
+        g += 1
+        while len(extra) > 0 and rnd.random() < len(extra) / float(max(1,self.genes)):
+          (kind,i) = extra.pop()
+          pos += rnd.randint(500,5000)
+          self.writeExtra(fd,rnd,chrom,pos,kind,i)
+      if g >= self.genes:
+        break
+    for (kind,i) in extra:
+      self.writeExtra(fd,rnd,"1",rnd.randint(1,190000000),kind,i)
+
+  def writeGene(self,fd,rnd,chrom,pos,g):
+    (gtype,ttype,biotype) = rnd.choice(SyntheticGff.KINDS)
+    strand = rnd.choice("+-")
+    gid = "ENSMUSG%011d" % (g,)
+    name = "Gm%d" % (g,)
+    coding = ttype == "mRNA"
+    nTx = rnd.randint(1,2 * self.transcripts - 1)
+    rows = []
+    gEnd = pos
+    for t in range(nTx):
+      tid = "ENSMUST%011d" % (g * 100 + t,)
+      nEx = rnd.randint(1,2 * self.exons - 1)
+      exons = []
+      x = pos + rnd.randint(0,500)
+      for e in range(nEx):
+        length = rnd.randint(50,400)
+        exons.append((x,x + length - 1))
+        x += length + rnd.randint(200,5000)
+      tEnd = exons[-1][1]
+      gEnd = max(gEnd,tEnd)
+      tRows = []
+      for e,(l,r) in enumerate(exons):
+        rank = e + 1 if strand == "+" else nEx - e
+        tRows.append((l,"exon",r,".","Parent=transcript:%s;Name=ENSMUSE%011d;exon_id=ENSMUSE%011d;rank=%d" % (tid,g*10000+t*100+e,g*10000+t*100+e,rank)))
+      if coding:
+        self.addCds(tRows,exons,tid,strand)
+      rows.append((exons[0][0],tEnd,tid,tRows))
+    fd.write("%s\tensembl_havana\t%s\t%d\t%d\t.\t%s\t.\tID=gene:%s;Name=%s;biotype=%s;description=synthetic gene %d [Source:MGI Symbol%%3BAcc:MGI:%d];gene_id=%s;version=1\n" % (chrom,gtype,pos,gEnd,strand,gid,name,biotype,g,g,gid))
+    for t,(l,r,tid,tRows) in enumerate(rows):
+      fd.write("%s\thavana\t%s\t%d\t%d\t.\t%s\t.\tID=transcript:%s;Parent=gene:%s;Name=%s-%d;biotype=%s;transcript_id=%s;version=1\n" % (chrom,ttype,l,r,strand,tid,gid,name,201+t,biotype,tid))
+      tRows.sort()
+      for (left,cat,right,frame,attrs) in tRows:
+        fd.write("%s\thavana\t%s\t%d\t%d\t.\t%s\t%s\t%s\n" % (chrom,cat,left,right,strand,frame,attrs))
+    fd.write("###\n")
+    return gEnd
+
+  def addCds(self,tRows,exons,tid,strand):
+    pid = "ENSMUSP" + tid[7:]
+    (first,last) = (exons[0],exons[-1])
+    for i,(l,r) in enumerate(exons):
+      cl = l + 20 if i == 0 else l
+      cr = r - 20 if i == len(exons) - 1 else r
+      if cr > cl:
+        tRows.append((cl,"CDS",cr,str(i % 3),"ID=CDS:%s;Parent=transcript:%s;protein_id=%s" % (pid,tid,pid)))
+    (five,three) = ("five_prime_UTR","three_prime_UTR") if strand == "+" else ("three_prime_UTR","five_prime_UTR")
+    tRows.append((first[0],five,first[0] + 19,".","Parent=transcript:%s" % (tid,)))
+    tRows.append((last[1] - 19,three,last[1],".","Parent=transcript:%s" % (tid,)))
+
+  def writeExtra(self,fd,rnd,chrom,pos,kind,i):
+    if kind == "te":
+      fd.write("%s\trepeatmasker\ttransposable_element\t%d\t%d\t.\t%s\t.\tID=TE%09d;Name=L1Md_%d\n" % (chrom,pos,pos + rnd.randint(300,6000),rnd.choice("+-"),i,i % 50))
+    elif kind == "region":
+      fd.write("%s\t.\tbiological_region\t%d\t%d\t0.9\t.\t.\texternal_name=oe %%3D 0.79;logic_name=cpg\n" % (chrom,pos,pos + rnd.randint(100,1000)))
+    else:
+      urs = "URS%010X_10090" % (i,)
+      rtype = rnd.choice(SyntheticGff.RNACENTRAL_TYPES)
+      end = pos + rnd.randint(60,200)
+      fd.write("%s\tRNAcentral\ttranscript\t%d\t%d\t.\t+\t.\tID \"%s\";type \"%s\"\n" % (chrom,pos,end,urs,rtype))
+      fd.write("%s\tRNAcentral\tnoncoding_exon\t%d\t%d\t.\t+\t.\tID \"%s.1\";type \"noncoding_exon\";Parent \"%s\"\n" % (chrom,pos,end,urs,urs))
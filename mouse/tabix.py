@@ -0,0 +1,251 @@
+import gzip
+import struct
+
+from mouse.bgzf import BgzfWriter, BgzfReader
+
+################################################################################
+#
+# Tabix (.tbi) indexes of coordinate-sorted, BGZF-compressed text files.
+#
+# The index is the one htslib writes: per sequence, the UCSC binning scheme
+# (bins of 16KB up to 512MB, each holding chunks of virtual offsets) and a
+# linear index of the first offset overlapping each 16KB window.  The file
+# is indexed as it is written, so it is never held in memory, and must
+# arrive sorted by sequence (each sequence in one run) and start.
+
+TBI_MAGIC = b"TBI\x01"
+TBX_UCSC = 0x10000
+LINEAR_SHIFT = 14
+
+def reg2bin(beg,end):
+  """ Smallest bin holding the 0-based, half-open region [beg,end). """
+  end -= 1
+  if beg >> 14 == end >> 14:
+    return ((1 << 15) - 1) // 7 + (beg >> 14)
+  if beg >> 17 == end >> 17:
+    return ((1 << 12) - 1) // 7 + (beg >> 17)
+  if beg >> 20 == end >> 20:
+    return ((1 << 9) - 1) // 7 + (beg >> 20)
+  if beg >> 23 == end >> 23:
+    return ((1 << 6) - 1) // 7 + (beg >> 23)
+  if beg >> 26 == end >> 26:
+    return ((1 << 3) - 1) // 7 + (beg >> 26)
+  return 0
+
+def reg2bins(beg,end):
+  """ Every bin that may hold records overlapping [beg,end). """
+  end -= 1
+  bins = [0]
+  for (first,shift) in ((1,26),(9,23),(73,20),(585,17),(4681,14)):
+    bins.extend(range(first + (beg >> shift),first + (end >> shift) + 1))
+  return bins
+
+################################################################################
+#
+# class TabixIndex -- the bins and linear index of each sequence.
+
+class TabixIndex:
+
+  # (format, sequence column, start column, end column), columns 1-based
+  PRESETS = {"bed": (TBX_UCSC,1,2,3),
+             "gff": (0,1,4,5)}
+
+  def __init__(self,preset="bed"):
+    (self.format,self.colSeq,self.colBeg,self.colEnd) = TabixIndex.PRESETS[preset]
+    self.meta = "#"
+    self.skip = 0
+    self.names = []
+    self.refs = []    # per sequence: (bins,linear), bins map bin -> [[beg,end],...]
+
+  def region(self,line):
+    """ (sequence,beg,end) of a line, 0-based half-open; None for a header. """
+    if line.startswith(self.meta):
+      return None
+    flds = line.split("\t",self.colEnd)
+    beg = int(flds[self.colBeg-1])
+    if not self.format & TBX_UCSC:
+      beg -= 1
+    end = int(flds[self.colEnd-1]) if self.colEnd > 0 else beg + 1
+    return (flds[self.colSeq-1],beg,end)
+
+  def add(self,seq,beg,end,vbeg,vend):
+    if len(self.names) == 0 or self.names[-1] != seq:
+      if seq in self.names:
+        raise ValueError("tabix: sequence '%s' is not contiguous, input must be sorted" % (seq,))
+      self.names.append(seq)
+      self.refs.append(({},[]))
+      self.lastBeg = -1
+    if beg < self.lastBeg:
+      raise ValueError("tabix: %s:%d comes after %d, input must be sorted" % (seq,beg,self.lastBeg))
+    self.lastBeg = beg
+    (bins,linear) = self.refs[-1]
+    chunks = bins.setdefault(reg2bin(beg,max(end,beg+1)),[])
+    if len(chunks) > 0 and chunks[-1][1] == vbeg:
+      chunks[-1][1] = vend
+    else:
+      chunks.append([vbeg,vend])
+    last = (max(end,beg+1) - 1) >> LINEAR_SHIFT
+    if len(linear) <= last:
+      linear.extend([None] * (last + 1 - len(linear)))
+    for w in range(beg >> LINEAR_SHIFT,last + 1):
+      if linear[w] == None:
+        linear[w] = vbeg
+
+  @staticmethod
+  def filled(linear):
+    """ The linear index with empty windows given the next window's offset. """
+    result = list(linear)
+    following = 0
+    for i in range(len(result) - 1,-1,-1):
+      if result[i] == None:
+        result[i] = following
+      following = result[i]
+    return result
+
+  def save(self,fn):
+    names = b"".join([n.encode() + b"\0" for n in self.names])
+    with BgzfWriter(fn) as out:
+      out.write(TBI_MAGIC)
+      out.write(struct.pack("<8i",len(self.names),self.format,self.colSeq,
+                            self.colBeg,self.colEnd,ord(self.meta),self.skip,
+                            len(names)))
+      out.write(names)
+      for (bins,linear) in self.refs:
+        out.write(struct.pack("<i",len(bins)))
+        for b in sorted(bins):
+          out.write(struct.pack("<Ii",b,len(bins[b])))
+          for (cbeg,cend) in bins[b]:
+            out.write(struct.pack("<QQ",cbeg,cend))
+        linear = TabixIndex.filled(linear)
+        out.write(struct.pack("<i",len(linear)))
+        out.write(struct.pack("<%dQ" % (len(linear),),*linear))
+
+  @classmethod
+  def load(cls,fn):
+    with gzip.open(fn,"rb") as fd:
+      data = fd.read()
+    if data[0:4] != TBI_MAGIC:
+      raise ValueError("%s: not a tabix index" % (fn,))
+    idx = cls()
+    (nRef,idx.format,idx.colSeq,idx.colBeg,idx.colEnd,meta,idx.skip,lNames) = struct.unpack_from("<8i",data,4)
+    idx.meta = chr(meta)
+    pos = 36
+    idx.names = [n.decode() for n in data[pos:pos+lNames].split(b"\0")[:nRef]]
+    pos += lNames
+    for r in range(nRef):
+      bins = {}
+      (nBin,) = struct.unpack_from("<i",data,pos)
+      pos += 4
+      for i in range(nBin):
+        (b,nChunk) = struct.unpack_from("<Ii",data,pos)
+        pos += 8
+        flat = struct.unpack_from("<%dQ" % (2 * nChunk,),data,pos)
+        pos += 16 * nChunk
+        bins[b] = [[flat[j],flat[j+1]] for j in range(0,len(flat),2)]
+      (nIntv,) = struct.unpack_from("<i",data,pos)
+      pos += 4
+      linear = list(struct.unpack_from("<%dQ" % (nIntv,),data,pos))
+      pos += 8 * nIntv
+      idx.refs.append((bins,linear))
+    return idx
+
+  def chunks(self,seq,beg,end):
+    """ Merged (vbeg,vend) chunks that may hold records overlapping
+        [beg,end) on 'seq'. """
+    if seq not in self.names:
+      return []
+    (bins,linear) = self.refs[self.names.index(seq)]
+    w = beg >> LINEAR_SHIFT
+    linear = TabixIndex.filled(linear)
+    if w < len(linear):
+      minOff = linear[w]
+    else:
+      minOff = linear[-1] if len(linear) > 0 else 0
+    found = []
+    for b in reg2bins(beg,end):
+      for (cbeg,cend) in bins.get(b,[]):
+        if cend > minOff:
+          found.append([max(cbeg,minOff),cend])
+    found.sort()
+    merged = []
+    for c in found:
+      if len(merged) > 0 and c[0] <= merged[-1][1]:
+        merged[-1][1] = max(merged[-1][1],c[1])
+      else:
+        merged.append(c)
+    return merged
+
+################################################################################
+#
+# class TabixWriter -- text file object writing BGZF and, on close, its
+#                      .tbi index.  Lines may arrive in pieces.
+
+class TabixWriter:
+
+  def __init__(self,fn,preset="bed"):
+    self.fn = fn
+    self.out = BgzfWriter(fn)
+    self.index = TabixIndex(preset)
+    self.partial = ""
+
+  def write(self,text):
+    text = self.partial + text
+    lines = text.split("\n")
+    self.partial = lines.pop()
+    for line in lines:
+      self.writeLine(line + "\n")
+    return len(text)
+
+  def writeLine(self,line):
+    vbeg = self.out.tell()
+    self.out.write(line)
+    region = self.index.region(line)
+    if region != None:
+      self.index.add(region[0],region[1],region[2],vbeg,self.out.tell())
+
+  def flush(self):
+    pass
+
+  def close(self):
+    if len(self.partial) > 0:
+      self.writeLine(self.partial + "\n")
+      self.partial = ""
+    self.out.close()
+    self.index.save(self.fn + ".tbi")
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self,*exc):
+    self.close()
+
+################################################################################
+#
+# class TabixReader -- region queries against an indexed file.
+
+class TabixReader:
+
+  def __init__(self,fn,index=None):
+    self.index = TabixIndex.load(index if index != None else fn + ".tbi")
+    self.reader = BgzfReader(fn)
+
+  def fetch(self,seq,beg,end):
+    """ Lines (without newline) overlapping the 0-based half-open region
+        [beg,end) of 'seq'. """
+    for (cbeg,cend) in self.index.chunks(seq,beg,end):
+      self.reader.seek(cbeg)
+      while self.reader.tell() < cend:
+        line = self.reader.readline()
+        if len(line) == 0:
+          break
+        line = line.decode().rstrip("\n")
+        region = self.index.region(line)
+        if region == None or region[0] != seq:
+          continue
+        if region[1] >= end:
+          break
+        if region[2] > beg:
+          yield line
+
+  def close(self):
+    self.reader.close()
@@ -0,0 +1,179 @@
+import sys
+import time
+import logging
+import resource
+import threading
+import contextlib
+from collections import Counter, deque
+
+################################################################################
+#
+# Timing and instrumentation for a run of mouseAnno.
+#
+# Timings collects named phases (wall time) and counters; LogMonitor sits
+# on the root logger, counting warnings by kind and measuring how long the
+# real handlers take to emit them, so the cost of logging shows up beside
+# the work it reports on.  report() gathers these, the load statistics a
+# GffFile keeps and the peak RSS into a dict for json.dump.  LatencyMetrics
+# does the same per request for the query server.
+
+def peakRssKb():
+  # ru_maxrss is in KB on Linux, bytes on macOS
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return rss // 1024 if sys.platform == "darwin" else rss
+
+class Timings:
+
+  def __init__(self):
+    self.phases = {}
+    self.counts = Counter()
+    self.started = time.perf_counter()
+
+  @contextlib.contextmanager
+  def phase(self,name):
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.add(name,time.perf_counter() - start)
+
+  def add(self,name,seconds):
+    self.phases[name] = self.phases.get(name,0.0) + seconds
+
+  def count(self,name,n=1):
+    self.counts[name] += n
+
+  def report(self,gff=None,monitor=None):
+    result = {"seconds": time.perf_counter() - self.started,
+              "phases": dict(self.phases),
+              "peakRssKb": peakRssKb()}
+    if len(self.counts) > 0:
+      result["counts"] = dict(self.counts)
+    if gff != None:
+      result["entries"] = len(gff.entries)
+      result["categories"] = dict(Counter([e.category for e in gff.entries.values()]))
+      stats = gff.loadStats
+      if stats != None:
+        result["load"] = dict(stats)
+        if stats["seconds"] > 0:
+          result["linesPerSec"] = stats["lines"] / stats["seconds"]
+    if monitor != None:
+      result["logging"] = monitor.report()
+    return result
+
+################################################################################
+#
+# class LogMonitor -- counts log records by kind and times the handlers
+#                     that write them out.
+
+class TimedHandler(logging.Handler):
+  """ Wraps a handler, adding the time it takes to the monitor's total. """
+
+  def __init__(self,inner,monitor):
+    logging.Handler.__init__(self,inner.level)
+    self.inner = inner
+    self.monitor = monitor
+
+  def handle(self,record):
+    start = time.perf_counter()
+    try:
+      return self.inner.handle(record)
+    finally:
+      self.monitor.seconds += time.perf_counter() - start
+
+  def emit(self,record):
+    self.inner.emit(record)
+
+class LogMonitor(logging.Handler):
+
+  # message prefixes of the warnings worth counting separately
+  KINDS = [("SKIPPING duplicate id","duplicateId"),
+           ("ENTRY missing ID","missingId"),
+           ("UNKNOWN entryType","unknownType"),
+           ("mRNA missing parents","mrnaNoParent")]
+
+  def __init__(self):
+    logging.Handler.__init__(self,logging.DEBUG)
+    self.kinds = Counter()
+    self.levels = Counter()
+    self.seconds = 0.0
+    self.outputLevel = None
+
+  def install(self,logger,level):
+    """ Count every warning on 'logger' while its handlers only write
+        records at 'level' and above. """
+    self.outputLevel = level
+    for h in list(logger.handlers):
+      logger.removeHandler(h)
+      h.setLevel(level)
+      logger.addHandler(TimedHandler(h,self))
+    logger.addHandler(self)
+    logger.setLevel(min(level,logging.WARNING))
+
+  def emit(self,record):
+    self.levels[record.levelname] += 1
+    if record.levelno >= logging.WARNING:
+      msg = record.msg if isinstance(record.msg,str) else str(record.msg)
+      for (prefix,kind) in LogMonitor.KINDS:
+        if msg.startswith(prefix):
+          self.kinds[kind] += 1
+          return
+      self.kinds["other"] += 1
+
+  def report(self):
+    return {"level": logging.getLevelName(self.outputLevel),
+            "records": dict(self.levels),
+            "warnings": dict(self.kinds),
+            "handlerSeconds": self.seconds}
+
+################################################################################
+#
+# class LatencyMetrics -- per-operation request counts and latencies, safe
+#                         to update from several threads.  Percentiles are
+#                         over the last SAMPLES requests of each operation.
+
+class LatencyMetrics:
+
+  SAMPLES = 2048
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.counts = Counter()
+    self.errors = Counter()
+    self.seconds = Counter()
+    self.slowest = {}
+    self.recent = {}
+    self.started = time.perf_counter()
+
+  def record(self,op,seconds,ok=True):
+    with self.lock:
+      self.counts[op] += 1
+      self.seconds[op] += seconds
+      if not ok:
+        self.errors[op] += 1
+      if seconds > self.slowest.get(op,0.0):
+        self.slowest[op] = seconds
+      if op not in self.recent:
+        self.recent[op] = deque(maxlen=LatencyMetrics.SAMPLES)
+      self.recent[op].append(seconds)
+
+  @staticmethod
+  def percentile(ordered,p):
+    return ordered[min(len(ordered) - 1,int(p * len(ordered)))]
+
+  def report(self):
+    """ Per operation: count, errors, mean, p50/p95/p99 and max in ms. """
+    with self.lock:
+      ops = {}
+      for (op,n) in self.counts.items():
+        ordered = sorted(self.recent[op])
+        ops[op] = {"count": n,
+                   "errors": self.errors[op],
+                   "meanMs": 1000 * self.seconds[op] / n,
+                   "p50Ms": 1000 * LatencyMetrics.percentile(ordered,0.50),
+                   "p95Ms": 1000 * LatencyMetrics.percentile(ordered,0.95),
+                   "p99Ms": 1000 * LatencyMetrics.percentile(ordered,0.99),
+                   "maxMs": 1000 * self.slowest[op]}
+      return {"uptime": time.perf_counter() - self.started,
+              "requests": sum(self.counts.values()),
+              "operations": ops}
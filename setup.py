@@ -17,7 +17,7 @@ setup(name='mouseAnno',
       author_email='gordon.brown@cruk.cam.ac.uk',
       license='MIT',
       packages=['mouse'],
-      scripts=['bin/mouseAnno'],
+      scripts=['bin/mouseAnno','bin/mouseBench'],
       test_suite="tests",
       cmdclass={'test': TestCommand},
       zip_safe=True)
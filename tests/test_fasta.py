@@ -0,0 +1,98 @@
+import sys
+import os
+import io
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.fasta import FastaIndex, FastaFile, reverseComplement
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+def fastaText(seqs,width):
+  text = []
+  for (name,seq) in seqs:
+    text.append(">%s description\n" % (name,))
+    for pos in range(0,len(seq),width):
+      text.append(seq[pos:pos+width] + "\n")
+  return "".join(text)
+
+class TestFasta(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    rng = random.Random(19)
+    self.seqs = [(name,"".join([rng.choice("ACGT") for i in range(length)]))
+                 for (name,length) in (("1",15000),("X",14500),("MT",61))]
+    self.genomeFN = os.path.join(self.tmp.name,"genome.fa")
+    open(self.genomeFN,"w").write(fastaText(self.seqs,60))
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def test_index(self):
+    idx = FastaIndex.build(self.genomeFN)
+    self.assertEqual(["1","X","MT"],idx.names)
+    self.assertEqual((15000,len(">1 description\n"),60,61),idx["1"])
+    fai = os.path.join(self.tmp.name,"copy.fai")
+    idx.save(fai)
+    self.assertEqual(idx.entries,FastaIndex.load(fai).entries)
+    open(self.genomeFN,"a").write(">bad\nACGT\nAC\nACGT\n")
+    self.assertRaises(ValueError,FastaIndex.build,self.genomeFN)
+
+  def test_blankLines(self):
+    # trailing blank lines are harmless, blank lines inside a sequence not
+    fn = os.path.join(self.tmp.name,"blank.fa")
+    open(fn,"w").write(">a\nACGT\nAC\n\n\n>b\nGGCC\n\n")
+    with FastaFile(fn) as fasta:
+      self.assertEqual((b"AC",b"GGCC"),(fasta.fetch("a",4,6),fasta.fetch("b",0,4)))
+    open(fn,"w").write(">a\nACGT\n\nACGT\n>b\nGGCC\n")
+    self.assertRaises(ValueError,FastaIndex.build,fn)
+
+  def test_fetch(self):
+    seqs = dict(self.seqs)
+    with FastaFile(self.genomeFN) as fasta:
+      self.assertTrue(os.path.exists(self.genomeFN + ".fai"))
+      for (s,e) in ((0,1),(59,61),(100,1000),(14990,15100)):
+        self.assertEqual(seqs["1"][s:e],fasta.fetch("chr1",s,e).decode())
+      self.assertEqual(seqs["MT"],fasta.fetch("chrM",0,100).decode())
+      self.assertEqual(None,fasta.fetch("chr7",0,10))
+      self.assertEqual(b"CGTA",reverseComplement(b"TACG"))
+
+  def test_extract(self):
+    seqs = dict(self.seqs)
+    out = io.StringIO()
+    with FastaFile(self.genomeFN) as fasta:
+      self.assertEqual(5,self.gff.writeSequences(out,fasta,"transcript",width=70))
+      records = dict([(name.split()[0],seq) for (name,seq) in
+                      [r.split("\n",1) for r in out.getvalue().split(">")[1:]]])
+      t1 = records["transcript:ENSMUST00000000001"].replace("\n","")
+      self.assertEqual(seqs["1"][999:1500] + seqs["1"][1999:2300] + seqs["1"][3999:5000],t1)
+      # minus strand: the exons joined and reverse-complemented
+      t3 = records["transcript:ENSMUST00000000003"].replace("\n","")
+      self.assertEqual(reverseComplement((seqs["1"][7999:8400] + seqs["1"][8999:9500]).encode()).decode(),t3)
+      ta = self.gff.transcriptArrays()
+      cds = list(ta.sequences(fasta,"cds"))
+      self.assertEqual(3,len(cds))
+      self.assertEqual(1203,len(cds[0][2]))
+      exons = [name for (name,location,seq) in ta.sequences(fasta,"exon")]
+      self.assertTrue("transcript:ENSMUST00000000003_exon1" in exons)
+      self.assertEqual(10,len(exons))
+
+  def test_embedded(self):
+    fn = os.path.join(self.tmp.name,"anno.gff3")
+    open(fn,"w").write(open(DATA).read() + "##FASTA\n" + fastaText(self.seqs,50))
+    self.assertEqual(None,FastaFile.embedded(DATA))
+    gff = GffFile()
+    gff.load(fn,GffFile.open(fn))
+    self.assertEqual(len(self.gff.entries),len(gff.entries))
+    with FastaFile.embedded(fn) as fasta:
+      self.assertEqual(dict(self.seqs)["X"][9999:10600],fasta.fetch("chrX",9999,10600).decode())
+
+if __name__ == "__main__":
+  unittest.main()
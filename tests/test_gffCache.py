@@ -0,0 +1,84 @@
+import sys
+import os
+import io
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffCache import GffCache
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffCache(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.fn = os.path.join(self.tmp.name,"anno.gff3")
+    shutil.copy(DATA,self.fn)
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def loaded(self,columnar=False):
+    gff = GffFile(columnar=columnar)
+    gff.load(self.fn,GffFile.open(self.fn))
+    return gff
+
+  def anno(self,gff,category):
+    out = io.StringIO()
+    gff.writeAnno(category,out)
+    return sorted(out.getvalue().splitlines())
+
+  def test_roundTrip(self):
+    for columnar in (False,True):
+      cache = GffCache()
+      self.assertEqual(None,cache.fetch(self.fn,columnar=columnar))
+      gff = self.loaded(columnar)
+      cache.store(gff,self.fn)
+      warm = cache.fetch(self.fn,columnar=columnar)
+      self.assertNotEqual(None,warm)
+      self.assertEqual(len(gff.entries),len(warm.entries))
+      for category in ("gene","exon","CDS"):
+        self.assertEqual(self.anno(gff,category),self.anno(warm,category))
+
+  def test_invalidated(self):
+    cache = GffCache()
+    cache.store(self.loaded(),self.fn)
+    with open(self.fn,"a") as fd:
+      fd.write("X\ttest\tgene\t1\t10\t.\t+\t.\tID=gene:new\n")
+    self.assertEqual(None,cache.fetch(self.fn))
+    cache.store(self.loaded(),self.fn)
+    caches = [f for f in os.listdir(self.tmp.name) if f.endswith(GffCache.SUFFIX)]
+    self.assertEqual(1,len(caches))
+
+  def test_otherOptionsKept(self):
+    cache = GffCache()
+    cache.store(self.loaded(),self.fn)
+    typed = GffFile()
+    typed.load(self.fn,GffFile.open(self.fn),types=set(["gene","mRNA"]))
+    cache.store(typed,self.fn)
+    cache.store(self.loaded(True),self.fn)
+    self.assertNotEqual(None,cache.fetch(self.fn))
+    self.assertNotEqual(None,cache.fetch(self.fn,types=set(["gene","mRNA"])))
+    self.assertNotEqual(None,cache.fetch(self.fn,columnar=True))
+    # a same-named input elsewhere does not evict them either
+    otherDir = os.path.join(self.tmp.name,"other")
+    os.mkdir(otherDir)
+    other = os.path.join(otherDir,"anno.gff3")
+    shutil.copy(DATA,other)
+    shared = GffCache(self.tmp.name)
+    gff = GffFile()
+    gff.load(other,GffFile.open(other))
+    shared.store(gff,other)
+    self.assertNotEqual(None,cache.fetch(self.fn))
+    caches = [f for f in os.listdir(self.tmp.name) if f.endswith(GffCache.SUFFIX)]
+    self.assertEqual(4,len(caches))
+
+  def test_cacheDirAndPrune(self):
+    cdir = os.path.join(self.tmp.name,"cache")
+    cache = GffCache(cdir,maxBytes=1)
+    cache.store(self.loaded(),self.fn)
+    self.assertEqual([],os.listdir(cdir))
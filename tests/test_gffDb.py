@@ -0,0 +1,82 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffDb import GffDb
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffDb(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+    self.fn = os.path.join(self.tmp.name,"anno.sqlite")
+    GffDb.build(self.gff,self.fn,DATA)
+    self.db = GffDb(self.fn)
+
+  def tearDown(self):
+    self.db.close()
+    self.tmp.cleanup()
+
+  def test_entries(self):
+    self.assertEqual(len(self.gff.entries),len(self.db.entries))
+    for (key,e) in self.gff.entries.items():
+      if not isinstance(key,str):
+        continue
+      row = self.db.entries[key]
+      self.assertEqual((e.chrom,e.category,e.left,e.right,e.strand,e.name(),e.parent),
+                       (row.chrom,row.category,row.left,row.right,row.strand,row.name(),row.parent))
+      self.assertEqual(e.attribute("biotype"),row.attribute("biotype"))
+    self.assertFalse("gene:nothing" in self.db.entries)
+    self.assertRaises(KeyError,self.db.entries.__getitem__,"gene:nothing")
+
+  def test_offspring(self):
+    tid = "transcript:ENSMUST00000000001"
+    kids = self.db.offspring[tid]
+    self.assertEqual(len(self.gff.offspring[tid]),len(kids))
+    self.assertEqual(sorted(["exon"] * 3 + ["CDS","five_prime_UTR","three_prime_UTR"]),
+                     sorted([self.db.entries[k].category for k in kids]))
+    self.assertEqual("Gnai3",self.db.gene(kids[0])[1].name())
+
+  def test_queries(self):
+    self.assertEqual(["gene:ENSMUSG00000000001","gene:ENSMUSG00000000004"],
+                     [k for (k,r) in self.db.category("gene")])
+    self.assertEqual(["transcript:ENSMUST00000000003"],[k for (k,r) in self.db.named("Gm1000-201")])
+    self.assertEqual(set(["gene","mRNA","exon","five_prime_UTR"]),
+                     set([r.category for (k,r) in self.db.region("chr1",1050,1060)]))
+
+  def test_region(self):
+    entries = list(self.gff.entries.values())
+    for (chrom,start,end) in [("chr1",1050,1060),("chr1",4600,4600),("chr1",1,100000),
+                              ("chrX",10601,12999),("chr9",1,100)]:
+      expect = [(e.category,e.left) for e in entries
+                if e.chrom == chrom and e.left <= end and e.right >= start]
+      self.assertEqual(sorted(expect),sorted([(r.category,r.left) for (k,r) in self.db.region(chrom,start,end)]))
+    plan = " ".join([r[-1] for r in self.db.conn.execute(
+      "EXPLAIN QUERY PLAN SELECT row FROM entries e WHERE e.chrom = ? AND e.start BETWEEN ? AND ? AND e.end >= ?",
+      ("chr1",1,2,1))])
+    self.assertTrue("start>? AND start<?" in plan,plan)
+
+  def test_extents(self):
+    gff = GffFile.openDb(self.fn)
+    self.assertEqual(self.gff.extent("CDS:ENSMUSP00000000001"),gff.extent("CDS:ENSMUSP00000000001"))
+    self.assertEqual(self.gff.transcriptArrays().codingLengths(),gff.transcriptArrays().codingLengths())
+    gff.db.close()
+
+  def test_backend(self):
+    gff = GffFile.openDb(self.fn)
+    (want,got) = (io.StringIO(),io.StringIO())
+    self.gff.makeAnno("mRNA,CDS,gene",False,want)
+    gff.makeAnno("mRNA,CDS,gene",False,got)
+    self.assertEqual(sorted(want.getvalue().splitlines()),sorted(got.getvalue().splitlines()))
+    gff.db.close()
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,77 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffDiff import GffDiff
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+NEW_GENE = """X\tensembl\tncRNA_gene\t16000\t16100\t.\t+\t.\tID=gene:ENSMUSG00000000009;Name=Gm9000;biotype=snRNA
+X\tensembl\tsnRNA\t16000\t16100\t.\t+\t.\tID=transcript:ENSMUST00000000009;Parent=gene:ENSMUSG00000000009;Name=Gm9000-201;biotype=snRNA
+X\tensembl\texon\t16000\t16100\t.\t+\t.\tParent=transcript:ENSMUST00000000009;Name=ENSMUSE00000099;rank=1
+###
+"""
+
+class TestGffDiff(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    with open(DATA) as fd:
+      text = fd.read()
+    # next release: Gm2000 dropped, a Gnai3-202 exon moved, Gm9000 added
+    blocks = text.split("###\n")
+    blocks = [b for b in blocks if "Gm2000" not in b]
+    text = "###\n".join(blocks).replace("exon\t4000\t4200","exon\t3900\t4200") + NEW_GENE
+    self.oldFN = DATA
+    self.newFN = os.path.join(self.tmp.name,"new.gff3")
+    with open(self.newFN,"w") as fd:
+      fd.write(text)
+    self.old = self.loadGff(self.oldFN)
+    self.new = self.loadGff(self.newFN)
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def loadGff(self,fn):
+    gff = GffFile()
+    gff.load(fn,GffFile.open(fn))
+    return gff
+
+  def test_compare(self):
+    d = GffDiff(self.old,self.new)
+    self.assertEqual(["gene:ENSMUSG00000000009"],d.addedGenes)
+    self.assertEqual(["gene:ENSMUSG00000000003"],d.removedGenes)
+    self.assertEqual(["gene:ENSMUSG00000000001"],d.changedGenes)
+    self.assertEqual(["transcript:ENSMUST00000000002"],d.changedTranscripts)
+    self.assertEqual(2,d.unchangedGenes)
+    out = io.StringIO()
+    d.write(out)
+    self.assertTrue("removed\tgene\tgene:ENSMUSG00000000003\tGm2000\n" in out.getvalue())
+
+  def test_same(self):
+    d = GffDiff(self.old,self.loadGff(self.oldFN))
+    self.assertEqual(([],[],[]),(d.addedGenes,d.removedGenes,d.changedGenes))
+
+  def outputs(self,base,ext):
+    return dict([(tag,sorted(GffDiff.readLines(fn))) for (tag,fn) in GffDiff.tagsOf(base,ext).items()])
+
+  def test_patch(self):
+    d = GffDiff(self.old,self.new)
+    for kind in ("track","anno"):
+      (oldBase,newBase,fullBase) = [os.path.join(self.tmp.name,"%s_%s" % (kind,n)) for n in ("old","new","full")]
+      GffDiff.render(self.old,kind,oldBase)
+      GffDiff.render(self.new,kind,fullBase)
+      counts = d.patch(kind,oldBase,newBase)
+      self.assertEqual(0,counts.get("missing",0))
+      ext = GffDiff.KINDS[kind]
+      full = dict([(t,l) for (t,l) in self.outputs(fullBase,ext).items() if len(l) > 0])
+      patched = dict([(t,l) for (t,l) in self.outputs(newBase,ext).items() if len(l) > 0])
+      self.assertEqual(full,patched)
+
+if __name__ == "__main__":
+  unittest.main()
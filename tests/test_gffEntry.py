@@ -1,11 +1,14 @@
 import sys
+import os
 import unittest
 import io
 import logging
 
 sys.path.insert(0,"..")
 
-from flybase.gffEntry import GffEntry
+from mouse.gffEntry import GffEntry
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
 
 class TestGffEntry(unittest.TestCase):
 
@@ -67,3 +70,54 @@ class TestGffEntry(unittest.TestCase):
     entry = GffEntry.parse(line)
     self.assertEqual(entry,None)
     self.assertEqual("UNKNOWN entryType 'Zork'\n",self.logBuffer.getvalue())
+
+  def test_lazySameAsEager(self):
+    lines = [l for l in open(DATA) if l[0] != "#"]
+    lines.append("2L\tFlyBase\tCDS\t7680\t8116\t.\t+\t0\tParent=FBtr0300689,FBtr0300690;Name=a,b\n")
+    lines.append("2L\tFlyBase\tgene\t7680\t8116\t.\t+\t.\tID=FBgn1; Name=spaced ;fullname=x y\n")
+    lines.append("2L\tFlyBase\tgene\t7680\t8116\t.\t+\t.\tName=first;ID=FBgn2;Name=second\n")
+    lines.append("1\tRNAcentral\tnoncoding_exon\t10\t20\t.\t+\t.\tID \"URS1\";type \"snRNA\";Parent \"URS0\"\n")
+    for line in lines:
+      eager = GffEntry.parse(line)
+      lazy = GffEntry.parse(line,lazy=True)
+      if eager == None:
+        self.assertEqual(None,lazy)
+        continue
+      if not isinstance(eager.oid,int):
+        self.assertEqual(eager.oid,lazy.oid)
+      self.assertEqual(eager.parent,lazy.parent)
+      self.assertEqual(eager.category,lazy.category)
+      self.assertEqual(eager.name(),lazy.name())
+      self.assertEqual(eager.fullname(),lazy.fullname())
+      self.assertEqual(eager.attribute("biotype"),lazy.attribute("biotype"))
+      self.assertEqual(eager.attrs,lazy.attrs)
+
+  def test_lazyKeepsRaw(self):
+    line = "1\thavana\tmRNA\t1\t10\t.\t+\t.\tID=transcript:T1;Parent=gene:G1;Name=T-201;biotype=lncRNA\n"
+    entry = GffEntry.parse(line,lazy=True)
+    self.assertEqual("T-201",entry.name())
+    self.assertNotEqual(None,entry.raw)
+    self.assertEqual("lncRNA",entry.attribute("biotype"))
+    self.assertEqual(None,entry.raw)
+
+  def test_parseRNAcentralFast(self):
+    attrs = "ID \"URS1\";type \"snRNA\";Parent \"URS0\""
+    self.assertEqual(GffEntry.parseRNAcentral(attrs),GffEntry.parseRNAcentralFast(attrs))
+
+  def test_mrnaWithoutParent(self):
+    line = "1\thavana\tmRNA\t10\t20\t.\t+\t.\tID=transcript:T1\n"
+    with self.assertLogs(level="WARNING") as cm:
+      GffEntry.parse(line)
+    self.assertTrue(cm.records[0].msg.startswith("mRNA missing parents"))
+
+  def test_skipLine(self):
+    region = "1\t.\tbiological_region\t10\t20\t.\t.\t.\tlogic_name=cpg\n"
+    exon = "1\thavana\texon\t10\t20\t.\t+\t.\tParent=transcript:T1\n"
+    rnac = "1\tRNAcentral\ttranscript\t10\t20\t.\t+\t.\tID \"URS1\";type \"snRNA\"\n"
+    odd = "1\thavana\tmystery\t10\t20\t.\t+\t.\tID=X\n"
+    self.assertTrue(GffEntry.skipLine(region))
+    self.assertFalse(GffEntry.skipLine(exon))
+    self.assertTrue(GffEntry.skipLine(exon,set(["gene"])))
+    self.assertFalse(GffEntry.skipLine(exon,set(["exon"])))
+    self.assertFalse(GffEntry.skipLine(rnac,set(["gene"])))
+    self.assertFalse(GffEntry.skipLine(odd,set(["gene"])))
@@ -0,0 +1,62 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffExport import GffExporter
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffExporter(unittest.TestCase):
+
+  def setUp(self):
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+    self.tmp = tempfile.TemporaryDirectory()
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def isSorted(self,lines,col):
+    keys = [(l.split("\t")[0],int(l.split("\t")[col])) for l in lines]
+    return keys == sorted(keys)
+
+  def test_partitions(self):
+    parts = GffExporter(self.gff).partitions()
+    self.assertEqual(["chr1","chrX"],sorted(parts))
+    self.assertEqual(len(self.gff.entries),sum([len(p) for p in parts.values()]))
+    self.assertTrue("gene:ENSMUSG00000000004" in parts["chrX"])
+
+  def test_anno(self):
+    plain = io.StringIO()
+    self.gff.makeAnno("all",False,plain)
+    for workers in (1,2):
+      out = io.StringIO()
+      self.gff.makeAnno("all",False,out,workers=workers,sort=True)
+      lines = out.getvalue().splitlines()
+      self.assertEqual(sorted(plain.getvalue().splitlines()),sorted(lines))
+      self.assertTrue(self.isSorted(lines,3))
+
+  def test_tracks(self):
+    for method in ("makeTrackSet","makePipelineSet"):
+      plain = os.path.join(self.tmp.name,"plain")
+      getattr(self.gff,method)(plain)
+      for workers in (1,2):
+        base = os.path.join(self.tmp.name,"w%d" % (workers,))
+        getattr(self.gff,method)(base,workers=workers,sort=True)
+        for tag in ("mRNA","snRNA"):
+          if not os.path.exists("%s_%s.bed" % (plain,tag)):
+            continue
+          with open("%s_%s.bed" % (plain,tag)) as fd:
+            want = fd.read().splitlines()
+          with open("%s_%s.bed" % (base,tag)) as fd:
+            got = fd.read().splitlines()
+          self.assertEqual(sorted(want),sorted(got))
+          self.assertTrue(self.isSorted(got,1))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import io
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffFeatures import TranscriptArrays
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+T1 = "transcript:ENSMUST00000000001"
+T5 = "transcript:ENSMUST00000000005"
+
+class TestTranscriptArrays(unittest.TestCase):
+
+  def setUp(self):
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+    self.ta = self.gff.transcriptArrays()
+
+  def test_csr(self):
+    self.assertEqual(5,len(self.ta))
+    self.assertEqual(len(self.ta.exonStarts),self.ta.offsets[-1])
+    i = self.ta.ids.index(T1)
+    self.assertEqual([(999,1500),(1999,2300),(3999,5000)],self.ta.exons(i))
+    # a transcript with one exon child, and every transcript against the
+    # exons GffFile knows
+    for (n,key) in enumerate(self.ta.ids):
+      exons = sorted([(x.left-1,x.right) for x in self.gff.exonsOf(key)])
+      self.assertEqual(exons,self.ta.exons(n))
+
+  def test_extent(self):
+    # the CDS of T1 is three lines sharing one ID
+    self.assertEqual((1100,4500),self.gff.extent("CDS:ENSMUSP00000000001"))
+    i = self.ta.ids.index(T1)
+    self.assertEqual((1099,4500),(self.ta.cdsStarts[i],self.ta.cdsEnds[i]))
+
+  def test_ends(self):
+    i = self.ta.ids.index(T1)
+    j = self.ta.ids.index(T5)
+    self.assertEqual((999,4999),(self.ta.tss()[i],self.ta.tes()[i]))
+    self.assertEqual((13999,9999),(self.ta.tss()[j],self.ta.tes()[j]))
+    out = io.StringIO()
+    self.ta.writeEnds(out,"tss",window=10)
+    self.assertTrue("chrX\t13989\t14010\t%s\t0\t-\n" % (T5,) in out.getvalue())
+
+  def test_introns(self):
+    out = io.StringIO()
+    self.gff.writeIntrons(out)
+    lines = out.getvalue().splitlines()
+    self.assertEqual(5,len(lines))
+    self.assertEqual("chr1\t2300\t3999\t%s_intron2\t0\t+" % (T1,),lines[1])
+    (owners,starts,ends,numbers) = self.ta.introns()
+    for (t,s,e) in zip(owners,starts,ends):
+      exons = self.ta.exons(t)
+      self.assertTrue(s in [x[1] for x in exons] and e in [x[0] for x in exons])
+
+  def test_lengths(self):
+    (cds,utr5,utr3) = self.ta.codingLengths()
+    spliced = self.ta.splicedLengths()
+    i = self.ta.ids.index(T1)
+    self.assertEqual((1803,1203,100,500),(spliced[i],cds[i],utr5[i],utr3[i]))
+    j = self.ta.ids.index(T5)
+    self.assertEqual((1602,1202,200,200),(spliced[j],cds[j],utr5[j],utr3[j]))
+    for n in range(len(self.ta)):
+      if cds[n] > 0:
+        self.assertEqual(spliced[n],cds[n] + utr5[n] + utr3[n])
+    out = io.StringIO()
+    self.gff.writeLengths(out)
+    lines = out.getvalue().splitlines()
+    self.assertEqual(TranscriptArrays.LENGTH_HEADER.rstrip("\n"),lines[0])
+    self.assertEqual(6,len(lines))
+    self.assertTrue(lines[1].startswith("%s\tgene:ENSMUSG00000000001\tGnai3\t" % (T1,)))
+
+  def test_columnar(self):
+    gff = GffFile(columnar=True)
+    gff.load(DATA,GffFile.open(DATA))
+    (a,b) = (io.StringIO(),io.StringIO())
+    self.gff.writeLengths(a)
+    gff.writeLengths(b)
+    self.assertEqual(a.getvalue(),b.getvalue())
+
+if __name__ == "__main__":
+  unittest.main()
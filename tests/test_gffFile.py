@@ -1,9 +1,83 @@
 import sys
+import os
+import io
+import gzip
+import tempfile
 import unittest
 
 sys.path.insert(0,"..")
 
+from mouse.gffFile import GffFile
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
 class TestGFF(unittest.TestCase):
 
   def test_sanity(self):
     self.assertEqual(True,True)
+
+class TestTypeFilter(unittest.TestCase):
+
+  def test_typesFor(self):
+    self.assertEqual(set(["gene"]),GffFile.typesFor("gene"))
+    types = GffFile.typesFor("CDS")
+    self.assertTrue("CDS" in types and "mRNA" in types and "gene" in types)
+    self.assertFalse("exon" in types or "five_prime_UTR" in types)
+    self.assertTrue("exon" in GffFile.typesFor("mRNA"))
+
+  def test_filteredAnno(self):
+    full = GffFile()
+    full.load(DATA,GffFile.open(DATA))
+    for categories in ("gene","CDS,exon","mRNA,lnc_RNA"):
+      gff = GffFile()
+      gff.load(DATA,GffFile.open(DATA),types=GffFile.typesFor(categories))
+      self.assertTrue(gff.loadStats["skipped"] > 0)
+      self.assertTrue(len(gff.entries) < len(full.entries))
+      (want,got) = (io.StringIO(),io.StringIO())
+      full.makeAnno(categories,False,want)
+      gff.makeAnno(categories,False,got)
+      self.assertEqual(sorted(want.getvalue().splitlines()),sorted(got.getvalue().splitlines()))
+
+  def test_filteredAfterParse(self):
+    # RNAcentral rows are typed in their attributes, so the type filter
+    # only drops them after parsing, which saves nothing
+    with tempfile.TemporaryDirectory() as tmp:
+      fn = os.path.join(tmp,"rnac.gff3")
+      with open(fn,"w") as fd:
+        fd.write(open(DATA).read().split("##FASTA")[0])
+        fd.write("1\tRNAcentral\ttranscript\t10\t20\t.\t+\t.\tID \"URS1\";type \"snRNA\"\n")
+      for workers in (1,2):
+        gff = GffFile()
+        gff.load(fn,GffFile.open(fn),workers=workers,types=set(["gene"]))
+        stats = gff.loadStats
+        self.assertEqual(1,stats["filtered"])
+        self.assertEqual(stats["lines"] - 1 - len(gff.entries),stats["skipped"])
+
+class TestMakeAnno(unittest.TestCase):
+
+  def setUp(self):
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+
+  def single(self,category):
+    out = io.StringIO()
+    self.gff.writeAnno(category,out)
+    return out.getvalue().splitlines()
+
+  def test_categories(self):
+    self.assertEqual(["exon","gene"],GffFile.annoCategories("exon,gene"))
+    self.assertTrue("CDS" in GffFile.annoCategories(["all"]))
+
+  def test_onePass(self):
+    out = io.StringIO()
+    self.gff.makeAnno(["gene","mRNA","CDS"],False,out)
+    expect = self.single("gene") + self.single("mRNA") + self.single("CDS")
+    self.assertEqual(sorted(expect),sorted(out.getvalue().splitlines()))
+
+  def test_split(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      base = os.path.join(tmp,"anno")
+      self.gff.makeAnno("gene,exon",False,None,base=base,compress=True)
+      with gzip.open(base + "_exon.gtf.gz","rt") as fd:
+        self.assertEqual(sorted(self.single("exon")),sorted(fd.read().splitlines()))
+      self.assertTrue(os.path.exists(base + "_gene.gtf.gz"))
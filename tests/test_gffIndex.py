@@ -0,0 +1,78 @@
+import sys
+import os
+import io
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffIndex import IntervalIndex
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffIndex(unittest.TestCase):
+
+  def setUp(self):
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+    self.index = self.gff.intervalIndex()
+
+  def test_againstScan(self):
+    rnd = random.Random(42)
+    features = []
+    for i in range(2000):
+      left = rnd.randint(1,100000)
+      features.append(("chr1",left,left + rnd.randint(0,rnd.choice([100,5000])),"+","exon","f%d" % i))
+    index = IntervalIndex(features)
+    for q in range(300):
+      start = rnd.randint(1,100000)
+      end = start + rnd.randint(0,2000)
+      expect = set([f[5] for f in features if f[1] <= end and f[2] >= start])
+      self.assertEqual(expect,set(index.overlaps("chr1",start,end)))
+      inside = set([f[5] for f in features if f[1] <= start and f[2] >= end])
+      self.assertEqual(inside,set(index.containing("chr1",start,end)))
+
+  def test_overlaps(self):
+    hits = self.index.overlaps("chr1",2100,2200,category="mRNA")
+    self.assertEqual(["transcript:ENSMUST00000000001","transcript:ENSMUST00000000002"],sorted(hits))
+    self.assertEqual([],self.index.overlaps("chr1",6000,7000,category="gene"))
+    self.assertEqual([],self.index.overlaps("chr9",1,100))
+    batch = self.index.overlapsBatch([("chr1",8100,8100),("chrX",3100,3100)],category="exon")
+    self.assertEqual([1,1],[len(b) for b in batch])
+
+  def test_nearest(self):
+    (dist,ids) = self.index.nearest("chr1",6000,6100,category="gene")
+    self.assertEqual(1000,dist)
+    self.assertEqual(["gene:ENSMUSG00000000001"],ids)
+    (dist,ids) = self.index.nearest("chr1",7500,category="ncRNA_gene")
+    self.assertEqual((500,["gene:ENSMUSG00000000002"]),(dist,ids))
+    self.assertEqual((None,[]),self.index.nearest("chr9",1))
+
+  def test_saveLoad(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      fn = os.path.join(tmp,"anno.idx")
+      self.index.save(fn,"anno.gff3 v1")
+      loaded = IntervalIndex.load(fn,"anno.gff3 v1")
+      self.assertEqual(None,IntervalIndex.load(fn,"anno.gff3 v2"))
+    self.assertEqual(self.index.overlaps("chrX",10500,13500),loaded.overlaps("chrX",10500,13500))
+
+  def test_stableKeys(self):
+    exons = self.index.overlaps("chr1",1200,1300,category="exon")
+    self.assertTrue("transcript:ENSMUST00000000001:exon:1000-1500" in exons)
+    other = GffFile()
+    other.load(DATA,GffFile.open(DATA))
+    self.assertEqual(exons,other.intervalIndex().overlaps("chr1",1200,1300,category="exon"))
+    keys = IntervalIndex.keyMap(self.gff)
+    for key in exons:
+      e = self.gff.entries[keys[key]]
+      self.assertEqual(("exon",1000,1500),(e.category,e.left,e.right))
+
+  def test_annotateBed(self):
+    bed = io.StringIO("chr1\t999\t1001\tpeak1\nchr1\t6000\t6100\tpeak2\n")
+    out = io.StringIO()
+    self.index.annotateBed(bed,out,category="gene",nearest=True)
+    lines = out.getvalue().splitlines()
+    self.assertEqual("chr1\t999\t1001\tpeak1\tgene:ENSMUSG00000000001\t0",lines[0])
+    self.assertEqual("chr1\t6000\t6100\tpeak2\tgene:ENSMUSG00000000001\t1001",lines[1])
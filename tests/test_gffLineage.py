@@ -0,0 +1,63 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffEntry import GffEntry
+from mouse.gffLineage import Lineage
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffLineage(unittest.TestCase):
+
+  def setUp(self):
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+
+  def test_levels(self):
+    lin = self.gff.lineage()
+    gene = "gene:ENSMUSG00000000001"
+    tx = "transcript:ENSMUST00000000001"
+    self.assertEqual((gene,"","Gnai3","protein_coding"),lin[gene])
+    self.assertEqual((gene,tx,"Gnai3","protein_coding"),lin[tx])
+    self.assertTrue(lin.isGene(gene))
+    self.assertTrue(lin.isTranscript(tx))
+    exon = [k for k in self.gff.offspring[tx] if self.gff.entries[k].category == "exon"][0]
+    self.assertEqual((gene,tx,"Gnai3","protein_coding"),lin[exon])
+    self.assertEqual(2,len(lin.transcriptsByGene()[gene]))
+    self.assertTrue(self.gff.lineage() is lin)
+
+  def test_ambiguousOnce(self):
+    # an exon shared by transcripts of two different genes
+    line = "1\ttest\texon\t1000\t1100\t.\t+\t.\tParent=transcript:ENSMUST00000000001,transcript:ENSMUST00000000003\n"
+    entry = GffEntry.parse(line)
+    self.gff.addEntry(entry)
+    log = io.StringIO()
+    lin = Lineage.build(self.gff,log)
+    self.assertEqual(("gene:ENSMUSG00000000001","gene:ENSMUSG00000000002"),lin.ambiguous[entry.oid])
+    self.assertEqual(1,log.getvalue().count("GRANDPARENTS"))
+    self.assertEqual("gene:ENSMUSG00000000001",lin.geneId(entry.oid))
+
+  def test_orphan(self):
+    entry = GffEntry.parse("1\ttest\texon\t1\t10\t.\t+\t.\tParent=transcript:nowhere\n")
+    self.gff.addEntry(entry)
+    out = io.StringIO()
+    self.gff.checkConsistent(out)
+    self.assertTrue("missing parent transcript:nowhere" in out.getvalue())
+
+  def test_trackSets(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      base = os.path.join(tmp,"anno")
+      self.gff.makeTrackSet(base)
+      lines = open(base + "_mRNA.bed").read().splitlines()
+      self.assertEqual(3,len(lines))
+      self.assertTrue("chr1\t999\t5000\tGnai3-201\t0\t+\t999\t5000\t0\t3\t501,301,1001,\t0,1000,3000," in lines)
+      self.gff.makePipelineSet(base)
+      genes = open(base + "_mRNA.bed").read().splitlines()
+      self.assertEqual(["chr1\t999\t5000\tgene:ENSMUSG00000000001\t0\t+",
+                        "chrX\t9999\t14000\tgene:ENSMUSG00000000004\t0\t-"],genes)
+      self.assertEqual(1,len(open(base + "_lnc_RNA.bed").readlines()))
@@ -0,0 +1,102 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffMerge import GffMerger
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+GENE = "gene:ENSMUSG00000000001"
+TRANSCRIPT = "transcript:ENSMUST00000000001"
+
+class TestGffMerger(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.base = GffFile()
+    self.base.load(DATA,GffFile.open(DATA))
+    # a second release: one gene renamed, one gene added
+    self.otherFN = os.path.join(self.tmp.name,"other.gff3.gz")
+    import gzip
+    with gzip.open(self.otherFN,"wt") as fd:
+      fd.write(open(DATA).read().replace("Name=Gnai3;","Name=Gnai3x;"))
+      fd.write("1\tother\tgene\t20000\t21000\t.\t+\t.\tID=gene:NEW1;Name=New1\n")
+      fd.write("1\tother\tmRNA\t20000\t21000\t.\t+\t.\tID=transcript:NEW1;Parent=gene:NEW1;Name=New1-201\n")
+      fd.write("1\tother\texon\t20000\t21000\t.\t+\t.\tParent=transcript:NEW1\n")
+    self.fns = [DATA,self.otherFN]
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def test_labels(self):
+    self.assertEqual(["ensembl","other"],GffMerger.labelsFor(self.fns))
+    self.assertEqual(["a","a2"],GffMerger.labelsFor(["x/a.gff3","y/a.gff3"]))
+    self.assertEqual([1,0],GffMerger(self.fns,precedence="other").order)
+    self.assertEqual([1,0],GffMerger(self.fns,precedence=[self.otherFN]).order)
+    self.assertRaises(ValueError,GffMerger,self.fns,precedence="zork")
+    self.assertRaises(ValueError,GffMerger,self.fns,collisions="zork")
+
+  def test_keep(self):
+    gff = GffFile()
+    gff.loadFiles(self.fns)
+    self.assertEqual(len(self.base.entries) + 3,len(gff.entries))
+    self.assertEqual("Gnai3",gff.entries[GENE].name())
+    self.assertEqual(DATA,gff.origin(GENE))
+    self.assertEqual(self.otherFN,gff.origin("gene:NEW1"))
+    # the exons of dropped transcripts go with them
+    self.assertEqual(6,len(gff.offspring[TRANSCRIPT]))
+    files = gff.loadStats["files"]
+    self.assertEqual(["ensembl","other"],[f["label"] for f in files])
+    self.assertEqual(len(self.base.entries),files[1]["dropped"])
+    # higher precedence for the second file keeps its names
+    gff = GffFile()
+    gff.loadFiles(self.fns,precedence="other")
+    self.assertEqual("Gnai3x",gff.entries[GENE].name())
+    self.assertEqual(len(self.base.offspring[TRANSCRIPT]),len(gff.offspring[TRANSCRIPT]))
+
+  def test_keepExtents(self):
+    # the same CDS IDs, 50 kb further on, in a file of lower precedence
+    shiftedFN = os.path.join(self.tmp.name,"shifted.gff3")
+    with open(shiftedFN,"w") as out:
+      for line in open(DATA):
+        flds = line.split("\t")
+        if len(flds) == 9 and flds[2] == "CDS":
+          flds[3:5] = [str(int(f) + 50000) for f in flds[3:5]]
+        out.write("\t".join(flds))
+    gff = GffFile()
+    gff.loadFiles([DATA,shiftedFN])
+    self.assertEqual(self.base.extent("CDS:ENSMUSP00000000001"),gff.extent("CDS:ENSMUSP00000000001"))
+    self.assertEqual((1100,4500),gff.extent("CDS:ENSMUSP00000000001"))
+    self.assertEqual(self.base.transcriptArrays().codingLengths(),gff.transcriptArrays().codingLengths())
+
+  def test_namespace(self):
+    gff = GffFile()
+    gff.loadFiles(self.fns,collisions="namespace")
+    renamed = "other:" + GENE
+    self.assertEqual("Gnai3x",gff.entries[renamed].name())
+    self.assertEqual(renamed,gff.lineage().geneId("other:" + TRANSCRIPT))
+    self.assertEqual(self.otherFN,gff.origin(renamed))
+    self.assertTrue("gene:NEW1" in gff.entries)
+    self.assertEqual(gff.extent("CDS:ENSMUSP00000000001"),gff.extent("other:CDS:ENSMUSP00000000001"))
+    out = io.StringIO()
+    gff.makeAnno("mRNA",False,out)
+    self.assertTrue('transcript_id "Gnai3-201"; gene_name "Gnai3x";' in out.getvalue())
+
+  def test_workers(self):
+    serial = GffFile()
+    serial.loadFiles(self.fns,collisions="namespace")
+    for columnar in (False,True):
+      gff = GffFile(columnar=columnar)
+      gff.loadFiles(self.fns,workers=2,collisions="namespace")
+      self.assertEqual(sorted([k for k in serial.entries if isinstance(k,str)]),
+                       sorted([k for k in gff.entries if isinstance(k,str)]))
+      self.assertEqual(len(serial.entries),len(gff.entries))
+      self.assertEqual(serial.report().combined(),gff.report().combined())
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import os
+import io
+import logging
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffParallel import ParallelLoader
+from mouse.bgzf import BgzfWriter
+from mouse import bgzf
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffParallel(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    lines = open(DATA).readlines()
+    lines.insert(10,"1\ttest\tZork\t1\t10\t.\t+\t.\tID=zork1\n")
+    self.plainFN = os.path.join(self.tmp.name,"anno.gff3")
+    open(self.plainFN,"w").write("".join(lines))
+    self.bgzfFN = os.path.join(self.tmp.name,"anno.gff3.gz")
+    with BgzfWriter(self.bgzfFN) as out:
+      for i,line in enumerate(lines):
+        out.write(line[0:20])
+        if i % 3 == 0:
+          out.flush()
+        out.write(line[20:])
+    self.rootlog = logging.getLogger()
+    self.saved = self.rootlog.handlers[:]
+    self.savedLevel = self.rootlog.level
+
+  def tearDown(self):
+    self.rootlog.handlers = self.saved
+    self.rootlog.setLevel(self.savedLevel)
+    self.tmp.cleanup()
+
+  def loadWithLog(self,fn,workers):
+    buf = io.StringIO()
+    self.rootlog.handlers = [logging.StreamHandler(buf)]
+    self.rootlog.setLevel(logging.WARNING)
+    gff = GffFile()
+    gff.load(fn,GffFile.open(fn),workers=workers)
+    return (gff,buf.getvalue())
+
+  def compare(self,fn):
+    (serial,serialLog) = self.loadWithLog(fn,1)
+    (parallel,parallelLog) = self.loadWithLog(fn,3)
+    self.assertEqual(serialLog,parallelLog)
+    self.assertTrue("SKIPPING duplicate id" in serialLog)
+    self.assertTrue("UNKNOWN entryType 'Zork'" in serialLog)
+    # entries without an ID are keyed by object id, which differs per load
+    keys = lambda gff: [k if isinstance(k,str) else None for k in gff.entries]
+    self.assertEqual(keys(serial),keys(parallel))
+    self.assertEqual(set(serial.offspring.keys()),set(parallel.offspring.keys()))
+    for k,v in serial.offspring.items():
+      self.assertEqual(len(v),len(parallel.offspring[k]))
+
+  def test_plain(self):
+    self.compare(self.plainFN)
+
+  def test_bgzf(self):
+    self.assertTrue(bgzf.isBgzf(self.bgzfFN))
+    self.assertTrue(len(bgzf.blocks(self.bgzfFN)) > 10)
+    self.compare(self.bgzfFN)
+
+  def test_chunksCoverFile(self):
+    units = ParallelLoader(3).chunks(self.plainFN)
+    self.assertEqual(os.path.getsize(self.plainFN),sum([u[3] for u in units]))
+
+  def test_fastaStops(self):
+    open(self.plainFN,"a").write("##FASTA\n>1\nACGT\n")
+    (serial,_) = self.loadWithLog(self.plainFN,1)
+    (parallel,_) = self.loadWithLog(self.plainFN,3)
+    self.assertEqual(len(serial.entries),len(parallel.entries))
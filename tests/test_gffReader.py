@@ -0,0 +1,92 @@
+import sys
+import os
+import bz2
+import gzip
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffReader import GffReader
+from mouse.bgzf import BgzfWriter
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffReader(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.text = open(DATA).read() * 50
+    self.lines = self.text.splitlines(True)
+    self.plain = os.path.join(self.tmp.name,"a.gff3")
+    open(self.plain,"w").write(self.text)
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def read(self,fn,**kw):
+    reader = GffReader(fn,**kw)
+    lines = list(reader)
+    reader.close()
+    return (lines,reader)
+
+  def test_plain(self):
+    (lines,reader) = self.read(self.plain)
+    self.assertEqual(self.lines,lines)
+    st = reader.stats()
+    self.assertEqual(("plain",len(self.text)),(st["method"],st["bytes"]))
+    self.assertEqual((None,None),(st["lines"],st["readSeconds"]))
+
+  def test_blocks(self):
+    fn = self.plain + ".gz"
+    with gzip.open(fn,"wt") as fd:
+      fd.write(self.text)
+    old = GffReader.BLOCK
+    GffReader.BLOCK = 1000
+    try:
+      (lines,reader) = self.read(fn,external=False)
+    finally:
+      GffReader.BLOCK = old
+    self.assertEqual(self.lines,lines)
+    st = reader.stats()
+    self.assertEqual(len(self.text),st["bytes"])
+    self.assertEqual(len(self.lines),st["lines"])
+    self.assertTrue(st["linesPerSec"] > 0)
+
+  def test_noFinalNewline(self):
+    open(self.plain,"w").write("a\nb")
+    self.assertEqual(["a\n","b"],self.read(self.plain)[0])
+
+  def test_gzip(self):
+    fn = self.plain + ".gz"
+    with gzip.open(fn,"wt") as fd:
+      fd.write(self.text)
+    (lines,reader) = self.read(fn,external=False)
+    self.assertEqual("gzip",reader.method)
+    self.assertEqual(self.lines,lines)
+
+  def test_bgzfThreads(self):
+    fn = self.plain + ".gz"
+    with BgzfWriter(fn) as out:
+      for i,line in enumerate(self.lines):
+        out.write(line)
+        if i % 7 == 0:
+          out.flush()
+    (lines,reader) = self.read(fn,threads=3)
+    self.assertEqual("bgzf-threads",reader.method)
+    self.assertEqual(self.lines,lines)
+
+  def test_bz2(self):
+    fn = self.plain + ".bz2"
+    with bz2.open(fn,"wt") as fd:
+      fd.write(self.text)
+    self.assertEqual(self.lines,self.read(fn,external=False)[0])
+
+  @unittest.skipIf(shutil.which("zstd") == None,"zstd not installed")
+  def test_zstd(self):
+    subprocess.check_call(["zstd","-q",self.plain])
+    (lines,reader) = self.read(self.plain + ".zst")
+    self.assertEqual("zstd",reader.method)
+    self.assertEqual(self.lines,lines)
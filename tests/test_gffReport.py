@@ -0,0 +1,50 @@
+import sys
+import os
+import io
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffReport import GffReport
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffReport(unittest.TestCase):
+
+  def setUp(self):
+    self.gff = GffFile()
+    self.gff.load(DATA,GffFile.open(DATA))
+    self.report = self.gff.report()
+
+  def test_stats(self):
+    counts = {}
+    for e in self.gff.entries.values():
+      counts[e.category] = counts.get(e.category,0) + 1
+    self.assertEqual(counts,dict(self.report.stats()))
+    out = io.StringIO()
+    self.gff.stats(out)
+    self.assertTrue("000000010\texon\n" in out.getvalue())
+
+  def test_groups(self):
+    self.assertEqual(["gene","ncRNA_gene"],self.report.topLevelTypes())
+    self.assertEqual(["mRNA","lnc_RNA","snRNA"],self.report.parentTypes()["exon"])
+    self.assertTrue("CDS" not in self.report.hasName())
+    self.assertEqual([],self.report.hasFullName())
+    kids = self.report.maxKids()
+    self.assertEqual(2,kids["gene"]["mRNA"])
+    self.assertEqual(3,kids["mRNA"]["exon"])
+
+  def test_orphans(self):
+    del self.gff.entries["gene:ENSMUSG00000000004"]
+    report = GffReport(self.gff)
+    self.assertEqual(set(["gene","orphan"]),set(report.parentTypes()["mRNA"]))
+    self.assertEqual(1,report.combined()["orphans"])
+
+  def test_columnar(self):
+    gff = GffFile(columnar=True)
+    gff.load(DATA,GffFile.open(DATA))
+    self.assertEqual(self.report.combined(),gff.report().combined())
+
+if __name__ == "__main__":
+  unittest.main()
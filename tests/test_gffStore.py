@@ -0,0 +1,53 @@
+import sys
+import os
+import io
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffStore import GffStore, Codes
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffStore(unittest.TestCase):
+
+  def setUp(self):
+    self.plain = GffFile()
+    self.plain.load(DATA,GffFile.open(DATA))
+    self.store = GffFile(columnar=True)
+    self.store.load(DATA,GffFile.open(DATA))
+
+  def test_codes(self):
+    codes = Codes()
+    self.assertEqual(0,codes.code("chr1"))
+    self.assertEqual(1,codes.code("chrX"))
+    self.assertEqual(0,codes.code("chr1"))
+    self.assertEqual("chrX",codes.name(1))
+
+  def test_rowMatchesEntry(self):
+    e = self.plain.entries["transcript:ENSMUST00000000001"]
+    r = self.store.entries["transcript:ENSMUST00000000001"]
+    for fld in ("oid","chrom","source","category","left","right","score",
+                "strand","frame"):
+      self.assertEqual(getattr(e,fld),getattr(r,fld))
+    self.assertEqual(e.name(),r.name())
+    self.assertEqual(e.attribute("biotype"),r.attribute("biotype"))
+    self.assertEqual(e.attribute("missing"),r.attribute("missing"))
+    self.assertEqual(e.attrs,r.attrs)
+    self.assertEqual(set(e.parent),set(r.parent))
+
+  def test_tables(self):
+    self.assertEqual(len(self.plain.entries),len(self.store.entries))
+    self.assertEqual(set(self.plain.offspring.keys()),set(self.store.offspring.keys()))
+    tid = "transcript:ENSMUST00000000005"
+    self.assertEqual(set(self.plain.parents[tid]),set(self.store.parents[tid]))
+    self.assertEqual(len(self.plain.offspring[tid]),len(self.store.offspring[tid]))
+
+  def test_makeAnno(self):
+    for category in ("gene","mRNA","exon","CDS"):
+      a = io.StringIO()
+      b = io.StringIO()
+      self.plain.writeAnno(category,a)
+      self.store.writeAnno(category,b)
+      self.assertEqual(sorted(a.getvalue().splitlines()),sorted(b.getvalue().splitlines()))
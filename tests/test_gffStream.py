@@ -0,0 +1,67 @@
+import sys
+import os
+import io
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.gffStream import GffStream
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestGffStream(unittest.TestCase):
+
+  def inMemory(self,category):
+    gff = GffFile()
+    gff.load(DATA,GffFile.open(DATA))
+    out = io.StringIO()
+    gff.writeAnno(category,out)
+    return sorted(out.getvalue().splitlines())
+
+  def streamed(self,category,stream=None):
+    stream = stream if stream != None else GffStream()
+    out = io.StringIO()
+    for window in stream.windows(GffFile.open(DATA)):
+      window.writeAnno(category,out)
+    return sorted(out.getvalue().splitlines())
+
+  def test_windowsPerGene(self):
+    stream = GffStream()
+    sizes = [len(w.entries) for w in stream.windows(GffFile.open(DATA))]
+    self.assertEqual(4,stream.windowCount)
+    self.assertEqual(4,len(sizes))
+
+  def test_sameAsInMemory(self):
+    for category in ("gene","mRNA","snRNA","exon","CDS","five_prime_UTR"):
+      self.assertEqual(self.inMemory(category),self.streamed(category))
+
+  def test_noSeparators(self):
+    lines = [l for l in open(DATA) if not l.startswith("###")]
+    stream = GffStream()
+    windows = list(stream.windows(io.StringIO("".join(lines))))
+    self.assertEqual(1,len(windows))
+
+  def test_lookahead(self):
+    # a gene appearing after its block separator keeps the window open
+    lines = open(DATA).readlines()
+    sep = lines.index("###\n")
+    gene = lines.pop(sep+1)
+    lines.insert(lines.index("###\n",sep+1)+1,gene)
+    stream = GffStream()
+    windows = list(stream.windows(io.StringIO("".join(lines))))
+    self.assertEqual(3,len(windows))
+
+  def test_crossBlockParent(self):
+    # a child of a transcript from a window already handed on is split off,
+    # and later separators still close their windows
+    lines = open(DATA).readlines()
+    sizes = [len(w.entries) for w in GffStream().windows(io.StringIO("".join(lines)))]
+    at = [i for (i,line) in enumerate(lines) if line == "###\n"][1] + 1
+    lines.insert(at,"1\thavana\texon\t4600\t4700\t.\t+\t.\tParent=transcript:ENSMUST00000000001\n")
+    with self.assertLogs(level="WARNING") as cm:
+      windows = list(GffStream().windows(io.StringIO("".join(lines))))
+    self.assertEqual(sizes[0:2] + [sizes[2] + 1] + sizes[3:],[len(w.entries) for w in windows])
+    stream = [r.msg for r in cm.records if r.msg.startswith("STREAM")]
+    self.assertEqual(1,len(stream))
+    self.assertTrue("earlier block" in stream[0])
@@ -0,0 +1,116 @@
+import sys
+import os
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.server import AnnoServer
+from mouse.client import AnnoClient, ServerError
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestServer(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.gff = GffFile()
+    cls.gff.load(DATA,GffFile.open(DATA))
+
+  def start(self,**kwargs):
+    server = AnnoServer(self.gff,name=DATA,**kwargs)
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    def stop():
+      server.shutdown()
+      thread.join()
+    self.addCleanup(stop)
+    return server
+
+  def test_queries(self):
+    server = self.start()
+    with AnnoClient(server.address,timeout=10) as client:
+      self.assertEqual(len(self.gff.entries),client.health()["entries"])
+      gene = client.entry("gene:ENSMUSG00000000001")
+      self.assertEqual(("gene",1000,5000),(gene["category"],gene["start"],gene["end"]))
+      self.assertEqual("Gnai3",gene["attributes"]["Name"])
+      self.assertEqual(None,client.entry("nope"))
+      self.assertEqual(["transcript:ENSMUST00000000001","transcript:ENSMUST00000000002"],
+                       client.offspring("gene:ENSMUSG00000000001"))
+      self.assertEqual(len(self.gff.subtree("gene:ENSMUSG00000000001")) - 1,
+                       len(client.offspring("gene:ENSMUSG00000000001",all=True)))
+      lin = client.lineage("transcript:ENSMUST00000000001")
+      self.assertEqual(("transcript","gene:ENSMUSG00000000001","Gnai3"),
+                       (lin["level"],lin["gene_id"],lin["gene_name"]))
+      self.assertEqual(["gene:ENSMUSG00000000001"],client.overlap("chr1",1200,1300,category="gene"))
+      self.assertEqual([],client.overlap("chr1",1200,1300,category="gene",strand="-"))
+      exon = client.overlap("chrX",13500,13500,category="exon")[0]
+      self.assertEqual(exon,client.entry(exon)["id"])
+      self.assertTrue(exon in client.offspring("transcript:ENSMUST00000000005"))
+      (dist,ids) = client.nearest("chr1",6000,category="gene")
+      self.assertEqual((1000,["gene:ENSMUSG00000000001"]),(dist,ids))
+      with self.assertRaises(ServerError) as cm:
+        client.lineage("nope")
+      self.assertEqual(404,cm.exception.status)
+      with self.assertRaises(ServerError) as cm:
+        client.overlap("chr1","x",None)
+      self.assertEqual(400,cm.exception.status)
+
+  def test_batch(self):
+    server = self.start()
+    with AnnoClient(server.address,timeout=10) as client:
+      results = client.batch([{"op": "lineage","id": "gene:ENSMUSG00000000001"},
+                              {"op": "zork"},
+                              {"op": "lineage","id": "nope"},
+                              {"op": "overlap","chrom": "chrX","start": 13500,"category": "gene"}])
+      self.assertEqual("Gnai3",results[0]["gene_name"])
+      self.assertEqual(400,results[1]["status"])
+      self.assertEqual(404,results[2]["status"])
+      self.assertEqual({"ids": ["gene:ENSMUSG00000000004"]},results[3])
+      ops = client.metrics()["operations"]
+      self.assertEqual(1,ops["batch"]["count"])
+      self.assertEqual(1,ops["batch.lineage"]["errors"])
+
+  def test_export(self):
+    server = self.start()
+    with AnnoClient(server.address,timeout=10) as client:
+      lines = list(client.export("mRNA"))
+      self.assertTrue(len(lines) > 0)
+      self.assertTrue(all([line.split("\t")[2] == "exon" for line in lines]))
+      bed = list(client.export("mRNA","bed"))
+      self.assertEqual(len([1 for (tag,line) in self.gff.trackLines() if tag == "mRNA"]),len(bed))
+      # a partly read export must not spoil the next request
+      next(client.export("mRNA"))
+      self.assertEqual(len(self.gff.entries),client.health()["entries"])
+      self.assertRaises(ServerError,list,client.export("mRNA","xml"))
+
+  def test_unixSocket(self):
+    tmp = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp.cleanup)
+    path = os.path.join(tmp.name,"anno.sock")
+    server = self.start(socketPath=path)
+    self.assertEqual("unix:" + path,server.address)
+    failures = []
+    def worker():
+      try:
+        with AnnoClient(server.address,timeout=10) as client:
+          for i in range(20):
+            if client.lineage("transcript:ENSMUST00000000001")["gene_name"] != "Gnai3":
+              failures.append(i)
+      except Exception as ex:
+        failures.append(ex)
+    threads = [threading.Thread(target=worker) for i in range(4)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEqual([],failures)
+    with AnnoClient(server.address,timeout=10) as client:
+      report = client.metrics()
+    self.assertEqual(80,report["operations"]["lineage"]["count"])
+    self.assertEqual(0,report["operations"]["lineage"]["errors"])
+
+if __name__ == "__main__":
+  unittest.main()
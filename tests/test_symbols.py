@@ -0,0 +1,71 @@
+import sys
+import os
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffEntry import GffEntry
+from mouse.gffFile import GffFile
+from mouse.gffCache import GffCache
+from mouse.symbols import SymbolTable
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestSymbolTable(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.saved = GffEntry.symbols
+    GffEntry.symbols = SymbolTable(GffEntry.CHROM2UCSC)
+
+  def tearDown(self):
+    GffEntry.symbols = self.saved
+    self.tmp.cleanup()
+
+  def test_styles(self):
+    sym = GffEntry.symbols
+    self.assertEqual("chr1",sym.chrom("1"))
+    self.assertEqual("GL456210.1",sym.chrom("GL456210.1"))
+    self.assertEqual("MT",sym.ensemblName("chrM"))
+    self.assertEqual(["chrM","MT","mitochondrion_genome"],sym.aliases("chrM"))
+    sym.setStyle("ensembl")
+    self.assertEqual("1",sym.chrom("chr1"))
+    self.assertEqual("1",sym.chrom("1"))
+    sym.setStyle("asis")
+    self.assertEqual("chr1",sym.chrom("chr1"))
+    self.assertRaises(ValueError,sym.setStyle,"zork")
+
+  def test_mapping(self):
+    sym = GffEntry.symbols
+    fn = os.path.join(self.tmp.name,"map.txt")
+    open(fn,"w").write("# GRCm39\nGL456210.1\tchr1_GL456210v1_random\tgenbank\nJH584304.1\t\n\n")
+    self.assertEqual("",sym.signature())
+    self.assertEqual("GL456210.1",sym.chrom("GL456210.1"))
+    self.assertEqual(1,sym.loadMapping(fn))
+    self.assertEqual("chr1_GL456210v1_random",sym.chrom("GL456210.1"))
+    self.assertEqual("JH584304.1",sym.chrom("JH584304.1"))
+    self.assertEqual("GL456210.1",sym.ensemblName("chr1_GL456210v1_random"))
+    self.assertTrue(sym.signature().startswith("ucsc:"))
+
+  def test_interned(self):
+    gff = GffFile()
+    gff.load(DATA,GffFile.open(DATA))
+    entries = list(gff.entries.values())
+    chr1 = [e for e in entries if e.chrom == "chr1"]
+    self.assertTrue(all([e.chrom is chr1[0].chrom for e in chr1]))
+    exons = [e for e in entries if e.category == "exon"]
+    self.assertTrue(all([e.category is exons[0].category for e in exons]))
+    self.assertTrue(all([e.source is GffEntry.symbols.intern(e.source) for e in entries]))
+
+  def test_cacheKey(self):
+    cache = GffCache(self.tmp.name)
+    key = cache.key(DATA)
+    GffEntry.symbols.setStyle("ensembl")
+    self.assertNotEqual(key,cache.key(DATA))
+    gff = GffFile()
+    gff.load(DATA,GffFile.open(DATA))
+    self.assertEqual(set(["1","X"]),set([e.chrom for e in gff.entries.values()]))
+
+if __name__ == "__main__":
+  unittest.main()
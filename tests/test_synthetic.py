@@ -0,0 +1,43 @@
+import sys
+import io
+import logging
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.synthetic import SyntheticGff
+from mouse.benchmark import Benchmark
+
+class TestSynthetic(unittest.TestCase):
+
+  def generate(self,**kw):
+    out = io.StringIO()
+    SyntheticGff(**kw).write(out)
+    return out.getvalue()
+
+  def test_deterministic(self):
+    self.assertEqual(self.generate(genes=50,seed=3),self.generate(genes=50,seed=3))
+    self.assertNotEqual(self.generate(genes=50,seed=3),self.generate(genes=50,seed=4))
+
+  def test_loads(self):
+    text = self.generate(genes=100,rnacentral=20,transposons=10,regions=30)
+    logging.disable(logging.WARNING)
+    try:
+      gff = GffFile()
+      gff.load("synthetic",io.StringIO(text))
+    finally:
+      logging.disable(logging.NOTSET)
+    cats = [e.category for e in gff.entries.values()]
+    self.assertEqual(100,len([c for c in cats if c in ("gene","ncRNA_gene","pseudogene")]))
+    self.assertEqual(10,cats.count("transposable_element"))
+    self.assertEqual(20,len([e for e in gff.entries.values() if e.source == "RNAcentral" and e.parent == None]))
+    self.assertEqual(100,text.count("###\n"))
+
+  def test_benchmark(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      results = Benchmark(tmp,SyntheticGff(genes=20)).run(only=["parse","makeAnno.exon"])
+    self.assertEqual(["parse","makeAnno.exon"],[r["name"] for r in results["results"]])
+    self.assertTrue(results["results"][0]["seconds"] > 0)
+    self.assertTrue(results["results"][1]["peakRssKb"] > 0)
@@ -0,0 +1,73 @@
+import sys
+import os
+import gzip
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.tabix import TabixWriter, TabixReader, TabixIndex, reg2bin, reg2bins
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestTabix(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def test_bins(self):
+    self.assertEqual(4681,reg2bin(0,1))
+    self.assertEqual(0,reg2bin(0,1 << 29))
+    for (beg,end) in ((0,1),(16000,17000),(100000,5000000)):
+      self.assertTrue(reg2bin(beg,end) in reg2bins(beg,end))
+
+  def test_roundTrip(self):
+    rnd = random.Random(7)
+    rows = []
+    for chrom in ("chr1","chr10","chr2"):
+      pos = 0
+      for i in range(5000):
+        pos += rnd.randint(0,2000)
+        rows.append((chrom,pos,pos + rnd.randint(1,40000),"r%d" % (i,)))
+    fn = os.path.join(self.tmp.name,"rows.bed.gz")
+    with TabixWriter(fn) as out:
+      out.write("#header\n")
+      for r in rows:
+        out.write("%s\t%d\t%d\t%s\n" % r)
+    with gzip.open(fn,"rt") as fd:
+      self.assertEqual(len(rows) + 1,len(fd.read().splitlines()))
+    reader = TabixReader(fn)
+    for q in range(100):
+      chrom = rnd.choice(["chr1","chr10","chr2"])
+      beg = rnd.randint(0,6000000)
+      end = beg + rnd.randint(1,200000)
+      want = ["%s\t%d\t%d\t%s" % r for r in rows if r[0] == chrom and r[1] < end and r[2] > beg]
+      self.assertEqual(want,list(reader.fetch(chrom,beg,end)))
+    self.assertEqual([],list(reader.fetch("chrY",0,1000)))
+    reader.close()
+
+  def test_unsorted(self):
+    out = TabixWriter(os.path.join(self.tmp.name,"bad.bed.gz"))
+    out.write("chr1\t100\t200\ta\n")
+    self.assertRaises(ValueError,out.write,"chr1\t50\t60\tb\n")
+
+  def test_exports(self):
+    gff = GffFile()
+    gff.load(DATA,GffFile.open(DATA))
+    base = os.path.join(self.tmp.name,"anno")
+    gff.makeTrackSet(base,fmt="tabix")
+    reader = TabixReader(base + "_mRNA.bed.gz")
+    self.assertEqual(["Gnai3-202","Gnai3-201"],[l.split("\t")[3] for l in reader.fetch("chr1",4100,4101)])
+    gff.makeAnno("gene,exon",False,None,base=base,tabix=True)
+    index = TabixIndex.load(base + "_gene.gtf.gz.tbi")
+    self.assertEqual(["chr1","chrX"],index.names)
+    reader = TabixReader(base + "_exon.gtf.gz")
+    self.assertEqual(["2000"],[l.split("\t")[3] for l in reader.fetch("chr1",1600,2000)])
+
+if __name__ == "__main__":
+  unittest.main()
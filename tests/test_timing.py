@@ -0,0 +1,74 @@
+import sys
+import os
+import io
+import logging
+import unittest
+
+sys.path.insert(0,"..")
+
+from mouse.gffFile import GffFile
+from mouse.timing import Timings, LogMonitor, LatencyMetrics
+
+DATA = os.path.join(os.path.dirname(__file__),"data","ensembl.gff3")
+
+class TestTiming(unittest.TestCase):
+
+  def setUp(self):
+    self.logger = logging.getLogger("mouse.test.timing")
+    self.logger.propagate = False
+    self.out = io.StringIO()
+    self.logger.addHandler(logging.StreamHandler(self.out))
+
+  def tearDown(self):
+    for h in list(self.logger.handlers):
+      self.logger.removeHandler(h)
+
+  def test_phases(self):
+    t = Timings()
+    for i in range(3):
+      with t.phase("work"):
+        sum(range(1000))
+    t.count("widgets",2)
+    report = t.report()
+    self.assertTrue(report["phases"]["work"] > 0)
+    self.assertEqual({"widgets": 2},report["counts"])
+    self.assertTrue(report["peakRssKb"] > 0)
+
+  def test_latency(self):
+    m = LatencyMetrics()
+    for i in range(100):
+      m.record("lookup",(i + 1) / 1000.0)
+    m.record("lookup",0.5,ok=False)
+    report = m.report()
+    self.assertEqual(101,report["requests"])
+    op = report["operations"]["lookup"]
+    self.assertEqual((101,1),(op["count"],op["errors"]))
+    self.assertAlmostEqual(500.0,op["maxMs"])
+    self.assertTrue(op["p50Ms"] <= op["p95Ms"] <= op["p99Ms"] <= op["maxMs"])
+
+  def test_monitor(self):
+    monitor = LogMonitor()
+    monitor.install(self.logger,logging.ERROR)
+    self.logger.warning("SKIPPING duplicate id: x")
+    self.logger.warning("UNKNOWN entryType 'y'")
+    self.logger.warning("something else")
+    self.logger.error("bad")
+    report = monitor.report()
+    self.assertEqual({"duplicateId": 1,"unknownType": 1,"other": 2},report["warnings"])
+    self.assertEqual("ERROR",report["level"])
+    self.assertEqual("bad\n",self.out.getvalue())
+
+  def test_timedLoad(self):
+    gff = GffFile()
+    gff.load(DATA,GffFile.open(DATA),timed=True)
+    plain = GffFile()
+    plain.load(DATA,GffFile.open(DATA))
+    self.assertEqual([k for k in plain.entries if isinstance(k,str)],
+                     [k for k in gff.entries if isinstance(k,str)])
+    for key in ("parseSeconds","offspringSeconds","attributeSeconds","read"):
+      self.assertTrue(key in gff.loadStats)
+    report = Timings().report(gff)
+    self.assertEqual(10,report["categories"]["exon"])
+
+if __name__ == "__main__":
+  unittest.main()